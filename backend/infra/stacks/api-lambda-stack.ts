@@ -240,7 +240,7 @@ export class ApiLambdaStack extends cdk.Stack {
 
     const scrapingQueue = new sqs.Queue(this, 'ScrapingQueue', {
       queueName: 'consultia-scraping',
-      visibilityTimeout: cdk.Duration.seconds(90), // matches scraper Lambda timeout
+      visibilityTimeout: cdk.Duration.seconds(240), // exceeds the scraper Lambda timeout
       retentionPeriod: cdk.Duration.days(4),
       deadLetterQueue: {
         queue: scrapingDlq,
@@ -260,7 +260,10 @@ export class ApiLambdaStack extends cdk.Stack {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'lambda_function.lambda_handler',
       code: lambda.Code.fromAsset('../lambdas/business-scraper'),
-      timeout: cdk.Duration.seconds(60),
+      // A batch of up to 10 records runs concurrently, and one record can
+      // take over a minute (host waits, crawl, Bedrock retries); records
+      // unfinished near the timeout are reported as batch item failures
+      timeout: cdk.Duration.seconds(180),
       memorySize: 512,
       vpc: props.vpc, vpcSubnets, securityGroups,
       environment: {
@@ -272,7 +275,7 @@ export class ApiLambdaStack extends cdk.Stack {
     props.databaseSecret.grantRead(businessScraperFunction);
     businessScraperFunction.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ['bedrock:InvokeModel'],
+        actions: ['bedrock:InvokeModel', 'bedrock:InvokeModelWithResponseStream'],
         resources: [
           `arn:aws:bedrock:*::foundation-model/anthropic.claude-*`,
           `arn:aws:bedrock:${this.region}:${this.account}:inference-profile/eu.anthropic.*`,
@@ -280,9 +283,48 @@ export class ApiLambdaStack extends cdk.Stack {
       })
     );
 
-    // Wire SQS → Business Scraper Lambda
+    // Wire SQS → Business Scraper Lambda (records of a batch are scraped
+    // concurrently; only failed messages are redelivered)
     businessScraperFunction.addEventSource(
-      new SqsEventSource(scrapingQueue, { batchSize: 1 })
+      new SqsEventSource(scrapingQueue, {
+        batchSize: 10,
+        maxBatchingWindow: cdk.Duration.seconds(2),
+        reportBatchItemFailures: true,
+      })
+    );
+
+    // ========================================
+    // Lambda: Bulk Re-scrape (Python, same code as the scraper)
+    // ========================================
+    // Invoked directly with a run_id and customer list; returns status
+    // 'running' near its timeout and resumes from the DB checkpoint when
+    // invoked again with the same run_id
+    const bulkRescrapeFunction = new lambda.Function(this, 'BulkRescrapeFunction', {
+      functionName: 'consultia-business-bulk-rescrape',
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'lambda_function.bulk_rescrape_handler',
+      code: lambda.Code.fromAsset('../lambdas/business-scraper'),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      vpc: props.vpc, vpcSubnets, securityGroups,
+      environment: {
+        DB_SECRET_NAME: props.databaseSecret.secretName,
+        DEPLOY_REGION: this.region,
+        SCRAPER_BULK_FETCH_CONCURRENCY: '16',
+        SCRAPER_BULK_LLM_CONCURRENCY: '4',
+        SCRAPER_BULK_MAX_ATTEMPTS: '3',
+      },
+    });
+
+    props.databaseSecret.grantRead(bulkRescrapeFunction);
+    bulkRescrapeFunction.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ['bedrock:InvokeModel', 'bedrock:InvokeModelWithResponseStream'],
+        resources: [
+          `arn:aws:bedrock:*::foundation-model/anthropic.claude-*`,
+          `arn:aws:bedrock:${this.region}:${this.account}:inference-profile/eu.anthropic.*`,
+        ],
+      })
     );
 
     // ========================================
@@ -295,6 +337,7 @@ export class ApiLambdaStack extends cdk.Stack {
       code: lambda.Code.fromAsset('../lambdas/knowledge-base-processor'),
       timeout: cdk.Duration.minutes(15),
       memorySize: 3008,
+      ephemeralStorageSize: cdk.Size.gibibytes(2), // up to 10 spooled downloads per batch
       vpc: props.vpc, vpcSubnets, securityGroups,
       environment: {
         DB_SECRET_NAME: props.databaseSecret.secretName,
@@ -307,14 +350,43 @@ export class ApiLambdaStack extends cdk.Stack {
     props.knowledgeBaseBucket.grantRead(this.kbProcessorFunction);
     this.kbProcessorFunction.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ['bedrock:InvokeModel'],
+        actions: ['bedrock:InvokeModel', 'bedrock:InvokeModelWithResponseStream'],
         resources: [
           `arn:aws:bedrock:*::foundation-model/anthropic.claude-*`,
+          `arn:aws:bedrock:*::foundation-model/amazon.titan-embed-text-v2:0`,
           `arn:aws:bedrock:${this.region}:${this.account}:inference-profile/eu.anthropic.*`,
         ],
       })
     );
 
+    // ========================================
+    // Lambda: KB Passage Search (Python, same code as the KB processor)
+    // ========================================
+    // Invoked directly with a kb_id and query; returns the top-k raw text
+    // passages from kb_passages (full-text Spanish, or semantic with the
+    // query embedded by Titan)
+    const kbSearchFunction = new lambda.Function(this, 'KBSearchFunction', {
+      functionName: 'consultia-kb-search',
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'lambda_function.search_passages_handler',
+      code: lambda.Code.fromAsset('../lambdas/knowledge-base-processor'),
+      timeout: cdk.Duration.seconds(10),
+      memorySize: 512,
+      vpc: props.vpc, vpcSubnets, securityGroups,
+      environment: {
+        DB_SECRET_NAME: props.databaseSecret.secretName,
+        DEPLOY_REGION: this.region,
+      },
+    });
+
+    props.databaseSecret.grantRead(kbSearchFunction);
+    kbSearchFunction.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ['bedrock:InvokeModel'],
+        resources: [`arn:aws:bedrock:*::foundation-model/amazon.titan-embed-text-v2:0`],
+      })
+    );
+
     // ========================================
     // SQS: KB Processing Queue
     // ========================================
@@ -333,9 +405,14 @@ export class ApiLambdaStack extends cdk.Stack {
       },
     });
 
-    // Wire SQS → KB Processor Lambda
+    // Wire SQS → KB Processor Lambda (a batch's sources are processed
+    // concurrently; failed ones are retried on their own)
     this.kbProcessorFunction.addEventSource(
-      new SqsEventSource(kbProcessingQueue, { batchSize: 1 })
+      new SqsEventSource(kbProcessingQueue, {
+        batchSize: 10,
+        maxBatchingWindow: cdk.Duration.seconds(5),
+        reportBatchItemFailures: true,
+      })
     );
 
     // Give onboarding Lambda permission to send messages + the queue URL
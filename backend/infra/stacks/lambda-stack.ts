@@ -194,7 +194,7 @@ export class LambdaStack extends cdk.Stack {
     // Grant Bedrock permissions
     this.kbProcessorFunction.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ['bedrock:InvokeModel'],
+        actions: ['bedrock:InvokeModel', 'bedrock:InvokeModelWithResponseStream'],
         resources: [
           `arn:aws:bedrock:${this.region}::foundation-model/anthropic.claude-3-5-sonnet-20241022-v2:0`,
         ],
@@ -9,9 +9,13 @@ Triggered by: SQS message from onboarding-api (Step 1)
 
 Flow:
 1. Receive SQS message with { customer_id, website, job_id }
-2. Fetch website HTML with requests
+2. Fetch website HTML with requests (homepage plus a few same-origin
+   pages such as /contacto or /servicios, fetched concurrently)
 3. Send HTML to Bedrock Claude 3.5 Sonnet for extraction
 4. Store structured data in business_info table
+
+bulk_rescrape_handler runs the same steps for a whole list of customers
+(e.g. after a prompt change) with checkpointed, resumable progress.
 """
 
 import json
@@ -20,29 +24,387 @@ import os
 import re
 import ipaddress
 import socket
-from urllib.parse import urlparse, urljoin
+import codecs
+import time
+import datetime
+import random
+import hashlib
+import copy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import Lock, RLock, Semaphore
+from contextlib import contextmanager
+from urllib.parse import urlparse, urljoin, urldefrag
+from urllib.robotparser import RobotFileParser
+from email.utils import parsedate_to_datetime
+from html import unescape
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, HTTPClientError
 import requests
+import charset_normalizer
+from requests.adapters import HTTPAdapter
+from requests.utils import select_proxy
+from urllib3.exceptions import NewConnectionError
 import psycopg2
-from typing import Dict, Any, Optional
+from psycopg2.extras import execute_values
+from typing import Dict, Any, List, Optional, Tuple
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients
-bedrock = boto3.client('bedrock-runtime', region_name='eu-west-1')
-secretsmanager = boto3.client('secretsmanager', region_name='eu-west-1')
+# AWS clients (created on first use and reused across invocations; building
+# a client costs tens of milliseconds that would otherwise be paid by every
+# cold start, including the ones that never call that service)
+bedrock_client = None
+secretsmanager_client = None
+aws_clients_lock = Lock()
 
-# Database connection (reused across invocations)
+# Database connection (reused across invocations). Records are processed
+# on a thread pool, so every use of the shared connection (including
+# get_db_connection) happens while holding db_lock.
 db_conn = None
+db_lock = RLock()
 
 # HTTP session (reused for connection pooling)
 http_session = None
 
+# Resolved + SSRF-validated IPs per hostname: hostname -> (expires_at, ips).
+# getaddrinfo does not expose record TTLs, so entries live for a fixed,
+# short time that comfortably covers a scrape job.
+DNS_CACHE_TTL_SECONDS = int(os.environ.get('SCRAPER_DNS_CACHE_TTL_SECONDS', '300'))
+dns_cache: Dict[str, Tuple[float, List[str]]] = {}
+dns_cache_lock = Lock()
+
+# Per-host politeness, shared by crawl workers and bulk sites in this
+# container. Requests are gated per server IP, because shared hosting
+# throttles by server rather than by site:
+# - at most HOST_MAX_CONCURRENCY fetches at a time;
+# - request starts are spaced by an interval that doubles on 429/503
+#   (or follows Retry-After) and decays after successes, never below the
+#   site's robots.txt Crawl-delay;
+# - a host that asks us to wait longer than HOST_MAX_WAIT_SECONDS fails
+#   the fetch with HostBusyError (retried later via SQS).
+POLITENESS_ENABLED = os.environ.get('SCRAPER_POLITENESS_ENABLED', 'true').lower() == 'true'
+HOST_MAX_CONCURRENCY = int(os.environ.get('SCRAPER_HOST_MAX_CONCURRENCY', '2'))
+HOST_MIN_INTERVAL_SECONDS = float(os.environ.get('SCRAPER_HOST_MIN_INTERVAL_SECONDS', '0.25'))
+HOST_MAX_INTERVAL_SECONDS = 10.0
+HOST_MAX_WAIT_SECONDS = 20.0
+HOST_MAX_ATTEMPTS = 2  # Per request, counting retries after 429/503
+THROTTLE_STATUS_CODES = (429, 503)
+
+# robots.txt rules per origin: origin -> (expires_at, parser or None = no rules)
+ROBOTS_CACHE_TTL_SECONDS = int(os.environ.get('SCRAPER_ROBOTS_CACHE_TTL_SECONDS', '3600'))
+ROBOTS_ERROR_TTL_SECONDS = 600  # Unreachable robots.txt: allow, re-check sooner
+ROBOTS_MAX_BYTES = 512 * 1024
+ROBOTS_TIMEOUT = 5
+ROBOTS_USER_AGENT = 'ConsultIA Bot'  # Token matched against User-agent lines
+ROBOTS_MAX_CRAWL_DELAY = 5.0  # Longer Crawl-delays are capped to fit the Lambda timeout
+robots_cache: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+robots_locks: Dict[str, Lock] = {}
+robots_cache_lock = Lock()
+
 # Maximum HTML size to send to the LLM (chars)
 MAX_HTML_LENGTH = 80000
 
+# Content selection: cleaned HTML is split into blocks and only the
+# highest-value blocks (contact details, hours, dense text) are sent to
+# the LLM, within this token budget
+CONTENT_SELECTION_ENABLED = os.environ.get('SCRAPER_CONTENT_SELECTION_ENABLED', 'true').lower() == 'true'
+CONTENT_TOKEN_BUDGET = int(os.environ.get('SCRAPER_CONTENT_TOKEN_BUDGET', '10000'))
+CHARS_PER_TOKEN = 3.5
+
+BLOCK_BOUNDARY_PATTERN = re.compile(
+    r'</?(?:address|article|aside|dd|div|dl|dt|footer|form|h[1-6]|header|li|main|nav|ol|p|section|table|td|tr|ul)\b[^>]*>',
+    re.IGNORECASE,
+)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+LINK_TEXT_PATTERN = re.compile(r'<a\b[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+PHONE_PATTERN = re.compile(r'tel:|(?:\+34[\s.-]?)?\b[6789]\d{2}[\s.-]?\d{2,3}[\s.-]?\d{2,3}\b')
+EMAIL_PATTERN = re.compile(r'mailto:|[\w.+-]+@[\w-]+\.[\w.-]+', re.IGNORECASE)
+ADDRESS_PATTERN = re.compile(
+    r'\bc/|\b(?:calle|avda|avenida|plaza|pza|paseo|carretera|ctra|camino|ronda|pol[ií]gono|direcci[oó]n)\b'
+    r'|\b(?:0[1-9]|[1-4]\d|5[0-2])\d{3}\b',
+    re.IGNORECASE,
+)
+HOURS_PATTERN = re.compile(
+    r'\b(?:lunes|martes|mi[eé]rcoles|jueves|viernes|s[aá]bados?|domingos?|festivos|horarios?)\b'
+    r'|\b\d{1,2}[:.h]\d{2}\b',
+    re.IGNORECASE,
+)
+HEADLINE_PATTERN = re.compile(r'<(?:title|h1)\b|<meta\s[^>]*name="description"', re.IGNORECASE)
+BOILERPLATE_PATTERN = re.compile(
+    r'cookie|consentimiento|aviso legal|pol[ií]tica de privacidad|newsletter|suscr[ií]bete',
+    re.IGNORECASE,
+)
+
+# Structured data fast path: schema.org JSON-LD / microdata (plus OpenGraph
+# business tags) are mapped to the extraction fields. Bedrock is skipped when
+# all STRUCTURED_REQUIRED_FIELDS are found, and otherwise only asked for the
+# missing fields with a smaller prompt and content budget.
+STRUCTURED_DATA_ENABLED = os.environ.get('SCRAPER_STRUCTURED_DATA_ENABLED', 'true').lower() == 'true'
+STRUCTURED_REQUIRED_FIELDS = tuple(
+    os.environ.get('SCRAPER_STRUCTURED_REQUIRED_FIELDS', 'business_name,industry,address,phone,hours,services').split(',')
+)
+STRUCTURED_GAP_TOKEN_BUDGET = int(os.environ.get('SCRAPER_STRUCTURED_GAP_TOKEN_BUDGET', '4000'))
+MAX_JSON_LD_CHARS = 200000  # Per page
+
+JSON_LD_PATTERN = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+META_TAG_PATTERN = re.compile(r'<meta\b([^>]*)>', re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+ITEMTYPE_PATTERN = re.compile(r'\bitemtype\s*=\s*["\']https?://schema\.org/(\w+)["\']', re.IGNORECASE)
+ITEMPROP_PATTERN = re.compile(r'<(\w+)\b([^>]*\bitemprop\s*=[^>]*)>([^<]*)', re.IGNORECASE)
+OPENING_HOURS_PATTERN = re.compile(
+    r'\b((?:mo|tu|we|th|fr|sa|su)(?:\s*[-,]\s*(?:mo|tu|we|th|fr|sa|su))*)\s+'
+    r'(\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}(?:\s*,?\s*\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2})*)',
+    re.IGNORECASE,
+)
+TIME_RANGE_PATTERN = re.compile(r'(\d{1,2}):(\d{2})(?::\d{2})?\s*-\s*(\d{1,2}):(\d{2})')
+
+# Day keys of the "hours" field, in schema.org order (Mo..Su)
+DAY_KEYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+SCHEMA_DAY_INDEX = {'mo': 0, 'tu': 1, 'we': 2, 'th': 3, 'fr': 4, 'sa': 5, 'su': 6}
+
+# schema.org LocalBusiness subtypes -> "industry" values used by the prompt
+SCHEMA_INDUSTRIES = {
+    'VeterinaryCare': 'veterinary',
+    'Dentist': 'dental',
+    'HairSalon': 'hair_salon',
+    'BeautySalon': 'beauty_salon',
+    'NailSalon': 'beauty_salon',
+    'DaySpa': 'spa',
+    'Restaurant': 'restaurant',
+    'FastFoodRestaurant': 'restaurant',
+    'CafeOrCoffeeShop': 'cafe',
+    'BarOrPub': 'bar',
+    'Bakery': 'bakery',
+    'AutoRepair': 'auto_repair',
+    'AutoBodyShop': 'auto_repair',
+    'AutoDealer': 'auto_dealer',
+    'Physician': 'medical',
+    'MedicalClinic': 'medical',
+    'Optician': 'optician',
+    'Pharmacy': 'pharmacy',
+    'Physiotherapy': 'physiotherapy',
+    'Attorney': 'legal',
+    'LegalService': 'legal',
+    'AccountingService': 'accounting',
+    'RealEstateAgent': 'real_estate',
+    'InsuranceAgency': 'insurance',
+    'ExerciseGym': 'gym',
+    'HealthClub': 'gym',
+    'Hotel': 'hotel',
+    'Plumber': 'plumbing',
+    'Electrician': 'electrician',
+    'Locksmith': 'locksmith',
+    'Florist': 'florist',
+    'ChildCare': 'childcare',
+    'Store': 'retail',
+}
+GENERIC_BUSINESS_TYPES = (
+    'LocalBusiness', 'Organization', 'ProfessionalService', 'MedicalBusiness',
+    'HealthAndBeautyBusiness', 'FoodEstablishment', 'AutomotiveBusiness', 'HomeAndConstructionBusiness',
+)
+BUSINESS_TYPE_SUFFIXES = ('Business', 'Store', 'Clinic', 'Service', 'Shop')
+
+SOCIAL_NETWORKS = {
+    'facebook.com': 'facebook',
+    'instagram.com': 'instagram',
+    'twitter.com': 'twitter',
+    'x.com': 'twitter',
+    'linkedin.com': 'linkedin',
+    'youtube.com': 'youtube',
+    'tiktok.com': 'tiktok',
+}
+COUNTRY_NAMES = {'es': 'España', 'esp': 'España', 'spain': 'España', 'españa': 'España'}
+
+# Fields extracted for every business (key, description in the prompt)
+BUSINESS_FIELDS = (
+    ('business_name', 'Nombre del negocio'),
+    ('industry', 'Tipo de negocio/industria (ej: veterinary, dental, hair_salon, restaurant, auto_repair, etc.)'),
+    ('address', 'Dirección física completa'),
+    ('city', 'Ciudad'),
+    ('postal_code', 'Código postal'),
+    ('country', 'País (por defecto "España")'),
+    ('phone', 'Teléfono principal'),
+    ('email', 'Email de contacto'),
+    ('services', 'Lista de servicios ofrecidos (array de strings, máximo 20)'),
+    ('hours', 'Horarios de atención (objeto con claves para cada día o rango: "mon-fri", "sat", "sun", etc.)'),
+    ('description', 'Breve descripción del negocio (1-2 frases)'),
+    ('additional_phones', 'Otros teléfonos (array)'),
+    ('additional_emails', 'Otros emails (array)'),
+    ('social_media', 'Redes sociales encontradas (objeto con claves: facebook, instagram, twitter, etc.)'),
+)
+
+# Bedrock model and prompt version (bump the version whenever the prompt or
+# its post-processing changes, so cached extractions are not reused)
+BEDROCK_MODEL_ID = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+PROMPT_VERSION = 'business-extraction-v1'
+
+# Stream completions and stop reading at the end of the JSON object
+BEDROCK_STREAMING_ENABLED = os.environ.get('BEDROCK_STREAMING_ENABLED', 'true').lower() == 'true'
+
+# Bedrock admission control shared by all containers (bedrock_limits /
+# bedrock_leases tables): at most BEDROCK_MAX_CONCURRENCY calls in flight
+# and a BEDROCK_TOKENS_PER_MINUTE token bucket per model. These defaults
+# create the model's limit row; afterwards the row's values apply.
+BEDROCK_ADMISSION_ENABLED = os.environ.get('BEDROCK_ADMISSION_ENABLED', 'true').lower() == 'true'
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '8'))
+BEDROCK_TOKENS_PER_MINUTE = int(os.environ.get('BEDROCK_TOKENS_PER_MINUTE', '200000'))
+BEDROCK_ADMISSION_MAX_WAIT_SECONDS = int(os.environ.get('BEDROCK_ADMISSION_MAX_WAIT_SECONDS', '30'))
+BEDROCK_ADMISSION_POLL_SECONDS = 0.5
+BEDROCK_LEASE_TTL_SECONDS = 300
+
+# Throttled calls are retried with a delay that doubles on every throttle
+# and halves after every success (per container); a throttle also pauses
+# admission in all containers for that delay
+BEDROCK_MAX_ATTEMPTS = 5
+BEDROCK_BACKOFF_BASE_SECONDS = 1.0
+BEDROCK_BACKOFF_MAX_SECONDS = 20.0
+BEDROCK_RETRYABLE_ERRORS = ('ThrottlingException', 'ServiceUnavailableException', 'ModelNotReadyException')
+
+# Extraction cache: Postgres (shared across containers) + in-process LRU.
+# The cache, Bedrock backoff/admission and JSON stream helpers are duplicated
+# in the knowledge-base-processor lambda (no shared Python layer); keep both copies in sync.
+EXTRACTION_CACHE_ENABLED = os.environ.get('EXTRACTION_CACHE_ENABLED', 'true').lower() == 'true'
+EXTRACTION_CACHE_TTL_HOURS = int(os.environ.get('EXTRACTION_CACHE_TTL_HOURS', '168'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+EXTRACTION_CACHE_LRU_SIZE = 128
+# Fraction of cache writes that also purge expired rows and enforce
+# EXTRACTION_CACHE_MAX_BYTES, so most writes are a single upsert
+EXTRACTION_CACHE_EVICTION_SAMPLE_RATE = float(os.environ.get('EXTRACTION_CACHE_EVICTION_SAMPLE_RATE', '0.05'))
+
+# In-process LRU of cache_key -> extracted JSON (survives warm invocations)
+extraction_lru: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+extraction_lru_lock = Lock()
+
+# Multi-page crawl settings (homepage + same-origin subpages)
+CRAWL_ENABLED = os.environ.get('SCRAPER_CRAWL_ENABLED', 'true').lower() == 'true'
+CRAWL_MAX_PAGES = int(os.environ.get('SCRAPER_CRAWL_MAX_PAGES', '6'))
+CRAWL_MAX_WORKERS = int(os.environ.get('SCRAPER_CRAWL_MAX_WORKERS', '5'))
+CRAWL_MAX_BYTES = int(os.environ.get('SCRAPER_CRAWL_MAX_BYTES', str(5 * 1024 * 1024)))
+CRAWL_PAGE_TIMEOUT = 10
+
+# SQS records processed in parallel per invocation (I/O-bound: fetch + Bedrock)
+SCRAPER_MAX_CONCURRENT_RECORDS = int(os.environ.get('SCRAPER_MAX_CONCURRENT_RECORDS', '10'))
+# Time kept free at the end of an invocation to report unfinished records
+# as batch item failures instead of timing out with the whole batch
+SCRAPER_TIME_MARGIN_SECONDS = 10
+
+# Bulk re-scrape (bulk_rescrape_handler): sites crawled in parallel, Bedrock
+# extractions in flight, results per batched DB write / checkpoint, and the
+# time kept free at the end of an invocation to drain in-flight sites
+BULK_FETCH_CONCURRENCY = int(os.environ.get('SCRAPER_BULK_FETCH_CONCURRENCY', '16'))
+BULK_LLM_CONCURRENCY = int(os.environ.get('SCRAPER_BULK_LLM_CONCURRENCY', '4'))
+BULK_WRITE_BATCH_SIZE = int(os.environ.get('SCRAPER_BULK_WRITE_BATCH_SIZE', '50'))
+BULK_TIME_MARGIN_SECONDS = 90
+# Items failing with a transient error are left pending for the next
+# invocation until they have been attempted this many times
+BULK_MAX_ATTEMPTS = int(os.environ.get('SCRAPER_BULK_MAX_ATTEMPTS', '3'))
+
+# Failures that are stored on business_info and not retried (a bad URL, an
+# unreachable site or unparseable LLM output will not fix itself on retry)
+EXPECTED_SCRAPE_ERRORS = (
+    ValueError,  # Includes json.JSONDecodeError
+    requests.exceptions.Timeout,
+    requests.exceptions.ConnectionError,  # Includes SSLError
+    requests.exceptions.HTTPError,
+)  # HostBusyError is not listed: the SQS message is redelivered once the host has cooled down
+
+# Path keywords that usually hold contact details, hours or services
+CRAWL_KEYWORDS = (
+    'contact', 'contacto', 'servicio', 'service', 'horario', 'hours',
+    'donde-estamos', 'ubicacion', 'localizacion', 'quienes-somos',
+    'sobre-nosotros', 'nosotros', 'about', 'tarifa', 'precio', 'cita',
+)
+
+# Links that are never worth fetching as a content page
+CRAWL_SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip',
+    '.mp4', '.mp3', '.css', '.js', '.xml', '.ico', '.doc', '.docx',
+)
+
+# Streaming download limits (raw bytes). Reading stops early once enough
+# cleaned HTML has been collected to fill MAX_HTML_LENGTH.
+MAX_RESPONSE_BYTES = int(os.environ.get('SCRAPER_MAX_RESPONSE_BYTES', str(2 * 1024 * 1024)))
+MAX_REDIRECT_CHAIN_BYTES = int(os.environ.get('SCRAPER_MAX_REDIRECT_CHAIN_BYTES', str(3 * 1024 * 1024)))
+STREAM_CHUNK_SIZE = 16 * 1024
+CHARSET_SNIFF_BYTES = 4096
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+XML_CONTENT_TYPES = ('application/xml', 'text/xml')
+
+# Blocks removed by clean_html_fragment; a streamed chunk is only cleaned up to
+# a point where none of them is left open
+NOISE_BLOCKS = (
+    ('<script', '</script>'),
+    ('<style', '</style>'),
+    ('<!--', '-->'),
+    ('<svg', '</svg>'),
+    ('<noscript', '</noscript>'),
+)
+
+# Single-pass noise stripper: one alternation finds the next block opener,
+# one compiled pattern per block type finds its closer
+NOISE_OPENER_PATTERN = re.compile(r'<(?:(script)|(style)|(svg)|(noscript)|!--)', re.IGNORECASE)
+NOISE_CLOSER_PATTERNS = {
+    1: re.compile(r'</script>', re.IGNORECASE),
+    2: re.compile(r'</style>', re.IGNORECASE),
+    3: re.compile(r'</svg>', re.IGNORECASE),
+    4: re.compile(r'</noscript>', re.IGNORECASE),
+    None: re.compile(r'-->'),
+}
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DATA_ATTRIBUTE_PATTERN = re.compile(r'\s+data-[\w-]+="[^"]*"')
+
+# Lowercases ASCII only, so indexes into the result match the original
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# Charset detection (detect_stream_encoding)
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+LEGACY_ENCODINGS = {'iso8859-1': 'cp1252', 'ascii': 'cp1252'}
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+HREF_PATTERN = re.compile(r'<a\s[^>]*?href\s*=\s*["\']([^"\'#][^"\']*)["\']', re.IGNORECASE)
+SITEMAP_LOC_PATTERN = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+
+def get_bedrock_client():
+    """Get the Bedrock runtime client (created on first use)"""
+    global bedrock_client
+
+    if bedrock_client is None:
+        # boto3's default session is not thread-safe to build clients from
+        with aws_clients_lock:
+            if bedrock_client is None:
+                # Throttling retries are made by invoke_bedrock_json (adaptive,
+                # shared with the admission limiter), not by botocore
+                bedrock_client = boto3.client(
+                    'bedrock-runtime',
+                    region_name='eu-west-1',
+                    config=Config(retries={'mode': 'standard', 'max_attempts': 1}),
+                )
+    return bedrock_client
+
+
+def get_secretsmanager_client():
+    """Get the Secrets Manager client (created on first use)"""
+    global secretsmanager_client
+
+    if secretsmanager_client is None:
+        with aws_clients_lock:
+            if secretsmanager_client is None:
+                secretsmanager_client = boto3.client('secretsmanager', region_name='eu-west-1')
+    return secretsmanager_client
+
 
 def get_db_connection():
     """Get PostgreSQL connection (with caching)"""
@@ -54,7 +416,7 @@ def get_db_connection():
     secret_name = os.environ.get('DB_SECRET_NAME', 'consultia/database/credentials')
 
     try:
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
+        response = get_secretsmanager_client().get_secret_value(SecretId=secret_name)
         secret = json.loads(response['SecretString'])
 
         db_conn = psycopg2.connect(
@@ -80,6 +442,14 @@ def get_http_session() -> requests.Session:
 
     if http_session is None:
         http_session = requests.Session()
+        # Connect to the IPs validate_url_safe checked, with room for crawl
+        # workers and one host pool per site of a bulk re-scrape
+        adapter = PinnedIPAdapter(
+            pool_connections=max(10, BULK_FETCH_CONCURRENCY),
+            pool_maxsize=max(10, CRAWL_MAX_WORKERS * 2),
+        )
+        http_session.mount('http://', adapter)
+        http_session.mount('https://', adapter)
         http_session.headers.update({
             'User-Agent': 'Mozilla/5.0 (compatible; ConsultIA Bot/1.0; +https://consultia.es)',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -89,27 +459,273 @@ def get_http_session() -> requests.Session:
     return http_session
 
 
-def strip_html_noise(html: str) -> str:
+def clean_html_fragment(html: str) -> str:
+    """
+    Remove scripts, styles, comments, svg/noscript blocks, data-* attributes
+    and excessive whitespace to reduce token usage, keeping the content tags
+    the LLM needs. No final strip(), so consecutive fragments of a streamed
+    document can be concatenated.
+
+    Single left-to-right scan: at each script/style/svg/noscript/comment
+    opener the matching closer is located and the whole block skipped. The
+    kept text is then joined once and has whitespace collapsed and data-*
+    attributes removed. Closer lookups are memoized per block type, so
+    documents with many unclosed openers stay linear instead of rescanning
+    to the end for each one.
+
+    Output is identical to running the individual regex passes one after the
+    other (script, style, comment, svg, noscript, whitespace, data-*), except
+    for documents where blocks of different types interleave without nesting
+    (e.g. a comment that opens before a script and closes inside it); there
+    the leftmost block wins, as it does in a browser.
+    """
+    parts: List[str] = []
+    # Last closer lookup per block type: (searched from, match start, match end)
+    closer_cache: Dict[Any, Tuple[int, int, int]] = {}
+    no_gt_after = len(html) + 1
+
+    def find_closer(kind: Any, start: int) -> Tuple[int, int]:
+        cached = closer_cache.get(kind)
+        if cached and cached[0] <= start and (cached[1] == -1 or start <= cached[1]):
+            return cached[1], cached[2]
+        match = NOISE_CLOSER_PATTERNS[kind].search(html, start)
+        found = (match.start(), match.end()) if match else (-1, -1)
+        closer_cache[kind] = (start, found[0], found[1])
+        return found
+
+    kept_from = 0
+    pos = 0
+
+    while True:
+        opener = NOISE_OPENER_PATTERN.search(html, pos)
+        if not opener:
+            break
+
+        kind = opener.lastindex
+        body_start = opener.end()
+        if kind is not None:
+            # Tag openers need their closing '>' (regex: <script[^>]*>)
+            gt = html.find('>', body_start) if body_start < no_gt_after else -1
+            if gt == -1:
+                no_gt_after = min(no_gt_after, body_start)
+                pos = opener.start() + 1
+                continue
+            body_start = gt + 1
+
+        closer_start, closer_end = find_closer(kind, body_start)
+        if closer_start == -1:
+            # Unclosed block is kept as text, like the regex passes do
+            pos = opener.start() + 1
+            continue
+
+        parts.append(html[kept_from:opener.start()])
+        kept_from = pos = closer_end
+
+    parts.append(html[kept_from:])
+
+    # Whitespace and data-* attributes are normalized once over the kept text
+    kept = WHITESPACE_PATTERN.sub(' ', ''.join(parts))
+    return DATA_ATTRIBUTE_PATTERN.sub('', kept)
+
+
+def find_safe_cut(html: str) -> int:
+    """
+    Find the longest prefix of a partially downloaded document that can be
+    cleaned on its own: it ends right after a tag and leaves no script,
+    style, comment, svg or noscript block open.
+
+    Returns:
+        Length of the safe prefix (0 if nothing can be cleaned yet)
+    """
+    lowered = html.translate(ASCII_LOWER)
+    cut = lowered.rfind('>') + 1
+
+    moved = True
+    while moved and cut > 0:
+        moved = False
+        for opener, closer in NOISE_BLOCKS:
+            start = lowered.rfind(opener, 0, cut)
+            if start == -1:
+                continue
+            end = lowered.find(closer, start)
+            if end == -1 or end + len(closer) > cut:
+                cut = start
+                moved = True
+
+    return cut
+
+
+def find_cut_blocker(html: str) -> Optional[str]:
+    """
+    For a buffer where find_safe_cut found nothing to cut: the string that
+    has to arrive before it can (the closer of a noise block left open at
+    the start, or the first '>'), so later chunks only need to search the
+    new text for it.
+
+    Returns:
+        The awaited string, or None if the buffer is blocked some other way
+        (blocks of different types interleaving)
+    """
+    lowered = html.translate(ASCII_LOWER)
+    for opener, closer in NOISE_BLOCKS:
+        if lowered.startswith(opener):
+            return closer if closer not in lowered else None
+    return '>' if '>' not in lowered else None
+
+
+def detect_stream_encoding(content_type: str, head: bytes) -> str:
+    """
+    Pick the decoder for a streamed page from its headers or first bytes,
+    cheapest tier first:
+
+    1. Byte order mark
+    2. charset in the Content-Type header
+    3. <meta charset> / http-equiv in the first CHARSET_SNIFF_BYTES
+    4. UTF-8, if those bytes are valid UTF-8 (pure ASCII included)
+    5. Statistical detection (charset_normalizer) on those bytes only
+
+    Latin-1 / ASCII labels are read as Windows-1252, as browsers do.
+    """
+    head = head[:CHARSET_SNIFF_BYTES]
+
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if head.startswith(bom):
+            return encoding
+
+    for source in (content_type, head.decode('ascii', errors='ignore')):
+        match = CHARSET_PATTERN.search(source)
+        if match:
+            try:
+                encoding = codecs.lookup(match.group(1)).name
+            except LookupError:
+                continue
+            return LEGACY_ENCODINGS.get(encoding, encoding)
+
+    try:
+        # Not final: a multi-byte character may be cut at the end of head
+        codecs.getincrementaldecoder('utf-8')().decode(head)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    best = charset_normalizer.from_bytes(head).best()
+    if best is None:
+        return 'cp1252'
+    encoding = codecs.lookup(best.encoding).name
+    logger.info(f"[Scraper] No declared charset, detected {encoding}")
+    return LEGACY_ENCODINGS.get(encoding, encoding)
+
+
+def decode_invalid_utf8_as_cp1252(error: UnicodeError) -> Tuple[str, int]:
+    """
+    Decode error handler for pages that mix UTF-8 with Latin-1 text: bytes
+    that are not valid UTF-8 are read as Windows-1252 instead of U+FFFD.
+    """
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    return error.object[error.start:error.end].decode('cp1252', errors='replace'), error.end
+
+
+codecs.register_error('cp1252-fallback', decode_invalid_utf8_as_cp1252)
+
+
+def make_stream_decoder(encoding: str) -> codecs.IncrementalDecoder:
+    """Incremental decoder for a page; UTF-8 pages tolerate stray Latin-1 bytes"""
+    errors = 'cp1252-fallback' if encoding in ('utf-8', 'utf-8-sig') else 'replace'
+    return codecs.getincrementaldecoder(encoding)(errors=errors)
+
+
+def read_html_stream(response: requests.Response, max_bytes: int, max_cleaned_chars: int) -> Tuple[str, int, List[str]]:
     """
-    Remove scripts, styles, and excessive whitespace to reduce token usage.
-    Keeps the actual content tags that the LLM needs.
+    Read a streamed response, cleaning HTML incrementally as chunks arrive.
+
+    Stops reading as soon as max_cleaned_chars of cleaned HTML exist or
+    max_bytes raw bytes have been read, whichever comes first. JSON-LD
+    blocks are collected before their <script> is stripped.
+
+    While a block left open at the start of the buffer (e.g. a huge inline
+    script) keeps anything from being cleaned, only the newly arrived text
+    is searched for its closer (see find_cut_blocker), so an unterminated
+    block costs linear rather than quadratic time.
+
+    Returns:
+        Tuple of (cleaned HTML, raw bytes read, raw JSON-LD blocks)
     """
-    # Remove script tags and content
-    html = re.sub(r'<script[^>]*>[\s\S]*?</script>', '', html, flags=re.IGNORECASE)
-    # Remove style tags and content
-    html = re.sub(r'<style[^>]*>[\s\S]*?</style>', '', html, flags=re.IGNORECASE)
-    # Remove HTML comments
-    html = re.sub(r'<!--[\s\S]*?-->', '', html)
-    # Remove SVG blocks
-    html = re.sub(r'<svg[^>]*>[\s\S]*?</svg>', '', html, flags=re.IGNORECASE)
-    # Remove noscript
-    html = re.sub(r'<noscript[^>]*>[\s\S]*?</noscript>', '', html, flags=re.IGNORECASE)
-    # Collapse multiple whitespace/newlines
-    html = re.sub(r'\s+', ' ', html)
-    # Remove data attributes to save tokens
-    html = re.sub(r'\s+data-[\w-]+="[^"]*"', '', html)
+    decoder = None
+    pending = ''
+    # (string that must arrive before anything can be cut, where to search from)
+    blocker: Optional[Tuple[str, int]] = None
+    parts: List[str] = []
+    json_ld: List[str] = []
+    json_ld_len = 0
+    cleaned_len = 0
+    bytes_read = 0
+
+    def append_cleaned(fragment: str):
+        nonlocal cleaned_len, json_ld_len
+        # Fragments end at a safe cut, so <script> blocks are never split
+        if STRUCTURED_DATA_ENABLED and json_ld_len < MAX_JSON_LD_CHARS:
+            for block in JSON_LD_PATTERN.findall(fragment):
+                json_ld.append(block)
+                json_ld_len += len(block)
+        piece = clean_html_fragment(fragment)
+        # Keep whitespace collapsed across fragment boundaries
+        if parts and parts[-1].endswith(' ') and piece.startswith(' '):
+            piece = piece[1:]
+        if piece:
+            parts.append(piece)
+            cleaned_len += len(piece)
+
+    head = b''
+
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        bytes_read += len(chunk)
+
+        # Hold back the first bytes until there is enough to sniff <meta charset>
+        if decoder is None:
+            head += chunk
+            if len(head) < CHARSET_SNIFF_BYTES and bytes_read < max_bytes:
+                continue
+            encoding = detect_stream_encoding(response.headers.get('Content-Type', ''), head)
+            decoder = make_stream_decoder(encoding)
+            chunk, head = head, b''
+
+        pending += decoder.decode(chunk)
+
+        if blocker:
+            needle, search_from = blocker
+            if pending[search_from:].translate(ASCII_LOWER).find(needle) == -1:
+                blocker = (needle, max(0, len(pending) - len(needle) + 1))
+            else:
+                blocker = None
+
+        if not blocker:
+            cut = find_safe_cut(pending)
+            if cut:
+                append_cleaned(pending[:cut])
+                pending = pending[cut:]
+            elif pending:
+                needle = find_cut_blocker(pending)
+                if needle:
+                    blocker = (needle, max(0, len(pending) - len(needle) + 1))
+
+        if cleaned_len >= max_cleaned_chars:
+            logger.info(f"[Scraper] Collected {cleaned_len} cleaned chars after {bytes_read} bytes, stopping early")
+            pending = ''
+            break
+        if bytes_read >= max_bytes:
+            logger.info(f"[Scraper] Response exceeded {max_bytes} bytes, stopping")
+            break
 
-    return html.strip()
+    if decoder is None:
+        encoding = detect_stream_encoding(response.headers.get('Content-Type', ''), head)
+        decoder = make_stream_decoder(encoding)
+        pending = decoder.decode(head)
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        append_cleaned(pending)
+
+    return ''.join(parts).strip(), bytes_read, json_ld
 
 
 def validate_url_safe(url: str) -> str:
@@ -153,67 +769,1660 @@ def validate_url_safe(url: str) -> str:
         raise ValueError(f"Blocked hostname: {hostname}")
 
     # Resolve hostname to IP and check if it's private/reserved
+    resolve_safe_ips(hostname)
+
+    return url
+
+
+def resolve_safe_ips(hostname: str) -> List[str]:
+    """
+    Resolve a hostname and check every address against private/reserved
+    ranges. Results are cached for DNS_CACHE_TTL_SECONDS, so a host is
+    looked up once per job instead of once per hop and again on connect.
+
+    Returns:
+        Validated IP addresses, in resolver order
+
+    Raises:
+        ValueError if the hostname cannot be resolved or any address is blocked
+    """
+    key = hostname.lower()
+    now = time.monotonic()
+
+    with dns_cache_lock:
+        cached = dns_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
     try:
         resolved_ips = socket.getaddrinfo(hostname, None)
-        for family, _, _, _, sockaddr in resolved_ips:
-            ip = ipaddress.ip_address(sockaddr[0])
-            if ip.is_private or ip.is_reserved or ip.is_loopback or ip.is_link_local:
-                raise ValueError(f"URL resolves to blocked IP range: {ip}")
     except socket.gaierror:
         raise ValueError(f"Cannot resolve hostname: {hostname}")
 
-    return url
+    ips: List[str] = []
+    for family, _, _, _, sockaddr in resolved_ips:
+        ip = ipaddress.ip_address(sockaddr[0])
+        if ip.is_private or ip.is_reserved or ip.is_loopback or ip.is_link_local:
+            raise ValueError(f"URL resolves to blocked IP range: {ip}")
+        if str(ip) not in ips:
+            ips.append(str(ip))
+
+    # Only fully validated results are cached
+    with dns_cache_lock:
+        dns_cache[key] = (now + DNS_CACHE_TTL_SECONDS, ips)
+
+    return ips
+
+
+def is_connect_error(error: requests.exceptions.ConnectionError) -> bool:
+    """Whether a requests ConnectionError happened while connecting, before the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
 
 
-def fetch_website(url: str) -> str:
+class PinnedIPAdapter(HTTPAdapter):
+    """
+    Transport adapter that connects to an address returned by
+    resolve_safe_ips instead of letting urllib3 resolve the hostname again.
+
+    The request URL is rewritten to the IP for the connection only; the Host
+    header, TLS SNI and certificate hostname check all keep the original
+    name, and the request/response URLs are restored afterwards so cookies
+    and redirects behave as before. This removes the second DNS lookup and
+    the rebinding window between validation and connect. If an address
+    refuses or times out the connection, the next validated one is tried.
     """
-    Fetch website HTML content.
 
-    Args:
-        url: The URL to fetch
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parsed = urlparse(original_url)
+        hostname = parsed.hostname
+
+        # IP literals need no lookup; behind a proxy the proxy resolves
+        if select_proxy(original_url, kwargs.get('proxies')):
+            return super().send(request, **kwargs)
+        try:
+            ipaddress.ip_address(hostname)
+            return super().send(request, **kwargs)
+        except ValueError:
+            pass
+
+        host_header = f'{hostname}:{parsed.port}' if parsed.port else hostname
+        request.pinned_hostname = hostname
+
+        # Try the validated addresses in resolver order, moving on only when
+        # the connection itself fails (nothing was sent to that address)
+        ips = resolve_safe_ips(hostname)
+        for attempt, ip in enumerate(ips, start=1):
+            ip_host = f'[{ip}]' if ':' in ip else ip
+            request.url = parsed._replace(netloc=f'{ip_host}:{parsed.port}' if parsed.port else ip_host).geturl()
+            request.headers['Host'] = host_header
+
+            try:
+                response = super().send(request, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                if attempt == len(ips) or not is_connect_error(e):
+                    raise
+                logger.warning(f"[Scraper] Cannot connect to {hostname} at {ip}, trying next address")
+                continue
+            finally:
+                request.url = original_url
+                del request.headers['Host']
+
+            response.url = original_url
+            return response
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+
+        hostname = getattr(request, 'pinned_hostname', None)
+        if hostname and host_params['scheme'] == 'https':
+            # SNI and certificate verification against the original name
+            pool_kwargs['server_hostname'] = hostname
+            pool_kwargs['assert_hostname'] = hostname
+
+        return host_params, pool_kwargs
+
+
+class RobotsDisallowedError(ValueError):
+    """The site's robots.txt disallows fetching the URL"""
+
+
+class HostBusyError(requests.exceptions.RequestException):
+    """The host asked us (429/503, Retry-After) to wait longer than HOST_MAX_WAIT_SECONDS"""
+
+
+class HostPoliteness:
+    """
+    Per-server request gate (see POLITENESS_ENABLED): a concurrency
+    semaphore plus adaptive spacing of request starts for every key.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+
+    def state(self, key: str) -> Dict[str, Any]:
+        with self.lock:
+            host = self.hosts.get(key)
+            if host is None:
+                host = self.hosts[key] = {
+                    'slots': Semaphore(HOST_MAX_CONCURRENCY),
+                    'interval': HOST_MIN_INTERVAL_SECONDS,
+                    'next_start': 0.0,
+                    'throttles': 0,
+                }
+            return host
+
+    @contextmanager
+    def slot(self, key: str):
+        """Hold one of the host's concurrent fetch slots"""
+        slots = self.state(key)['slots']
+        if not slots.acquire(timeout=HOST_MAX_WAIT_SECONDS):
+            raise HostBusyError(f"No free connection slot for {key} after {HOST_MAX_WAIT_SECONDS:.0f}s")
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def wait_turn(self, key: str, min_interval: float = 0.0):
+        """Sleep until the host's next request may start, and book the following one"""
+        host = self.state(key)
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, host['next_start'])
+            if start - now > HOST_MAX_WAIT_SECONDS:
+                raise HostBusyError(f"{key} asked us to wait {start - now:.0f}s")
+            host['next_start'] = start + max(host['interval'], min_interval)
+        if start > now:
+            time.sleep(start - now)
+
+    def on_throttle(self, key: str, retry_after: Optional[float]) -> float:
+        """Record a 429/503: double the spacing and pause the host; returns the pause"""
+        host = self.state(key)
+        with self.lock:
+            host['interval'] = min(HOST_MAX_INTERVAL_SECONDS, host['interval'] * 2)
+            host['throttles'] += 1
+            pause = retry_after if retry_after is not None else host['interval']
+            host['next_start'] = max(host['next_start'], time.monotonic() + pause)
+            return pause
+
+    def on_success(self, key: str):
+        host = self.state(key)
+        with self.lock:
+            host['interval'] = max(HOST_MIN_INTERVAL_SECONDS, host['interval'] * 0.75)
+
+
+host_politeness = HostPoliteness()
+
+
+def politeness_key(url: str) -> str:
+    """Gate key of a URL: the server IP it is pinned to (cached lookup), else its hostname"""
+    hostname = (urlparse(url).hostname or '').lower()
+    try:
+        ipaddress.ip_address(hostname)
+        return hostname
+    except ValueError:
+        pass
+    try:
+        return resolve_safe_ips(hostname)[0]
+    except ValueError:
+        return hostname
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date); None if absent or invalid"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def fetch_robots_rules(origin: str) -> Optional[RobotFileParser]:
+    """
+    Fetch and parse origin/robots.txt (redirects followed and SSRF-checked).
 
     Returns:
-        Cleaned HTML string
+        Parsed rules, or None when there are none (no robots.txt or 4xx)
+
+    Raises:
+        requests exceptions / ValueError when robots.txt cannot be fetched
+    """
+    session = get_http_session()
+    url = validate_url_safe(f"{origin}/robots.txt")
+
+    for _ in range(3):
+        response = session.get(url, timeout=ROBOTS_TIMEOUT, allow_redirects=False, stream=True)
+        try:
+            if response.is_redirect and 'Location' in response.headers:
+                url = validate_url_safe(urljoin(url, response.headers['Location']))
+                continue
+            if 400 <= response.status_code < 500:
+                return None
+            response.raise_for_status()
+
+            body = b''
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                body += chunk
+                if len(body) >= ROBOTS_MAX_BYTES:
+                    break
+        finally:
+            response.close()
+
+        rules = RobotFileParser()
+        rules.parse(body[:ROBOTS_MAX_BYTES].decode('utf-8', errors='replace').splitlines())
+        return rules
+
+    return None
+
+
+def get_robots_rules(url: str) -> Optional[RobotFileParser]:
+    """robots.txt rules of the URL's origin, cached for ROBOTS_CACHE_TTL_SECONDS (one fetch per origin at a time)"""
+    parsed = urlparse(url)
+    origin = f"{parsed.scheme}://{parsed.netloc}".lower()
+
+    with robots_cache_lock:
+        cached = robots_cache.get(origin)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        origin_lock = robots_locks.setdefault(origin, Lock())
+
+    with origin_lock:
+        with robots_cache_lock:
+            cached = robots_cache.get(origin)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        try:
+            rules = fetch_robots_rules(origin)
+            ttl = ROBOTS_CACHE_TTL_SECONDS
+        except Exception as e:
+            logger.info(f"[Politeness] robots.txt of {origin} unavailable, allowing: {str(e)[:100]}")
+            rules = None
+            ttl = ROBOTS_ERROR_TTL_SECONDS
+
+        with robots_cache_lock:
+            robots_cache[origin] = (time.monotonic() + ttl, rules)
+
+    return rules
+
+
+@contextmanager
+def host_fetch_slot(url: str):
+    """Hold a concurrent fetch slot of the URL's server for a whole page fetch"""
+    if not POLITENESS_ENABLED:
+        yield
+        return
+    with host_politeness.slot(politeness_key(url)):
+        yield
+
+
+def polite_get(url: str, timeout: int, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    Issue one streamed GET (no redirects) as a polite client: check
+    robots.txt, wait for the host's turn, and on 429/503 back off (per
+    Retry-After) and retry up to HOST_MAX_ATTEMPTS times in total.
 
     Raises:
-        Exception on network errors or non-200 responses
+        RobotsDisallowedError if robots.txt disallows the URL,
+        HostBusyError if the host keeps throttling or asks for a long wait,
+        requests exceptions on network errors
     """
     session = get_http_session()
 
+    if not POLITENESS_ENABLED:
+        return session.get(url, timeout=timeout, allow_redirects=False, stream=True, headers=headers)
+
+    rules = get_robots_rules(url)
+    crawl_delay = 0.0
+    if rules is not None:
+        if not rules.can_fetch(ROBOTS_USER_AGENT, url):
+            raise RobotsDisallowedError(f"Disallowed by robots.txt: {url}")
+        crawl_delay = min(float(rules.crawl_delay(ROBOTS_USER_AGENT) or 0), ROBOTS_MAX_CRAWL_DELAY)
+
+    key = politeness_key(url)
+
+    for attempt in range(1, HOST_MAX_ATTEMPTS + 1):
+        host_politeness.wait_turn(key, crawl_delay)
+        response = session.get(url, timeout=timeout, allow_redirects=False, stream=True, headers=headers)
+
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            host_politeness.on_success(key)
+            return response
+
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        response.close()
+        pause = host_politeness.on_throttle(key, retry_after)
+        logger.warning(f"[Politeness] HTTP {response.status_code} from {urlparse(url).hostname} ({key}), pausing {pause:.1f}s")
+
+        if pause > HOST_MAX_WAIT_SECONDS:
+            break
+
+    raise HostBusyError(f"{urlparse(url).hostname} keeps answering HTTP {response.status_code}")
+
+
+def fetch_page(
+    url: str,
+    timeout: int = 20,
+    accept_types: Tuple[str, ...] = HTML_CONTENT_TYPES,
+    max_cleaned_chars: int = MAX_HTML_LENGTH,
+    validators: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch a single page with a streaming, byte-capped download, following
+    redirects manually so every hop is validated against SSRF.
+
+    When validators from a previous fetch are given, the hop that reached
+    the stored final URL is sent If-None-Match / If-Modified-Since, and a
+    304 response is returned without a body.
+
+    Args:
+        url: The URL to fetch
+        timeout: Per-request timeout in seconds
+        accept_types: Content-Types accepted for the final response
+        max_cleaned_chars: Stop reading once this much cleaned HTML exists
+        validators: Stored 'final_url', 'etag' and 'last_modified' for url
+
+    Returns:
+        Dict with 'requested_url', final 'url', cleaned 'html', raw
+        'json_ld' blocks, raw 'bytes_read', 'not_modified', the response
+        'etag' / 'last_modified' and the SHA-256 'digest' of the cleaned
+        HTML and JSON-LD
+
+    Requests go through polite_get and hold one of the server's fetch
+    slots (host_fetch_slot) for the whole download.
+
+    Raises:
+        ValueError if the URL is unsafe or the Content-Type is not accepted
+        (RobotsDisallowedError if robots.txt disallows it), HostBusyError if
+        the host keeps throttling, requests exceptions on network errors or
+        non-200 responses
+    """
     # Validate URL is safe (blocks SSRF to internal networks / AWS metadata)
     url = validate_url_safe(url)
 
-    logger.info(f"[Scraper] Fetching {url}")
+    with host_fetch_slot(url):
+        return fetch_page_in_slot(url, timeout, accept_types, max_cleaned_chars, validators)
+
+
+def fetch_page_in_slot(
+    url: str,
+    timeout: int,
+    accept_types: Tuple[str, ...],
+    max_cleaned_chars: int,
+    validators: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Body of fetch_page, run while holding the host's fetch slot (url is already validated)"""
+    requested_url = url
+
+    def conditional_headers(hop_url: str) -> Dict[str, str]:
+        if not validators or validators.get('final_url') != hop_url:
+            return {}
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def get_following_redirects(conditional: bool) -> Tuple[requests.Response, str, int]:
+        """
+        GET requested_url and follow redirects manually, validating each
+        target against SSRF. Returns (final response, final URL, bytes of
+        drained redirect bodies).
+        """
+        hop_url = requested_url
+        chain_bytes = 0
+        response = polite_get(hop_url, timeout, headers=conditional_headers(hop_url) if conditional else {})
+
+        try:
+            max_redirects = 5
+            for _ in range(max_redirects):
+                if not response.is_redirect or 'Location' not in response.headers:
+                    break
+                redirect_url = response.headers['Location']
+                # Resolve relative redirects (e.g. "/path") against current URL
+                redirect_url = urljoin(hop_url, redirect_url)
+                redirect_url = validate_url_safe(redirect_url)
+
+                # Drain small redirect bodies so the pooled connection is reused
+                body_length = int(response.headers.get('Content-Length') or 0)
+                if 0 < body_length <= MAX_REDIRECT_CHAIN_BYTES - chain_bytes:
+                    chain_bytes += len(response.content)
+                response.close()
+
+                hop_url = redirect_url
+                response = polite_get(redirect_url, timeout, headers=conditional_headers(redirect_url) if conditional else {})
+        except Exception:
+            response.close()
+            raise
+
+        return response, hop_url, chain_bytes
+
+    response, url, chain_bytes = get_following_redirects(conditional=True)
 
-    response = session.get(url, timeout=20, allow_redirects=False)
+    try:
+        if response.status_code == 304 and not conditional_headers(url):
+            # No validators were sent for the final URL, so the 304 has
+            # nothing to refer to; treat it as a miss and fetch the page in
+            # full, through the same validated redirect chain
+            response.close()
+            response, url, chain_bytes = get_following_redirects(conditional=False)
+            if response.status_code == 304:
+                raise requests.exceptions.HTTPError("304 Not Modified for an unconditional request", response=response)
+        response.raise_for_status()
+
+        page = {
+            'requested_url': requested_url,
+            'url': url,
+            'html': '',
+            'json_ld': [],
+            'bytes_read': chain_bytes,
+            'not_modified': response.status_code == 304,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'digest': None,
+        }
 
-    # Follow redirects manually, validating each target against SSRF
-    max_redirects = 5
-    for _ in range(max_redirects):
-        if not response.is_redirect or 'Location' not in response.headers:
-            break
-        redirect_url = response.headers['Location']
-        # Resolve relative redirects (e.g. "/path") against current URL
-        redirect_url = urljoin(url, redirect_url)
-        redirect_url = validate_url_safe(redirect_url)
-        url = redirect_url
-        response = session.get(redirect_url, timeout=20, allow_redirects=False)
-    response.raise_for_status()
+        if page['not_modified']:
+            # Servers may omit validators on 304; keep the ones we sent
+            page['etag'] = page['etag'] or validators.get('etag')
+            page['last_modified'] = page['last_modified'] or validators.get('last_modified')
+            page['digest'] = validators.get('content_digest')
+            return page
+
+        content_type = response.headers.get('Content-Type', '')
+        mime_type = content_type.split(';')[0].strip().lower()
+        if mime_type and mime_type not in accept_types:
+            raise ValueError(f"Unsupported Content-Type: {mime_type}")
+
+        max_bytes = min(MAX_RESPONSE_BYTES, MAX_REDIRECT_CHAIN_BYTES - chain_bytes)
+        html, bytes_read, json_ld = read_html_stream(response, max_bytes, max_cleaned_chars)
+
+    finally:
+        response.close()
+
+    page['html'] = html
+    page['json_ld'] = json_ld
+    page['bytes_read'] += bytes_read
+    # JSON-LD is not part of the cleaned HTML but feeds the extraction too
+    digest = hashlib.sha256(html.encode('utf-8'))
+    for block in json_ld:
+        digest.update(block.encode('utf-8'))
+    page['digest'] = digest.hexdigest()
+
+    return page
+
+
+def split_blocks(html: str) -> List[str]:
+    """Split cleaned HTML before every block-level opening tag and after every closing one"""
+    cuts = [0]
+    for match in BLOCK_BOUNDARY_PATTERN.finditer(html):
+        cuts.append(match.end() if match.group().startswith('</') else match.start())
+    cuts.append(len(html))
+
+    return [html[start:end] for start, end in zip(cuts, cuts[1:]) if end > start]
+
+
+def score_block(block: str) -> float:
+    """
+    Estimate how useful a block of cleaned HTML is for business extraction.
+
+    Base value is the amount of visible non-link text weighted by text
+    density (text chars / HTML chars). Blocks with phone, email, address,
+    opening-hours or headline patterns get a fixed boost so contact details
+    survive even in link-heavy footers; cookie banners and legal
+    boilerplate are discounted.
+    """
+    text = WHITESPACE_PATTERN.sub(' ', TAG_PATTERN.sub(' ', block)).strip()
+    if not text:
+        return 0.0
+
+    link_text = sum(len(TAG_PATTERN.sub('', link).strip()) for link in LINK_TEXT_PATTERN.findall(block))
+    link_density = min(1.0, link_text / len(text))
+    text_density = len(text) / len(block)
+
+    score = len(text) * text_density * (1.0 - link_density)
+
+    for pattern, boost in (
+        (PHONE_PATTERN, 400.0),
+        (EMAIL_PATTERN, 400.0),
+        (ADDRESS_PATTERN, 250.0),
+        (HOURS_PATTERN, 250.0),
+        (HEADLINE_PATTERN, 300.0),
+    ):
+        if pattern.search(block):
+            score += boost
+
+    if BOILERPLATE_PATTERN.search(text):
+        score *= 0.1
+
+    return score
+
+
+def select_main_content(pages: List[Tuple[str, str]], token_budget: int = CONTENT_TOKEN_BUDGET) -> str:
+    """
+    Keep the highest-value regions of the crawled pages within a token budget.
+
+    Each page's cleaned HTML is split at block-level tags, every block is
+    scored with score_block, and blocks are taken greedily by score per
+    character until the budget is used. Kept blocks are emitted in their
+    original order, inside <page url="..."> wrappers. If everything already
+    fits, the pages are returned unchanged.
+
+    Args:
+        pages: (url, cleaned HTML) tuples, homepage first
+        token_budget: Approximate input tokens to spend on page content
+
+    Returns:
+        Combined HTML of the selected blocks
+    """
+    budget_chars = int(token_budget * CHARS_PER_TOKEN)
+    total_chars = sum(len(html) for _, html in pages)
+
+    if total_chars <= budget_chars:
+        return '\n'.join(f'<page url="{url}">{html}</page>' for url, html in pages)
+
+    blocks = []
+    for page_index, (_, html) in enumerate(pages):
+        for block in split_blocks(html):
+            blocks.append((page_index, len(blocks), block, score_block(block)))
+
+    ranked = sorted(blocks, key=lambda b: b[3] / len(b[2]), reverse=True)
+
+    kept = set()
+    used = 0
+    for page_index, position, block, score in ranked:
+        if score <= 0 or used + len(block) > budget_chars:
+            continue
+        kept.add(position)
+        used += len(block)
+
+    sections = []
+    for page_index, (url, _) in enumerate(pages):
+        content = ''.join(block for index, position, block, _ in blocks if index == page_index and position in kept)
+        if content:
+            sections.append(f'<page url="{url}">{content}</page>')
+
+    logger.info(f"[Scraper] Selected {len(kept)}/{len(blocks)} blocks, {used}/{total_chars} chars")
+
+    return '\n'.join(sections)
+
+
+def same_origin(url: str, base_url: str) -> bool:
+    """Check whether url belongs to the same site as base_url (ignoring www.)"""
+    a, b = urlparse(url), urlparse(base_url)
+    if a.scheme not in ('http', 'https'):
+        return False
+    host_a = (a.hostname or '').lower().removeprefix('www.')
+    host_b = (b.hostname or '').lower().removeprefix('www.')
+    return bool(host_a) and host_a == host_b
+
+
+def find_candidate_links(html: str, base_url: str, sitemap_urls: List[str]) -> List[str]:
+    """
+    Pick the same-origin subpages most likely to hold contact details,
+    hours or services, from homepage links and sitemap.xml entries.
+
+    Returns:
+        Candidate URLs ordered by relevance (best first), without the homepage
+    """
+    home = urldefrag(base_url)[0].rstrip('/')
+    hrefs = [urljoin(base_url, href.strip()) for href in HREF_PATTERN.findall(html)]
+
+    scored: Dict[str, int] = {}
+    for position, link in enumerate(hrefs + sitemap_urls):
+        link = urldefrag(link)[0]
+        path = urlparse(link).path.lower()
+        if link.rstrip('/') == home or not same_origin(link, base_url):
+            continue
+        if path.endswith(CRAWL_SKIP_EXTENSIONS):
+            continue
+
+        score = sum(10 for keyword in CRAWL_KEYWORDS if keyword in path)
+        if score == 0:
+            continue
+        # Shallow paths and links found early in the page (nav) rank higher
+        score -= path.count('/') + position // 50
+        scored[link] = max(score, scored.get(link, score))
+
+    return sorted(scored, key=lambda link: scored[link], reverse=True)
+
+
+def fetch_sitemap_urls(base_url: str) -> List[str]:
+    """Fetch /sitemap.xml and return its <loc> entries (empty on any failure)"""
+    try:
+        sitemap = fetch_page(
+            urljoin(base_url, '/sitemap.xml'),
+            timeout=CRAWL_PAGE_TIMEOUT,
+            accept_types=XML_CONTENT_TYPES,
+        )
+        return SITEMAP_LOC_PATTERN.findall(sitemap['html'])
+    except Exception as e:
+        logger.info(f"[Crawler] No usable sitemap for {base_url}: {str(e)[:100]}")
+        return []
+
+
+def page_unchanged(page: Dict[str, Any], validators: Optional[Dict[str, Any]]) -> bool:
+    """A page is unchanged if the server answered 304 or its content digest matches"""
+    if page['not_modified']:
+        return True
+    return bool(validators) and page['digest'] == validators.get('content_digest')
+
+
+def crawl_website(
+    url: str,
+    known_pages: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_pages: int = CRAWL_MAX_PAGES,
+) -> Dict[str, Any]:
+    """
+    Fetch the homepage plus a bounded set of same-origin subpages
+    concurrently and return their combined cleaned HTML.
+
+    The homepage and sitemap.xml are fetched in parallel; subpages are then
+    fetched with at most CRAWL_MAX_WORKERS requests in flight. Every hop is
+    SSRF-validated by fetch_page. The job stops taking new pages once
+    max_pages or CRAWL_MAX_BYTES (raw bytes downloaded) is reached.
+
+    With known_pages (validators stored by the previous scrape, keyed by
+    requested URL) every page is fetched conditionally. If the same set of
+    pages comes back unchanged (304 or identical digest) the result is
+    marked unchanged and no HTML is assembled; otherwise pages that
+    answered 304 are re-fetched in full so the LLM sees the whole site.
+
+    Args:
+        url: The website URL given by the customer
+        known_pages: Stored validators from the previous successful scrape
+        max_pages: Page budget including the homepage (1 = homepage only)
+
+    Returns:
+        Dict with 'changed', the fetched 'pages' and the combined 'html'
+        (each page wrapped in <page url="...">, reduced to its highest-value
+        blocks by select_main_content and truncated to MAX_HTML_LENGTH)
 
-    # Get encoding from response or default to utf-8
-    response.encoding = response.apparent_encoding or 'utf-8'
-    raw_html = response.text
+    Raises:
+        Exception if the homepage itself cannot be fetched
+    """
+    url = validate_url_safe(url)
+    known_pages = known_pages or {}
+
+    logger.info(f"[Crawler] Crawling {url} (max {max_pages} pages, {len(known_pages)} known)")
+
+    budget_lock = Lock()
+    bytes_used = [0]
+
+    def fetch_within_budget(page_url: str, conditional: bool = True) -> Optional[Dict[str, Any]]:
+        with budget_lock:
+            if bytes_used[0] >= CRAWL_MAX_BYTES:
+                return None
+        try:
+            page = fetch_page(
+                page_url,
+                timeout=CRAWL_PAGE_TIMEOUT,
+                validators=known_pages.get(page_url) if conditional else None,
+            )
+        except Exception as e:
+            logger.info(f"[Crawler] Skipping {page_url}: {str(e)[:100]}")
+            return None
+        with budget_lock:
+            if bytes_used[0] >= CRAWL_MAX_BYTES:
+                return None
+            bytes_used[0] += page['bytes_read']
+        return page
+
+    with ThreadPoolExecutor(max_workers=CRAWL_MAX_WORKERS) as executor:
+        homepage_future = executor.submit(fetch_page, url, validators=known_pages.get(url))
+        sitemap_future = executor.submit(fetch_sitemap_urls, url) if max_pages > 1 else None
+
+        # Homepage errors propagate so the handler reports them as before
+        homepage = homepage_future.result()
+        sitemap_urls = sitemap_future.result() if sitemap_future else []
+        bytes_used[0] += homepage['bytes_read']
+
+        if max_pages <= 1:
+            candidates = []
+        elif homepage['not_modified']:
+            # No body to discover links from; revisit the pages used last time
+            candidates = [page_url for page_url in known_pages if page_url != url]
+        else:
+            candidates = find_candidate_links(homepage['html'], homepage['url'], sitemap_urls)
+        candidates = candidates[:max_pages - 1]
+
+        subpages = [page for page in executor.map(fetch_within_budget, candidates) if page]
+        pages = [homepage] + subpages
+
+        changed = (
+            {page['requested_url'] for page in pages} != set(known_pages)
+            or not all(page_unchanged(page, known_pages.get(page['requested_url'])) for page in pages)
+        )
+
+        if not changed:
+            logger.info(f"[Crawler] {len(pages)} pages unchanged since last scrape of {url}")
+            return {'changed': False, 'pages': pages, 'html': ''}
+
+        # Something changed: pages that answered 304 are needed in full
+        stale = [page['requested_url'] for page in pages if page['not_modified']]
+        if stale:
+            refetched = dict(zip(stale, executor.map(lambda u: fetch_within_budget(u, conditional=False), stale)))
+            pages = [refetched.get(page['requested_url']) if page['not_modified'] else page for page in pages]
+            pages = [page for page in pages if page]
+
+    if not pages or pages[0]['requested_url'] != url:
+        raise requests.exceptions.ConnectionError(f"Could not re-fetch homepage {url}")
+
+    unique_pages = unique_page_html(pages)
 
-    logger.info(f"[Scraper] Fetched {len(raw_html)} chars from {response.url}")
+    logger.info(f"[Crawler] Fetched {len(unique_pages)} pages ({bytes_used[0]} bytes) from {url}")
 
-    # Strip noise and truncate
-    cleaned = strip_html_noise(raw_html)
+    if CONTENT_SELECTION_ENABLED:
+        cleaned = select_main_content(unique_pages)
+    else:
+        cleaned = '\n'.join(f'<page url="{page_url}">{html}</page>' for page_url, html in unique_pages)
 
     if len(cleaned) > MAX_HTML_LENGTH:
-        logger.info(f"[Scraper] Truncating HTML from {len(cleaned)} to {MAX_HTML_LENGTH} chars")
+        logger.info(f"[Crawler] Truncating HTML from {len(cleaned)} to {MAX_HTML_LENGTH} chars")
         cleaned = cleaned[:MAX_HTML_LENGTH]
 
-    return cleaned
+    return {'changed': True, 'pages': pages, 'html': cleaned}
+
+
+def unique_page_html(pages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(final URL, cleaned HTML) of fetched pages, first occurrence of each URL"""
+    unique_pages = []
+    seen_urls = set()
+    for page in pages:
+        if page['url'] in seen_urls:
+            continue
+        seen_urls.add(page['url'])
+        unique_pages.append((page['url'], page['html']))
+    return unique_pages
+
+
+def is_missing(value: Any) -> bool:
+    """True for null / empty extraction values"""
+    return value is None or value == '' or value == [] or value == {}
+
+
+def as_list(value: Any) -> List[Any]:
+    """JSON-LD values may be single or repeated; always return a list"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def schema_text(value: Any) -> Optional[str]:
+    """First plain-text value of a JSON-LD property ({'name': ...} / {'@value': ...} objects included)"""
+    for item in as_list(value):
+        if isinstance(item, dict):
+            item = item.get('name') or item.get('@value')
+        if isinstance(item, (str, int, float)) and str(item).strip():
+            return unescape(str(item)).strip()
+    return None
+
+
+def schema_types(node: Dict[str, Any]) -> List[str]:
+    """schema.org type names of a JSON-LD node, without vocabulary prefixes"""
+    return [str(t).rsplit('/', 1)[-1].rsplit(':', 1)[-1] for t in as_list(node.get('@type'))]
+
+
+def is_business_type(type_name: str) -> bool:
+    return (
+        type_name in SCHEMA_INDUSTRIES
+        or type_name in GENERIC_BUSINESS_TYPES
+        or type_name.endswith(BUSINESS_TYPE_SUFFIXES)
+    )
+
+
+def find_business_nodes(data: Any, depth: int = 0) -> List[Dict[str, Any]]:
+    """Collect business nodes from parsed JSON-LD (top level, @graph or nested)"""
+    if depth > 6:
+        return []
+    nodes = []
+    if isinstance(data, list):
+        for item in data:
+            nodes.extend(find_business_nodes(item, depth + 1))
+    elif isinstance(data, dict):
+        if any(is_business_type(t) for t in schema_types(data)):
+            nodes.append(data)
+        for key, value in data.items():
+            if key != 'address' and isinstance(value, (dict, list)):
+                nodes.extend(find_business_nodes(value, depth + 1))
+    return nodes
+
+
+def parse_json_ld(block: str) -> Any:
+    """Parse one JSON-LD block, tolerating CDATA / comment wrappers; None if invalid"""
+    block = block.strip()
+    for prefix, suffix in (('<![CDATA[', ']]>'), ('<!--', '-->'), ('//<![CDATA[', '//]]>')):
+        if block.startswith(prefix) and block.endswith(suffix):
+            block = block[len(prefix):-len(suffix)].strip()
+    try:
+        return json.loads(block)
+    except ValueError:
+        return None
+
+
+def parse_tag_attributes(attributes: str) -> Dict[str, str]:
+    return {
+        name.lower(): unescape(double if double is not None else single)
+        for name, double, single in ATTRIBUTE_PATTERN.findall(attributes)
+    }
+
+
+def microdata_business_node(html: str) -> Optional[Dict[str, Any]]:
+    """
+    Read schema.org microdata of the first business itemscope in cleaned
+    HTML as a JSON-LD-like node. Nesting is flattened: the first value of
+    each property after the business itemtype wins.
+    """
+    business = next((m for m in ITEMTYPE_PATTERN.finditer(html) if is_business_type(m.group(1))), None)
+    if not business:
+        return None
+
+    props: Dict[str, List[str]] = {}
+    for match in ITEMPROP_PATTERN.finditer(html, business.start()):
+        tag, attributes, text = match.groups()
+        attrs = parse_tag_attributes(attributes)
+        value = attrs.get('content') or attrs.get('datetime') or text.strip()
+        if not value and tag.lower() == 'a':
+            value = attrs.get('href', '')
+        if not value:
+            continue
+        for prop in attrs.get('itemprop', '').split():
+            props.setdefault(prop, []).append(value)
+
+    def first(prop: str) -> Optional[str]:
+        return props[prop][0] if prop in props else None
+
+    return {
+        '@type': business.group(1),
+        'name': first('name'),
+        'telephone': props.get('telephone'),
+        'email': props.get('email'),
+        'description': first('description'),
+        'address': {
+            'streetAddress': first('streetAddress'),
+            'addressLocality': first('addressLocality'),
+            'postalCode': first('postalCode'),
+            'addressCountry': first('addressCountry'),
+        },
+        'openingHours': props.get('openingHours'),
+        'sameAs': props.get('sameAs'),
+    }
+
+
+def opengraph_business_node(html: str) -> Optional[Dict[str, Any]]:
+    """OpenGraph site name / description and business:contact_data tags as a JSON-LD-like node"""
+    meta: Dict[str, str] = {}
+    for match in META_TAG_PATTERN.finditer(html):
+        attrs = parse_tag_attributes(match.group(1))
+        key = attrs.get('property') or attrs.get('name')
+        if key and attrs.get('content') and key.lower() not in meta:
+            meta[key.lower()] = attrs['content']
+
+    if not any(key.startswith(('og:', 'business:')) for key in meta):
+        return None
+
+    return {
+        'name': meta.get('og:site_name'),
+        'description': meta.get('og:description'),
+        'telephone': meta.get('business:contact_data:phone_number'),
+        'email': meta.get('business:contact_data:email'),
+        'address': {
+            'streetAddress': meta.get('business:contact_data:street_address'),
+            'addressLocality': meta.get('business:contact_data:locality'),
+            'postalCode': meta.get('business:contact_data:postal_code'),
+            'addressCountry': meta.get('business:contact_data:country_name'),
+        },
+    }
+
+
+def normalize_time_range(match) -> str:
+    open_hour, open_minute, close_hour, close_minute = match.groups()
+    return f"{int(open_hour):02d}:{open_minute}-{int(close_hour):02d}:{close_minute}"
+
+
+def parse_opening_hours(node: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """
+    Map openingHours ("Mo-Fr 09:00-14:00 17:00-20:00") and
+    openingHoursSpecification to the "hours" field: consecutive days with
+    the same hours share a key ("mon-fri"), days without hours are "closed".
+    """
+    days: List[List[str]] = [[] for _ in DAY_KEYS]
+
+    for spec in as_list(node.get('openingHours')):
+        if not isinstance(spec, str):
+            continue
+        for day_spec, times in OPENING_HOURS_PATTERN.findall(spec):
+            ranges = [normalize_time_range(m) for m in TIME_RANGE_PATTERN.finditer(times)]
+            for part in re.split(r'\s*,\s*', day_spec.lower()):
+                bounds = [SCHEMA_DAY_INDEX[d.strip()] for d in part.split('-')]
+                first_day, last_day = bounds[0], bounds[-1]
+                for offset in range((last_day - first_day) % 7 + 1):
+                    days[(first_day + offset) % 7].extend(ranges)
+
+    for spec in as_list(node.get('openingHoursSpecification')):
+        if not isinstance(spec, dict) or not spec.get('opens') or not spec.get('closes'):
+            continue
+        time_range = TIME_RANGE_PATTERN.search(f"{spec['opens']}-{spec['closes']}")
+        if not time_range:
+            continue
+        for day in as_list(spec.get('dayOfWeek')):
+            index = SCHEMA_DAY_INDEX.get(str(day).rsplit('/', 1)[-1][:2].lower())
+            if index is not None:
+                days[index].append(normalize_time_range(time_range))
+
+    if not any(days):
+        return None
+
+    hours: Dict[str, str] = {}
+    start = 0
+    for index in range(1, len(DAY_KEYS) + 1):
+        if index < len(DAY_KEYS) and days[index] == days[start]:
+            continue
+        key = DAY_KEYS[start] if index - 1 == start else f"{DAY_KEYS[start]}-{DAY_KEYS[index - 1]}"
+        hours[key] = ', '.join(dict.fromkeys(days[start])) or 'closed'
+        start = index
+    return hours
+
+
+def business_fields_from_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one schema.org business node to the extraction fields it provides"""
+    fields: Dict[str, Any] = {}
+
+    fields['business_name'] = schema_text(node.get('name')) or schema_text(node.get('legalName'))
+
+    for type_name in schema_types(node):
+        if type_name in SCHEMA_INDUSTRIES:
+            fields['industry'] = SCHEMA_INDUSTRIES[type_name]
+            break
+
+    address = next(iter(as_list(node.get('address'))), None)
+    if isinstance(address, dict):
+        street = schema_text(address.get('streetAddress'))
+        city = schema_text(address.get('addressLocality'))
+        postal_code = schema_text(address.get('postalCode'))
+        country = schema_text(address.get('addressCountry'))
+        fields['city'] = city
+        fields['postal_code'] = postal_code
+        if street:
+            locality = ' '.join(filter(None, [postal_code, city]))
+            fields['address'] = ', '.join(filter(None, [street, locality]))
+            fields['country'] = COUNTRY_NAMES.get((country or 'es').lower(), country)
+    elif schema_text(address):
+        fields['address'] = schema_text(address)
+
+    phones = [schema_text(phone) for phone in as_list(node.get('telephone'))]
+    phones = list(dict.fromkeys(phone for phone in phones if phone))
+    if phones:
+        fields['phone'] = phones[0]
+        fields['additional_phones'] = phones[1:] or None
+
+    emails = [schema_text(email) for email in as_list(node.get('email'))]
+    emails = list(dict.fromkeys(email[7:] if email.lower().startswith('mailto:') else email for email in emails if email))
+    if emails:
+        fields['email'] = emails[0]
+        fields['additional_emails'] = emails[1:] or None
+
+    services = []
+    for catalog in as_list(node.get('hasOfferCatalog')):
+        if isinstance(catalog, dict):
+            services.extend(as_list(catalog.get('itemListElement')))
+    services.extend(as_list(node.get('makesOffer')))
+    names = []
+    for service in services:
+        if isinstance(service, dict):
+            service = service.get('itemOffered') or service
+        name = schema_text(service)
+        if name:
+            names.append(name)
+    if names:
+        fields['services'] = list(dict.fromkeys(names))[:20]
+
+    fields['hours'] = parse_opening_hours(node)
+
+    description = schema_text(node.get('description'))
+    if description:
+        fields['description'] = description[:500]
+
+    social_media = {}
+    for profile in as_list(node.get('sameAs')):
+        host = urlparse(str(profile)).hostname or ''
+        network = SOCIAL_NETWORKS.get(host[4:] if host.startswith('www.') else host)
+        if network and network not in social_media:
+            social_media[network] = profile
+    if social_media:
+        fields['social_media'] = social_media
+
+    return {key: value for key, value in fields.items() if not is_missing(value)}
+
+
+def business_node_score(node: Dict[str, Any]) -> int:
+    """Prefer the node describing the local business (address, phone, hours) over e.g. a publisher Organization"""
+    score = sum(2 for key in ('address', 'telephone', 'openingHours', 'openingHoursSpecification') if node.get(key))
+    if any(t in SCHEMA_INDUSTRIES for t in schema_types(node)):
+        score += 1
+    if schema_types(node) == ['Organization']:
+        score -= 1
+    return score
+
+
+def extract_structured_business_info(pages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Deterministic extraction from schema.org JSON-LD and microdata, with
+    OpenGraph business tags filling remaining gaps.
+
+    Args:
+        pages: Pages fetched by crawl_website (homepage first)
+
+    Returns:
+        Dict with every BUSINESS_FIELDS key (None where not found), or None
+        if no page declares a business entity
+    """
+    nodes = []
+    for page in pages:
+        for block in page.get('json_ld', []):
+            nodes.extend(find_business_nodes(parse_json_ld(block)))
+        microdata = microdata_business_node(page['html'])
+        if microdata:
+            nodes.append(microdata)
+
+    if not nodes:
+        return None
+
+    nodes.sort(key=business_node_score, reverse=True)
+    fields = business_fields_from_node(nodes[0])
+
+    # Other nodes only complete the chosen one if they describe the same business
+    for node in nodes[1:]:
+        node_fields = business_fields_from_node(node)
+        if node_fields.get('business_name') not in (None, fields.get('business_name')):
+            continue
+        for key, value in node_fields.items():
+            fields.setdefault(key, value)
+
+    opengraph = opengraph_business_node(pages[0]['html']) if pages else None
+    if opengraph:
+        for key, value in business_fields_from_node(opengraph).items():
+            fields.setdefault(key, value)
+
+    logger.info(f"[Structured] Found {sorted(fields)} in structured data")
+
+    return {key: fields.get(key) for key, _ in BUSINESS_FIELDS}
+
+
+def extraction_cache_key(model_id: str, prompt: str) -> str:
+    """Content-addressed cache key: SHA-256 of prompt version, model id and prompt"""
+    digest = hashlib.sha256()
+    for part in (PROMPT_VERSION, model_id, prompt):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def get_cached_extraction(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a previous extraction, first in the in-process LRU and then in
+    the llm_extraction_cache table. Cache errors are logged and treated as
+    a miss so they never block a scrape.
+    """
+    with extraction_lru_lock:
+        if cache_key in extraction_lru:
+            extraction_lru.move_to_end(cache_key)
+            logger.info(f"[Cache] LRU hit {cache_key[:12]}")
+            return copy.deepcopy(extraction_lru[cache_key])
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE llm_extraction_cache
+                SET hit_count = hit_count + 1,
+                    last_hit_at = CURRENT_TIMESTAMP
+                WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+                RETURNING result
+            """, (cache_key,))
+
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Cache] Lookup failed, calling model: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            return None
+
+    if not row:
+        return None
+
+    result = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+    remember_extraction(cache_key, result)
+    logger.info(f"[Cache] DB hit {cache_key[:12]}")
+    return result
+
+
+def remember_extraction(cache_key: str, result: Dict[str, Any]):
+    """Add an extraction to the in-process LRU"""
+    with extraction_lru_lock:
+        extraction_lru[cache_key] = copy.deepcopy(result)
+        extraction_lru.move_to_end(cache_key)
+        while len(extraction_lru) > EXTRACTION_CACHE_LRU_SIZE:
+            extraction_lru.popitem(last=False)
+
+
+def store_cached_extraction(cache_key: str, model_id: str, result: Dict[str, Any]):
+    """
+    Store an extraction in the LRU and llm_extraction_cache. A sampled
+    fraction of writes also runs evict_cached_extractions.
+    """
+    remember_extraction(cache_key, result)
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            result_json = json.dumps(result)
+
+            cursor.execute("""
+                INSERT INTO llm_extraction_cache (
+                    cache_key, prompt_version, model_id, result, result_bytes, expires_at
+                )
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(hours => %s))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET result = EXCLUDED.result,
+                    result_bytes = EXCLUDED.result_bytes,
+                    expires_at = EXCLUDED.expires_at,
+                    last_hit_at = CURRENT_TIMESTAMP
+            """, (
+                cache_key,
+                PROMPT_VERSION,
+                model_id,
+                result_json,
+                len(result_json.encode('utf-8')),
+                EXTRACTION_CACHE_TTL_HOURS
+            ))
+
+            if random.random() < EXTRACTION_CACHE_EVICTION_SAMPLE_RATE:
+                evict_cached_extractions(cursor)
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Cache] Store failed: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def evict_cached_extractions(cursor):
+    """
+    Purge expired rows and, only when the table is over
+    EXTRACTION_CACHE_MAX_BYTES, evict the least recently hit rows beyond it.
+    Runs inside the caller's transaction.
+    """
+    cursor.execute("DELETE FROM llm_extraction_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+
+    cursor.execute("SELECT COALESCE(SUM(result_bytes), 0) FROM llm_extraction_cache")
+    total_bytes = cursor.fetchone()[0]
+    if total_bytes <= EXTRACTION_CACHE_MAX_BYTES:
+        return
+
+    # Size-based eviction: keep the most recently hit entries within budget
+    cursor.execute("""
+        DELETE FROM llm_extraction_cache
+        WHERE cache_key IN (
+            SELECT cache_key FROM (
+                SELECT cache_key,
+                       SUM(result_bytes) OVER (ORDER BY last_hit_at DESC, cache_key) AS running_bytes
+                FROM llm_extraction_cache
+            ) ranked
+            WHERE running_bytes > %s
+        )
+    """, (EXTRACTION_CACHE_MAX_BYTES,))
+    logger.info(f"[Cache] Evicted {cursor.rowcount} entries over {EXTRACTION_CACHE_MAX_BYTES} bytes")
+
+
+class AdaptiveBackoff:
+    """
+    Delay applied before Bedrock calls in this container: doubles on every
+    throttle (from base up to maximum) and halves after every success, until
+    it drops below half the base and is cleared.
+    """
+
+    def __init__(self, base: float, maximum: float):
+        self.base = base
+        self.maximum = maximum
+        self.delay = 0.0
+        self.lock = Lock()
+
+    def on_throttle(self) -> float:
+        """Back off further; returns the new delay"""
+        with self.lock:
+            self.delay = min(self.maximum, max(self.base, self.delay * 2))
+            return self.delay
+
+    def on_success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay >= self.base else 0.0
+
+    def pause(self) -> float:
+        """Seconds to sleep before the next call (half the delay plus jitter)"""
+        with self.lock:
+            delay = self.delay
+        return delay / 2 + random.uniform(0, delay / 2) if delay else 0.0
+
+
+bedrock_backoff = AdaptiveBackoff(BEDROCK_BACKOFF_BASE_SECONDS, BEDROCK_BACKOFF_MAX_SECONDS)
+
+
+class JsonStreamAssembler:
+    """
+    Incrementally assemble the first top-level JSON object of streamed
+    model output.
+
+    Tracks string/escape state and bracket nesting as text arrives, so the
+    closing brace of the top-level object is detected immediately and
+    mismatched brackets fail without waiting for the rest of the stream.
+    Any preamble before the first '{' (e.g. a markdown fence) is skipped.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.stack: List[str] = []
+        self.length = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, text: str) -> bool:
+        """Consume a text delta; returns True once the top-level object is closed"""
+        start = 0
+        if not self.started:
+            start = text.find('{')
+            if start == -1:
+                return False
+            self.started = True
+
+        for i in range(start, len(text)):
+            char = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.stack.append(char)
+            elif char in '}]':
+                expected = '{' if char == '}' else '['
+                if not self.stack or self.stack.pop() != expected:
+                    partial = self.text() + text[start:i + 1]
+                    raise json.JSONDecodeError(f"Unexpected '{char}' in streamed JSON", partial, len(partial) - 1)
+                if not self.stack:
+                    self.append(text[start:i + 1])
+                    self.complete = True
+                    return True
+
+        self.append(text[start:])
+        return False
+
+    def append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def estimate_request_tokens(request_body: Dict[str, Any]) -> int:
+    """Tokens a request counts against the bucket: prompt estimate plus max_tokens (as Bedrock quotas do)"""
+    prompt_chars = sum(
+        len(message['content']) if isinstance(message['content'], str) else len(json.dumps(message['content']))
+        for message in request_body.get('messages', [])
+    )
+    return int(prompt_chars / CHARS_PER_TOKEN) + request_body.get('max_tokens', 0)
+
+
+def try_acquire_bedrock_slot(model_id: str, tokens: int) -> Tuple[Optional[str], float]:
+    """
+    One admission attempt: take a lease if the model is not paused, has a
+    free concurrency slot and enough tokens in its bucket.
+
+    Returns:
+        (lease id, 0) when admitted, otherwise (None, seconds to wait
+        before trying again)
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO bedrock_limits (limit_key, max_concurrency, tokens_per_minute, tokens_available)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (limit_key) DO NOTHING
+            """, (model_id, BEDROCK_MAX_CONCURRENCY, BEDROCK_TOKENS_PER_MINUTE, BEDROCK_TOKENS_PER_MINUTE))
+
+            # The row lock serializes acquirers of this model across containers
+            cursor.execute("""
+                SELECT max_concurrency,
+                       tokens_per_minute,
+                       LEAST(tokens_per_minute,
+                             tokens_available + tokens_per_minute * EXTRACT(EPOCH FROM (clock_timestamp() - refilled_at)) / 60),
+                       GREATEST(0, EXTRACT(EPOCH FROM (throttled_until - clock_timestamp())))
+                FROM bedrock_limits
+                WHERE limit_key = %s
+                FOR UPDATE
+            """, (model_id,))
+            max_concurrency, tokens_per_minute, available, paused_for = cursor.fetchone()
+            available, paused_for = float(available), float(paused_for)
+
+            cursor.execute("""
+                DELETE FROM bedrock_leases
+                WHERE limit_key = %s AND expires_at < clock_timestamp()
+            """, (model_id,))
+            cursor.execute("SELECT count(*) FROM bedrock_leases WHERE limit_key = %s", (model_id,))
+            in_flight = cursor.fetchone()[0]
+
+            # A request larger than the whole bucket waits for a full bucket
+            tokens = min(tokens, tokens_per_minute)
+            lease_id = None
+
+            if paused_for > 0:
+                retry_after = paused_for
+            elif in_flight >= max_concurrency:
+                retry_after = BEDROCK_ADMISSION_POLL_SECONDS
+            elif available < tokens:
+                retry_after = (tokens - available) * 60 / tokens_per_minute
+            else:
+                retry_after = 0.0
+                cursor.execute("""
+                    UPDATE bedrock_limits
+                    SET tokens_available = %s,
+                        refilled_at = clock_timestamp()
+                    WHERE limit_key = %s
+                """, (available - tokens, model_id))
+                cursor.execute("""
+                    INSERT INTO bedrock_leases (limit_key, holder, tokens, expires_at)
+                    VALUES (%s, %s, %s, clock_timestamp() + make_interval(secs => %s))
+                    RETURNING lease_id
+                """, (model_id, os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local'), tokens, BEDROCK_LEASE_TTL_SECONDS))
+                lease_id = str(cursor.fetchone()[0])
+
+            conn.commit()
+            cursor.close()
+
+            return lease_id, retry_after
+
+        except Exception:
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+
+def acquire_bedrock_slot(model_id: str, tokens: int) -> Optional[str]:
+    """
+    Wait for a shared Bedrock slot for a call of the given token cost.
+
+    Callers wait instead of failing. If the limiter is unreachable, or no
+    slot frees up within BEDROCK_ADMISSION_MAX_WAIT_SECONDS, the call goes
+    ahead without a lease (throttles are still retried by invoke_bedrock_json).
+
+    Returns:
+        Lease id for release_bedrock_slot, or None if the call was not admitted
+    """
+    if not BEDROCK_ADMISSION_ENABLED:
+        return None
+
+    started = time.monotonic()
+
+    while True:
+        try:
+            lease_id, retry_after = try_acquire_bedrock_slot(model_id, tokens)
+        except Exception as e:
+            logger.warning(f"[Admission] Limiter unavailable, calling Bedrock without a lease: {e}")
+            return None
+
+        waited = time.monotonic() - started
+        if lease_id:
+            if waited >= 1:
+                logger.info(f"[Admission] Admitted after waiting {waited:.1f}s")
+            return lease_id
+
+        remaining = BEDROCK_ADMISSION_MAX_WAIT_SECONDS - waited
+        if remaining <= 0:
+            logger.warning(f"[Admission] No Bedrock slot after {waited:.0f}s, calling without a lease")
+            return None
+
+        # Jitter so waiting containers do not retry in lockstep
+        time.sleep(min(remaining, retry_after + random.uniform(0, BEDROCK_ADMISSION_POLL_SECONDS)))
+
+
+def release_bedrock_slot(lease_id: Optional[str]):
+    """Return a lease (an unreleased lease expires after BEDROCK_LEASE_TTL_SECONDS)"""
+    if not lease_id:
+        return
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("DELETE FROM bedrock_leases WHERE lease_id = %s", (lease_id,))
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Admission] Could not release lease {lease_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def report_bedrock_throttle(model_id: str, pause_seconds: float):
+    """Pause admission of model_id in every container for pause_seconds"""
+    if not BEDROCK_ADMISSION_ENABLED:
+        return
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE bedrock_limits
+                SET throttled_until = GREATEST(
+                        COALESCE(throttled_until, clock_timestamp()),
+                        clock_timestamp() + make_interval(secs => %s)
+                    ),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE limit_key = %s
+            """, (pause_seconds, model_id))
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Admission] Could not record throttle: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def invoke_bedrock_json(model_id: str, request_body: Dict[str, Any]) -> str:
+    """
+    Call Bedrock under shared admission control and return the JSON object
+    text of the model's answer (see call_bedrock_json).
+
+    Every attempt holds a slot from acquire_bedrock_slot. Throttling and
+    transient unavailability are retried up to BEDROCK_MAX_ATTEMPTS times
+    with adaptive backoff; each throttle also pauses admission for all
+    containers.
+
+    Returns:
+        JSON text (parse with json.loads)
+
+    Raises:
+        botocore ClientError when retries are exhausted or the error is not
+        retryable, plus the errors of call_bedrock_json
+    """
+    tokens = estimate_request_tokens(request_body)
+
+    for attempt in range(1, BEDROCK_MAX_ATTEMPTS + 1):
+        pause = bedrock_backoff.pause()
+        if pause:
+            time.sleep(pause)
+
+        lease_id = acquire_bedrock_slot(model_id, tokens)
+        try:
+            response_text = call_bedrock_json(model_id, request_body)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code', '')
+            # Errors inside a response stream use camelCase codes (throttlingException)
+            code = code[:1].upper() + code[1:]
+            if code not in BEDROCK_RETRYABLE_ERRORS or attempt == BEDROCK_MAX_ATTEMPTS:
+                raise
+            delay = bedrock_backoff.on_throttle()
+            logger.warning(f"[Bedrock] {code} on attempt {attempt}, backing off {delay:.1f}s")
+            report_bedrock_throttle(model_id, delay)
+            continue
+        finally:
+            release_bedrock_slot(lease_id)
+
+        bedrock_backoff.on_success()
+        return response_text
+
+
+def call_bedrock_json(model_id: str, request_body: Dict[str, Any]) -> str:
+    """
+    Make one Bedrock call and return the JSON object text of the model's answer.
+
+    With BEDROCK_STREAMING_ENABLED the response is streamed with
+    invoke_model_with_response_stream: text deltas are fed to a
+    JsonStreamAssembler and the stream is closed as soon as the top-level
+    object is complete, without waiting for any trailing tokens. Otherwise
+    a blocking invoke_model call is made and the JSON object is cut out of
+    the full completion.
+
+    Returns:
+        JSON text (parse with json.loads)
+
+    Raises:
+        ValueError if the model returned no content, json.JSONDecodeError
+        if the streamed structure is malformed
+    """
+    if not BEDROCK_STREAMING_ENABLED:
+        response = get_bedrock_client().invoke_model(
+            modelId=model_id,
+            body=json.dumps(request_body)
+        )
+
+        response_body = json.loads(response['body'].read())
+        content_blocks = response_body.get('content', [])
+
+        if not content_blocks:
+            raise ValueError("No content in Bedrock response")
+
+        response_text = content_blocks[0].get('text', '')
+
+        # Try to extract JSON from the response (handle potential markdown fencing)
+        json_match = re.search(r'\{[\s\S]*\}', response_text)
+        return json_match.group(0) if json_match else response_text
+
+    response = get_bedrock_client().invoke_model_with_response_stream(
+        modelId=model_id,
+        body=json.dumps(request_body)
+    )
+
+    stream = response['body']
+    assembler = JsonStreamAssembler()
+
+    try:
+        for event in stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            payload = json.loads(chunk['bytes'])
+            if payload.get('type') != 'content_block_delta':
+                continue
+            if assembler.feed(payload['delta'].get('text', '')):
+                logger.info(f"[Bedrock] JSON complete after {assembler.length} chars, closing stream")
+                break
+    finally:
+        stream.close()
+
+    if not assembler.started:
+        raise ValueError("No content in Bedrock response")
+
+    return assembler.text()
+
+
+def describe_business_fields(keys) -> str:
+    """Numbered field list for an extraction prompt"""
+    descriptions = dict(BUSINESS_FIELDS)
+    return '\n'.join(f'{i}. "{key}": {descriptions[key]}' for i, key in enumerate(keys, 1))
+
+
+def run_extraction_prompt(prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """
+    Send an extraction prompt to Bedrock and parse the JSON answer.
+
+    Results are cached by a hash of the prompt (which embeds the cleaned
+    HTML), PROMPT_VERSION and the model id; a hit skips the model call.
+
+    Raises:
+        json.JSONDecodeError if the model does not answer with JSON
+    """
+    model_id = BEDROCK_MODEL_ID
+
+    cache_key = extraction_cache_key(model_id, prompt)
+    if EXTRACTION_CACHE_ENABLED:
+        cached = get_cached_extraction(cache_key)
+        if cached is not None:
+            logger.info(f"[Bedrock] Cache hit, skipping {model_id} call")
+            return cached
+
+    request_body = {
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': max_tokens,
+        'messages': [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ],
+        'temperature': 0.0
+    }
+
+    logger.info(f"[Bedrock] Calling {model_id} for business extraction ({len(prompt)} prompt chars)")
+
+    response_text = invoke_bedrock_json(model_id, request_body)
+
+    structured_data = json.loads(response_text)
+
+    logger.info(f"[Bedrock] Extracted business info: {list(structured_data.keys())}")
+
+    if EXTRACTION_CACHE_ENABLED:
+        store_cached_extraction(cache_key, model_id, structured_data)
+
+    return structured_data
 
 
 def extract_business_info_with_bedrock(html: str, website_url: str) -> Dict[str, Any]:
@@ -231,6 +2440,7 @@ def extract_business_info_with_bedrock(html: str, website_url: str) -> Dict[str,
     prompt = f"""Eres un asistente experto en extraer información de negocios desde páginas web.
 
 Analiza el siguiente HTML de la web {website_url} y extrae toda la información del negocio.
+El contenido puede incluir varias páginas del mismo sitio, cada una dentro de una etiqueta <page>.
 
 <html_content>
 {html}
@@ -238,20 +2448,7 @@ Analiza el siguiente HTML de la web {website_url} y extrae toda la información
 
 Extrae la siguiente información (devuelve null si no está disponible):
 
-1. "business_name": Nombre del negocio
-2. "industry": Tipo de negocio/industria (ej: veterinary, dental, hair_salon, restaurant, auto_repair, etc.)
-3. "address": Dirección física completa
-4. "city": Ciudad
-5. "postal_code": Código postal
-6. "country": País (por defecto "España")
-7. "phone": Teléfono principal
-8. "email": Email de contacto
-9. "services": Lista de servicios ofrecidos (array de strings, máximo 20)
-10. "hours": Horarios de atención (objeto con claves para cada día o rango: "mon-fri", "sat", "sun", etc.)
-11. "description": Breve descripción del negocio (1-2 frases)
-12. "additional_phones": Otros teléfonos (array)
-13. "additional_emails": Otros emails (array)
-14. "social_media": Redes sociales encontradas (objeto con claves: facebook, instagram, twitter, etc.)
+{describe_business_fields(key for key, _ in BUSINESS_FIELDS)}
 
 IMPORTANTE:
 - Responde SOLO con JSON válido, sin texto adicional.
@@ -260,138 +2457,601 @@ IMPORTANTE:
 - Los horarios deben usar formato 24h (ej: "09:00-20:00").
 - Si el sitio está en español, mantén los datos en español."""
 
-    model_id = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+    return run_extraction_prompt(prompt, max_tokens=4096)
 
-    request_body = {
-        'anthropic_version': 'bedrock-2023-05-31',
-        'max_tokens': 4096,
-        'messages': [
-            {
-                'role': 'user',
-                'content': prompt
-            }
-        ],
-        'temperature': 0.0
-    }
 
-    logger.info(f"[Bedrock] Calling {model_id} for business extraction")
+def complete_business_info_with_bedrock(
+    html: str,
+    website_url: str,
+    known: Dict[str, Any],
+    missing_fields: List[str],
+) -> Dict[str, Any]:
+    """
+    Ask Bedrock only for the fields structured data did not provide.
 
-    response = bedrock.invoke_model(
-        modelId=model_id,
-        body=json.dumps(request_body)
+    Args:
+        html: Cleaned HTML content (selected with a smaller token budget)
+        website_url: Original URL for context
+        known: Fields already found in the site's structured data
+        missing_fields: Keys of BUSINESS_FIELDS to extract
+
+    Returns:
+        Dict with (at most) the missing fields
+    """
+    known_summary = json.dumps(
+        {key: known[key] for key in ('business_name', 'industry', 'address', 'city') if known.get(key)},
+        ensure_ascii=False,
     )
 
-    response_body = json.loads(response['body'].read())
-    content_blocks = response_body.get('content', [])
+    prompt = f"""Eres un asistente experto en extraer información de negocios desde páginas web.
+
+Ya conocemos estos datos del negocio de la web {website_url}: {known_summary}
 
-    if not content_blocks:
-        raise ValueError("No content in Bedrock response")
+<html_content>
+{html}
+</html_content>
 
-    response_text = content_blocks[0].get('text', '')
+Extrae del HTML SOLO los siguientes campos (devuelve null si no está disponible):
 
-    # Try to extract JSON from the response (handle potential markdown fencing)
-    json_match = re.search(r'\{[\s\S]*\}', response_text)
-    if json_match:
-        response_text = json_match.group(0)
+{describe_business_fields(missing_fields)}
 
-    structured_data = json.loads(response_text)
+IMPORTANTE:
+- Responde SOLO con JSON válido con exactamente esas claves, sin texto adicional.
+- Los servicios deben ser strings cortos y descriptivos.
+- Los horarios deben usar formato 24h (ej: "09:00-20:00").
+- Si el sitio está en español, mantén los datos en español."""
 
-    logger.info(f"[Bedrock] Extracted business info: {list(structured_data.keys())}")
+    result = run_extraction_prompt(prompt, max_tokens=1024)
+    return {key: result.get(key) for key in missing_fields}
 
-    return structured_data
+
+def extract_business_info(crawl_result: Dict[str, Any], website_url: str) -> Dict[str, Any]:
+    """
+    Extract business info from a crawl, preferring the site's structured data.
+
+    With schema.org business data that covers STRUCTURED_REQUIRED_FIELDS no
+    model call is made. With partial structured data Bedrock only fills in
+    the missing fields from a smaller content selection. Without any, the
+    full extraction runs on the crawl's HTML.
+
+    Args:
+        crawl_result: Result of crawl_website (needs 'pages' and 'html')
+        website_url: Original URL for context
+
+    Returns:
+        Dict with the BUSINESS_FIELDS keys, as extract_business_info_with_bedrock
+    """
+    structured = extract_structured_business_info(crawl_result['pages']) if STRUCTURED_DATA_ENABLED else None
+
+    if structured is None:
+        return extract_business_info_with_bedrock(crawl_result['html'], website_url)
+
+    missing_required = [key for key in STRUCTURED_REQUIRED_FIELDS if is_missing(structured.get(key))]
+    if not missing_required:
+        logger.info(f"[Structured] Complete structured data on {website_url}, skipping Bedrock")
+        return structured
+
+    missing_fields = [key for key, _ in BUSINESS_FIELDS if is_missing(structured.get(key))]
+    logger.info(f"[Structured] {website_url} lacks {missing_required}, asking Bedrock for {len(missing_fields)} fields")
+
+    if CONTENT_SELECTION_ENABLED:
+        html = select_main_content(unique_page_html(crawl_result['pages']), STRUCTURED_GAP_TOKEN_BUDGET)
+    else:
+        html = crawl_result['html'][:int(STRUCTURED_GAP_TOKEN_BUDGET * CHARS_PER_TOKEN)]
+
+    completed = complete_business_info_with_bedrock(html, website_url, structured, missing_fields)
+    return {**structured, **completed}
+
+
+def business_info_values(scraped_data: Dict[str, Any]) -> Tuple:
+    """
+    Map extracted data to business_info columns.
+
+    Returns:
+        (scraped_data, services, hours, contacts, locations) ready to bind
+    """
+    services = scraped_data.get('services')
+    hours = scraped_data.get('hours')
+    contacts = {
+        'emails': list(filter(None, [scraped_data.get('email')] + (scraped_data.get('additional_emails') or []))),
+        'phones': list(filter(None, [scraped_data.get('phone')] + (scraped_data.get('additional_phones') or []))),
+    }
+    locations = [{
+        'address': scraped_data.get('address'),
+        'city': scraped_data.get('city'),
+        'postal_code': scraped_data.get('postal_code'),
+        'country': scraped_data.get('country', 'España'),
+    }] if scraped_data.get('address') else None
+
+    return (
+        json.dumps(scraped_data),
+        services,
+        json.dumps(hours) if hours else None,
+        json.dumps(contacts),
+        # locations is JSONB[]: one JSON document per element (bind with ::jsonb[])
+        [json.dumps(location) for location in locations] if locations else None,
+    )
+
+
+def customer_values(scraped_data: Dict[str, Any]) -> Tuple:
+    """
+    Map extracted data to the customers columns it fills in (when not null).
+
+    Returns:
+        (business_name, business_address, business_phone, industry)
+    """
+    return (
+        scraped_data.get('business_name'),
+        scraped_data.get('address'),
+        scraped_data.get('phone'),
+        scraped_data.get('industry'),
+    )
 
 
 def update_business_info(customer_id: str, scraped_data: Dict[str, Any], status: str = 'complete', error_msg: Optional[str] = None):
     """Update business_info record with scraped data"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Build the update based on extracted fields
-        services = scraped_data.get('services')
-        hours = scraped_data.get('hours')
-        contacts = {
-            'emails': list(filter(None, [scraped_data.get('email')] + (scraped_data.get('additional_emails') or []))),
-            'phones': list(filter(None, [scraped_data.get('phone')] + (scraped_data.get('additional_phones') or []))),
-        }
-        locations = [{
-            'address': scraped_data.get('address'),
-            'city': scraped_data.get('city'),
-            'postal_code': scraped_data.get('postal_code'),
-            'country': scraped_data.get('country', 'España'),
-        }] if scraped_data.get('address') else None
-
-        cursor.execute("""
-            UPDATE business_info
-            SET scraped_data = %s,
-                services = %s,
-                hours = %s,
-                contacts = %s,
-                locations = %s,
-                scraped_at = CURRENT_TIMESTAMP
-            WHERE customer_id = %s
-        """, (
-            json.dumps(scraped_data),
-            services,
-            json.dumps(hours) if hours else None,
-            json.dumps(contacts),
-            json.dumps(locations) if locations else None,
-            customer_id
-        ))
-
-        # Also update customer record with key business info
-        cursor.execute("""
-            UPDATE customers
-            SET business_name = COALESCE(%s, business_name),
-                business_address = COALESCE(%s, business_address),
-                business_phone = COALESCE(%s, business_phone),
-                industry = COALESCE(%s, industry)
-            WHERE customer_id = %s
-        """, (
-            scraped_data.get('business_name'),
-            scraped_data.get('address'),
-            scraped_data.get('phone'),
-            scraped_data.get('industry'),
-            customer_id
-        ))
-
-        conn.commit()
-        cursor.close()
-
-        logger.info(f"[DB] Updated business_info for customer {customer_id}")
-
-    except Exception as e:
-        logger.error(f"[DB] Error updating business_info: {e}")
-        if db_conn and not db_conn.closed:
-            db_conn.rollback()
-        raise
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE business_info
+                SET scraped_data = %s,
+                    services = %s,
+                    hours = %s,
+                    contacts = %s,
+                    locations = %s::jsonb[],
+                    scraped_at = CURRENT_TIMESTAMP
+                WHERE customer_id = %s
+            """, business_info_values(scraped_data) + (customer_id,))
+
+            # Also update customer record with key business info
+            cursor.execute("""
+                UPDATE customers
+                SET business_name = COALESCE(%s, business_name),
+                    business_address = COALESCE(%s, business_address),
+                    business_phone = COALESCE(%s, business_phone),
+                    industry = COALESCE(%s, industry)
+                WHERE customer_id = %s
+            """, customer_values(scraped_data) + (customer_id,))
+
+            conn.commit()
+            cursor.close()
+
+            logger.info(f"[DB] Updated business_info for customer {customer_id}")
+
+        except Exception as e:
+            logger.error(f"[DB] Error updating business_info: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
 
 
 def update_scraping_error(customer_id: str, error_message: str):
-    """Mark scraping as failed"""
+    """
+    Mark scraping as failed. The customer's stored page validators are
+    dropped in the same transaction: otherwise the next scrape would find
+    the site unchanged and skip extraction, leaving the error in place.
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE business_info
+                SET scraped_data = %s,
+                    scraped_at = CURRENT_TIMESTAMP
+                WHERE customer_id = %s
+            """, (
+                json.dumps({'error': error_message, 'status': 'error'}),
+                customer_id
+            ))
+
+            cursor.execute("DELETE FROM scrape_validators WHERE customer_id = %s", (customer_id,))
+
+            conn.commit()
+            cursor.close()
+
+            logger.info(f"[DB] Marked scraping as failed for customer {customer_id}")
+
+        except Exception as e:
+            logger.error(f"[DB] Error updating scraping error: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def get_page_validators(customer_id: str) -> Dict[str, Dict[str, Any]]:
+    """Load validators stored by the previous successful scrape, keyed by requested URL"""
+    return get_page_validators_bulk([customer_id]).get(customer_id, {})
+
+
+def get_page_validators_bulk(customer_ids: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Load stored validators of several customers in one query.
+
+    Returns:
+        customer_id -> requested URL -> validators (customers without stored
+        validators, or all of them if the query fails, are left out)
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT customer_id, url, final_url, etag, last_modified, content_digest
+                FROM scrape_validators
+                WHERE customer_id = ANY(%s::uuid[])
+            """, (list(customer_ids),))
+
+            rows = cursor.fetchall()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[DB] Could not load page validators, fetching unconditionally: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            return {}
+
+        validators: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for customer_id, url, final_url, etag, last_modified, content_digest in rows:
+            validators.setdefault(str(customer_id), {})[url] = {
+                'final_url': final_url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_digest': content_digest,
+            }
+        return validators
+
+
+def store_page_validators(customer_id: str, pages: List[Dict[str, Any]]):
+    """Replace the customer's stored validators with those of the pages just scraped"""
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("DELETE FROM scrape_validators WHERE customer_id = %s", (customer_id,))
+
+            for page in pages:
+                cursor.execute("""
+                    INSERT INTO scrape_validators (
+                        customer_id, url, final_url, etag, last_modified, content_digest
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    customer_id,
+                    page['requested_url'],
+                    page['url'],
+                    page['etag'],
+                    page['last_modified'],
+                    page['digest']
+                ))
+
+            conn.commit()
+            cursor.close()
+
+            logger.info(f"[DB] Stored validators for {len(pages)} pages of customer {customer_id}")
+
+        except Exception as e:
+            logger.warning(f"[DB] Error storing page validators: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def start_scrape_run(run_id: str, customers: List[Dict[str, str]], force: bool, crawl: bool) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """
+    Create a bulk re-scrape run, or resume it if run_id already exists.
+
+    Customers are added as pending items (ones already in the run are kept
+    as they are). A resumed run keeps the force/crawl options it was
+    started with.
+
+    Returns:
+        (run options, pending items as {'customer_id', 'website', 'attempts'})
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO scrape_runs (run_id, force, crawl, invocations)
+                VALUES (%s, %s, %s, 1)
+                ON CONFLICT (run_id) DO UPDATE
+                SET invocations = scrape_runs.invocations + 1,
+                    status = 'running',
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING force, crawl
+            """, (run_id, force, crawl))
+            run_force, run_crawl = cursor.fetchone()
+
+            if customers:
+                execute_values(cursor, """
+                    INSERT INTO scrape_run_items (run_id, customer_id, website)
+                    VALUES %s
+                    ON CONFLICT (run_id, customer_id) DO NOTHING
+                """, [(run_id, customer['customer_id'], customer['website']) for customer in customers])
+
+            refresh_scrape_run_progress(cursor, run_id)
+
+            cursor.execute("""
+                SELECT customer_id, website, attempts
+                FROM scrape_run_items
+                WHERE run_id = %s AND status = 'pending'
+                ORDER BY customer_id
+            """, (run_id,))
+            pending = [
+                {'customer_id': str(customer_id), 'website': website, 'attempts': attempts or 0}
+                for customer_id, website, attempts in cursor.fetchall()
+            ]
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.error(f"[DB] Error starting scrape run {run_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+    return {'force': run_force, 'crawl': run_crawl}, pending
+
+
+def refresh_scrape_run_progress(cursor, run_id: str):
+    """Recompute a run's counters and error summary from its items (in the caller's transaction)"""
+    cursor.execute("""
+        UPDATE scrape_runs
+        SET total_items = p.total_items,
+            succeeded = p.succeeded,
+            unchanged = p.unchanged,
+            failed = p.failed,
+            errors_by_type = COALESCE(e.errors_by_type, '{}'::jsonb),
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT count(*) AS total_items,
+                   count(*) FILTER (WHERE status = 'complete') AS succeeded,
+                   count(*) FILTER (WHERE status = 'unchanged') AS unchanged,
+                   count(*) FILTER (WHERE status = 'error') AS failed
+            FROM scrape_run_items
+            WHERE run_id = %s
+        ) AS p, (
+            SELECT jsonb_object_agg(error_type, errors) AS errors_by_type
+            FROM (
+                SELECT error_type, count(*) AS errors
+                FROM scrape_run_items
+                WHERE run_id = %s AND status = 'error'
+                GROUP BY error_type
+            ) AS t
+        ) AS e
+        WHERE run_id = %s
+    """, (run_id, run_id, run_id))
+
+
+def write_bulk_results(run_id: str, items: List[Dict[str, Any]]):
+    """
+    Store a batch of bulk re-scrape outcomes and checkpoint them.
+
+    business_info, customers, scrape_validators and the run items are
+    written with one multi-row statement each, all in a single transaction,
+    so a batch is either fully stored and checkpointed or left pending for
+    the next invocation.
+
+    Failed items only update their run item: the business_info of a
+    customer whose refresh failed keeps its last good data. Their stored
+    validators are dropped, though, so the next scrape re-extracts instead
+    of skipping an unchanged site. Items marked 'retry' are checkpointed as
+    pending with their error, so the next invocation picks them up again.
+
+    Raises:
+        Exception if the batch cannot be written
+    """
+    completed = [item for item in items if item['status'] == 'complete']
+    failed = [item for item in items if item['status'] == 'error']
+    retried = [item for item in items if item['status'] == 'retry']
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            # Validators of completed items are replaced below, those of
+            # failed ones must not survive a failure
+            invalidated = [item['customer_id'] for item in completed + failed + retried]
+            if invalidated:
+                cursor.execute(
+                    "DELETE FROM scrape_validators WHERE customer_id = ANY(%s::uuid[])",
+                    (invalidated,)
+                )
+
+            if completed:
+                execute_values(cursor, """
+                    UPDATE business_info AS b
+                    SET scraped_data = v.scraped_data,
+                        services = v.services,
+                        hours = v.hours,
+                        contacts = v.contacts,
+                        locations = v.locations,
+                        scraped_at = CURRENT_TIMESTAMP
+                    FROM (VALUES %s) AS v(customer_id, scraped_data, services, hours, contacts, locations)
+                    WHERE b.customer_id = v.customer_id
+                """, [
+                    (item['customer_id'],) + business_info_values(item['business_data'])
+                    for item in completed
+                ], template='(%s::uuid, %s::jsonb, %s::text[], %s::jsonb, %s::jsonb, %s::jsonb[])')
+
+                execute_values(cursor, """
+                    UPDATE customers AS c
+                    SET business_name = COALESCE(v.business_name, c.business_name),
+                        business_address = COALESCE(v.business_address, c.business_address),
+                        business_phone = COALESCE(v.business_phone, c.business_phone),
+                        industry = COALESCE(v.industry, c.industry)
+                    FROM (VALUES %s) AS v(customer_id, business_name, business_address, business_phone, industry)
+                    WHERE c.customer_id = v.customer_id
+                """, [
+                    (item['customer_id'],) + customer_values(item['business_data'])
+                    for item in completed
+                ], template='(%s::uuid, %s, %s, %s, %s)')
+
+                validator_rows = [
+                    (item['customer_id'], page['requested_url'], page['url'], page['etag'], page['last_modified'], page['digest'])
+                    for item in completed
+                    for page in item['pages']
+                ]
+                if validator_rows:
+                    execute_values(cursor, """
+                        INSERT INTO scrape_validators (
+                            customer_id, url, final_url, etag, last_modified, content_digest
+                        )
+                        VALUES %s
+                        ON CONFLICT (customer_id, url) DO NOTHING
+                    """, validator_rows)
+
+            execute_values(cursor, """
+                UPDATE scrape_run_items AS i
+                SET status = v.status,
+                    error_type = v.error_type,
+                    error_message = v.error_message,
+                    duration_ms = v.duration_ms,
+                    attempts = COALESCE(i.attempts, 0) + 1,
+                    processed_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(run_id, customer_id, status, error_type, error_message, duration_ms)
+                WHERE i.run_id = v.run_id AND i.customer_id = v.customer_id
+            """, [
+                (
+                    run_id, item['customer_id'], 'pending' if item['status'] == 'retry' else item['status'],
+                    item.get('error_type'), item.get('error_message'), item['duration_ms']
+                )
+                for item in items
+            ], template='(%s, %s::uuid, %s, %s, %s, %s::integer)')
+
+            refresh_scrape_run_progress(cursor, run_id)
+
+            conn.commit()
+            cursor.close()
+
+            logger.info(f"[DB] Wrote bulk batch of {len(items)} results for run {run_id} ({len(completed)} updated, {len(failed)} failed, {len(retried)} to retry)")
+
+        except Exception as e:
+            logger.error(f"[DB] Error writing bulk batch for run {run_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+
+def finish_scrape_run(run_id: str, elapsed_seconds: float) -> Dict[str, Any]:
+    """
+    Add this invocation's processing time to the run and mark it complete
+    when no items are left pending.
+
+    Returns:
+        The run's totals (see bulk_rescrape_handler)
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE scrape_runs
+                SET elapsed_seconds = elapsed_seconds + %s,
+                    status = CASE WHEN succeeded + unchanged + failed >= total_items THEN 'complete' ELSE 'running' END,
+                    completed_at = CASE WHEN succeeded + unchanged + failed >= total_items THEN CURRENT_TIMESTAMP END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE run_id = %s
+                RETURNING status, total_items, succeeded, unchanged, failed, invocations, elapsed_seconds, errors_by_type
+            """, (round(elapsed_seconds, 1), run_id))
+            status, total, succeeded, unchanged, failed, invocations, run_elapsed, errors_by_type = cursor.fetchone()
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.error(f"[DB] Error finishing scrape run {run_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+    return {
+        'status': status,
+        'total_items': total,
+        'succeeded': succeeded,
+        'unchanged': unchanged,
+        'failed': failed,
+        'pending': total - succeeded - unchanged - failed,
+        'invocations': invocations,
+        'elapsed_seconds': float(run_elapsed),
+        'errors_by_type': errors_by_type,
+    }
+
+
+def describe_scrape_error(website: str, error: Exception) -> str:
+    """Message stored on business_info for a failed scrape of website"""
+    if isinstance(error, json.JSONDecodeError):
+        return f"Failed to parse LLM response as JSON: {str(error)[:200]}"
+    if isinstance(error, RobotsDisallowedError):
+        return f"robots.txt of {website} does not allow scraping"
+    if isinstance(error, HostBusyError):
+        return f"{website} asked us to slow down, retrying later: {str(error)[:200]}"
+    if isinstance(error, ValueError):
+        return f"Invalid URL {website}: {str(error)[:200]}"
+    if isinstance(error, requests.exceptions.Timeout):
+        return f"Timeout fetching {website} (20s limit)"
+    if isinstance(error, requests.exceptions.SSLError):
+        return f"SSL error for {website}: {str(error)[:200]}"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return f"Connection error for {website}: {str(error)[:200]}"
+    if isinstance(error, requests.exceptions.HTTPError):
+        return f"HTTP {error.response.status_code} for {website}"
+    return f"Unexpected error: {str(error)[:200]}"
+
+
+def process_record(record: Dict[str, Any]):
+    """
+    Scrape one SQS record end to end.
+
+    Expected failures (bad URL, timeouts, HTTP errors, unparseable LLM
+    output) are stored on business_info and not retried. Anything else is
+    stored too and then re-raised, so the message is reported as a batch
+    item failure and redelivered.
+    """
+    message = json.loads(record['body'])
+    customer_id = message['customer_id']
+    website = message['website']
+    job_id = message.get('job_id', 'unknown')
+    crawl = message.get('crawl', CRAWL_ENABLED)
+    force = message.get('force', False)
+
+    logger.info(f"[Scraper] Processing job {job_id} for customer {customer_id}: {website}")
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # Step 1: Fetch the website HTML (homepage + key subpages),
+        # conditionally against the previous scrape unless forced
+        known_pages = {} if force else get_page_validators(customer_id)
+        crawl_result = crawl_website(website, known_pages, CRAWL_MAX_PAGES if crawl else 1)
 
-        cursor.execute("""
-            UPDATE business_info
-            SET scraped_data = %s,
-                scraped_at = CURRENT_TIMESTAMP
-            WHERE customer_id = %s
-        """, (
-            json.dumps({'error': error_message, 'status': 'error'}),
-            customer_id
-        ))
+        if not crawl_result['changed']:
+            logger.info(f"[Scraper] {website} unchanged since last scrape, skipping extraction")
+            return
 
-        conn.commit()
-        cursor.close()
+        # Step 2: Extract business info (structured data, then Bedrock for what is missing)
+        business_data = extract_business_info(crawl_result, website)
 
-        logger.info(f"[DB] Marked scraping as failed for customer {customer_id}")
+        # Step 3: Store in database
+        update_business_info(customer_id, business_data)
+        store_page_validators(customer_id, crawl_result['pages'])
+
+        logger.info(f"[Scraper] Successfully scraped {website} for customer {customer_id}")
 
     except Exception as e:
-        logger.error(f"[DB] Error updating scraping error: {e}")
-        if db_conn and not db_conn.closed:
-            db_conn.rollback()
+        error_msg = describe_scrape_error(website, e)
+        logger.error(f"[Scraper] {error_msg}")
+        update_scraping_error(customer_id, error_msg)
+
+        if not isinstance(e, EXPECTED_SCRAPE_ERRORS):
+            raise
 
 
 def lambda_handler(event, context):
@@ -402,75 +3062,229 @@ def lambda_handler(event, context):
     {
         "customer_id": "uuid",
         "website": "https://example.com",
-        "job_id": "scrape_uuid_timestamp"
+        "job_id": "scrape_uuid_timestamp",
+        "crawl": true,  (optional, defaults to SCRAPER_CRAWL_ENABLED)
+        "force": false  (optional, re-extract even if the site is unchanged)
     }
+
+    Records of a batch are processed concurrently (the work is network and
+    Bedrock bound). Returns SQS partial batch failures, so only messages
+    that failed unexpectedly are redelivered. Records not finished
+    SCRAPER_TIME_MARGIN_SECONDS before the Lambda timeout are reported as
+    failures too (and left unwaited), so a slow record does not time out
+    the invocation and get the whole batch redelivered.
     """
     logger.info(f"[Lambda] Event: {json.dumps(event)}")
 
-    try:
-        for record in event.get('Records', []):
-            message = json.loads(record['body'])
-            customer_id = message['customer_id']
-            website = message['website']
-            job_id = message.get('job_id', 'unknown')
+    records = event.get('Records', [])
+    batch_item_failures = []
 
-            logger.info(f"[Scraper] Processing job {job_id} for customer {customer_id}: {website}")
+    if not records:
+        return {'batchItemFailures': batch_item_failures}
 
+    deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - SCRAPER_TIME_MARGIN_SECONDS if context else None
+
+    executor = ThreadPoolExecutor(max_workers=min(SCRAPER_MAX_CONCURRENT_RECORDS, len(records)))
+    try:
+        futures = {executor.submit(process_record, record): record for record in records}
+        wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        for future, record in futures.items():
+            if not future.done():
+                started = not future.cancel()
+                logger.warning(f"[Lambda] Record {record.get('messageId')} {'still running' if started else 'not started'} at the deadline, leaving it for redelivery")
+                batch_item_failures.append({'itemIdentifier': record['messageId']})
+                continue
             try:
-                # Step 1: Fetch the website HTML
-                html = fetch_website(website)
+                future.result()
+            except Exception as e:
+                logger.error(f"[Lambda] Record {record.get('messageId')} failed: {str(e)[:200]}")
+                batch_item_failures.append({'itemIdentifier': record['messageId']})
+    finally:
+        # Records still running at the deadline are not waited for
+        executor.shutdown(wait=False, cancel_futures=True)
 
-                # Step 2: Extract business info using Bedrock LLM
-                business_data = extract_business_info_with_bedrock(html, website)
+    logger.info(f"[Lambda] Processed {len(records)} records, {len(batch_item_failures)} failed")
 
-                # Step 3: Store in database
-                update_business_info(customer_id, business_data)
+    return {'batchItemFailures': batch_item_failures}
 
-                logger.info(f"[Scraper] Successfully scraped {website} for customer {customer_id}")
 
-            except ValueError as e:
-                error_msg = f"Invalid URL {website}: {str(e)[:200]}"
-                logger.warning(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
+def bulk_crawl(item: Dict[str, Any], known_pages: Dict[str, Dict[str, Any]], crawl: bool) -> Dict[str, Any]:
+    """Crawl stage of a bulk re-scrape; failures are recorded on the item, never raised"""
+    try:
+        crawl_result = crawl_website(item['website'], known_pages, CRAWL_MAX_PAGES if crawl else 1)
+    except Exception as e:
+        return record_bulk_failure(item, e)
 
-            except requests.exceptions.Timeout:
-                error_msg = f"Timeout fetching {website} (20s limit)"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
+    if crawl_result['changed']:
+        item['crawl_result'] = crawl_result
+    else:
+        item['status'] = 'unchanged'
+    return item
 
-            except requests.exceptions.SSLError as e:
-                error_msg = f"SSL error for {website}: {str(e)[:200]}"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
 
-            except requests.exceptions.ConnectionError as e:
-                error_msg = f"Connection error for {website}: {str(e)[:200]}"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
+def bulk_extract(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Bedrock stage of a bulk re-scrape; failures are recorded on the item, never raised"""
+    crawl_result = item.pop('crawl_result')
+    try:
+        item['business_data'] = extract_business_info(crawl_result, item['website'])
+    except Exception as e:
+        return record_bulk_failure(item, e)
 
-            except requests.exceptions.HTTPError as e:
-                error_msg = f"HTTP {e.response.status_code} for {website}"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
+    item['pages'] = crawl_result['pages']
+    item['status'] = 'complete'
+    return item
 
-            except json.JSONDecodeError as e:
-                error_msg = f"Failed to parse LLM response as JSON: {str(e)[:200]}"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
 
-            except Exception as e:
-                error_msg = f"Unexpected error: {str(e)[:200]}"
-                logger.error(f"[Scraper] {error_msg}")
-                update_scraping_error(customer_id, error_msg)
+def is_transient_scrape_error(error: Exception) -> bool:
+    """
+    Whether a scrape failure may succeed on a later attempt: the host asking
+    us to slow down, timeouts, connection errors (not SSL), 5xx responses,
+    Bedrock throttling/unavailability and Bedrock connection errors.
+    """
+    if isinstance(error, (HostBusyError, requests.exceptions.Timeout, HTTPClientError)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return not isinstance(error, requests.exceptions.SSLError)
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        return code[:1].upper() + code[1:] in BEDROCK_RETRYABLE_ERRORS
+    return False
+
+
+def record_bulk_failure(item: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """
+    Mark a bulk re-scrape item as failed with the message process_record
+    would store. Transient errors are marked 'retry' (left pending for the
+    next invocation) until the item has had BULK_MAX_ATTEMPTS attempts.
+    """
+    retry = is_transient_scrape_error(error) and item.get('attempts', 0) + 1 < BULK_MAX_ATTEMPTS
+    item['status'] = 'retry' if retry else 'error'
+    item['error_type'] = type(error).__name__
+    item['error_message'] = describe_scrape_error(item['website'], error)
+    logger.warning(f"[Bulk] {item['customer_id']}: {item['error_message']}{' (will retry)' if retry else ''}")
+    return item
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Scraping completed'})
-        }
 
-    except Exception as e:
-        logger.error(f"[Lambda] Fatal error: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+def bulk_rescrape_handler(event, context):
+    """
+    Bulk re-scrape entry point (e.g. after a prompt change). Deployed as its
+    own function with a long timeout and invoked directly, not from SQS.
+
+    Event:
+    {
+        "run_id": "rescrape_20250601_prompt_v2",
+        "customers": [{"customer_id": "uuid", "website": "https://example.com"}, ...],
+        "force": false,  (optional, re-extract even if the site is unchanged;
+                          pass true after a prompt change)
+        "crawl": true    (optional, defaults to SCRAPER_CRAWL_ENABLED)
+    }
+
+    Sites are crawled by BULK_FETCH_CONCURRENCY workers and handed to
+    BULK_LLM_CONCURRENCY Bedrock workers; crawling pauses while extraction
+    is backed up. Outcomes are written every BULK_WRITE_BATCH_SIZE sites
+    with batched statements that also checkpoint the run's items.
+
+    When the invocation gets close to its timeout it stops starting sites,
+    drains the ones in flight and returns with status 'running'. Invoking
+    again with the same run_id (customers can be omitted) resumes the
+    pending items, so a Step Functions loop or a script can drive a run of
+    any size until status is 'complete'. Sites that failed with a transient
+    error (see is_transient_scrape_error) stay pending and are retried by
+    later invocations, up to BULK_MAX_ATTEMPTS attempts; only permanent
+    errors and exhausted retries count as failed.
+
+    Returns:
+        Summary with the run totals (counts, errors by type, pending) and
+        this invocation's throughput
+    """
+    started = time.monotonic()
+    deadline = started + context.get_remaining_time_in_millis() / 1000 - BULK_TIME_MARGIN_SECONDS if context else None
+
+    customers = event.get('customers') or []
+    if not event.get('run_id') and not customers:
+        raise ValueError("Bulk re-scrape needs customers (new run) or a run_id (resume)")
+
+    run_id = event.get('run_id') or f"rescrape_{time.strftime('%Y%m%d_%H%M%S')}"
+    options, pending = start_scrape_run(
+        run_id, customers, event.get('force', False), event.get('crawl', CRAWL_ENABLED)
+    )
+
+    logger.info(f"[Bulk] Run {run_id}: {len(pending)} sites pending (force={options['force']}, crawl={options['crawl']})")
+
+    crawling = set()
+    extracting = set()
+    finished: List[Dict[str, Any]] = []
+    outcomes: Dict[str, int] = {'complete': 0, 'unchanged': 0, 'error': 0, 'retry': 0}
+    known_pages: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    next_index = 0
+
+    with ThreadPoolExecutor(max_workers=BULK_FETCH_CONCURRENCY) as crawl_pool, \
+            ThreadPoolExecutor(max_workers=BULK_LLM_CONCURRENCY) as llm_pool:
+        while True:
+            # Keep the crawlers busy unless extraction is backed up or the
+            # invocation is about to run out of time
+            while (
+                next_index < len(pending)
+                and len(crawling) < BULK_FETCH_CONCURRENCY
+                and len(extracting) < BULK_LLM_CONCURRENCY * 2
+                and (deadline is None or time.monotonic() < deadline)
+            ):
+                if not options['force'] and next_index % BULK_WRITE_BATCH_SIZE == 0:
+                    window = pending[next_index:next_index + BULK_WRITE_BATCH_SIZE]
+                    known_pages = get_page_validators_bulk([item['customer_id'] for item in window])
+
+                item = pending[next_index]
+                next_index += 1
+                item['started'] = time.monotonic()
+                crawling.add(crawl_pool.submit(bulk_crawl, item, known_pages.get(item['customer_id'], {}), options['crawl']))
+
+            if not crawling and not extracting:
+                break
+
+            done, _ = wait(crawling | extracting, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = future.result()
+                if future in crawling:
+                    crawling.discard(future)
+                    if 'crawl_result' in item:
+                        extracting.add(llm_pool.submit(bulk_extract, item))
+                        continue
+                else:
+                    extracting.discard(future)
+
+                item['duration_ms'] = int((time.monotonic() - item.pop('started')) * 1000)
+                outcomes[item['status']] += 1
+                finished.append(item)
+
+            if len(finished) >= BULK_WRITE_BATCH_SIZE:
+                write_bulk_results(run_id, finished)
+                finished = []
+
+    if finished:
+        write_bulk_results(run_id, finished)
+
+    elapsed = time.monotonic() - started
+    processed = sum(outcomes.values())
+    run = finish_scrape_run(run_id, elapsed)
+
+    summary = {
+        'run_id': run_id,
+        'status': run['status'],
+        'run': run,
+        'invocation': {
+            'processed': processed,
+            'succeeded': outcomes['complete'],
+            'unchanged': outcomes['unchanged'],
+            'failed': outcomes['error'],
+            'retried': outcomes['retry'],
+            'elapsed_seconds': round(elapsed, 1),
+            'sites_per_minute': round(processed / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        },
+    }
+
+    logger.info(f"[Bulk] Summary: {json.dumps(summary)}")
+
+    return summary
@@ -5,6 +5,7 @@ Processes uploaded files (PDF, DOCX) and manual text entries:
 1. Extract text from files
 2. Call Amazon Bedrock Claude 3.5 Sonnet to structure the knowledge
 3. Store structured data in PostgreSQL
+4. Index the raw text as full-text passages (search_passages_handler)
 
 Triggered by:
 - S3 upload event (PDF/DOCX files)
@@ -14,24 +15,244 @@ Triggered by:
 import json
 import logging
 import os
+import hashlib
+import copy
+import re
+import random
+import time
+import tempfile
+import unicodedata
+import zlib
+import multiprocessing
+import signal
+import queue
+from multiprocessing.connection import wait as wait_for_connections
 import boto3
-import PyPDF2
-import docx
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import psycopg2
+from psycopg2.extras import execute_values
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict, Any, Optional
+from threading import Lock, RLock, Thread
+from typing import Dict, Any, BinaryIO, Iterable, List, Optional, Tuple
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime', region_name='eu-west-1')
-secretsmanager = boto3.client('secretsmanager', region_name='eu-west-1')
-
-# Database connection (reused across invocations)
+# AWS clients (created on first use and reused across invocations; building
+# a client costs tens of milliseconds that would otherwise be paid by every
+# cold start, including the ones that never call that service)
+s3_client = None
+bedrock_client = None
+secretsmanager_client = None
+aws_clients_lock = Lock()
+
+# Database connection (reused across invocations). Batch records and document
+# chunks are processed on threads; every helper that uses the connection
+# holds db_lock for its whole transaction.
 db_conn = None
+db_lock = RLock()
+
+# Bedrock model and prompt version (bump the version whenever the prompt or
+# its post-processing changes, so cached structurings are not reused)
+BEDROCK_MODEL_ID = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+PROMPT_VERSION = 'knowledge-structuring-v2'
+
+# Stream completions and stop reading at the end of the JSON object
+BEDROCK_STREAMING_ENABLED = os.environ.get('BEDROCK_STREAMING_ENABLED', 'true').lower() == 'true'
+
+# Bedrock admission control shared by all containers (bedrock_limits /
+# bedrock_leases tables): at most BEDROCK_MAX_CONCURRENCY calls in flight
+# and a BEDROCK_TOKENS_PER_MINUTE token bucket per model. These defaults
+# create the model's limit row; afterwards the row's values apply.
+BEDROCK_ADMISSION_ENABLED = os.environ.get('BEDROCK_ADMISSION_ENABLED', 'true').lower() == 'true'
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '8'))
+BEDROCK_TOKENS_PER_MINUTE = int(os.environ.get('BEDROCK_TOKENS_PER_MINUTE', '200000'))
+BEDROCK_ADMISSION_MAX_WAIT_SECONDS = int(os.environ.get('BEDROCK_ADMISSION_MAX_WAIT_SECONDS', '30'))
+BEDROCK_ADMISSION_POLL_SECONDS = 0.5
+BEDROCK_LEASE_TTL_SECONDS = 300
+CHARS_PER_TOKEN = 3.5  # Prompt token estimate
+
+# Throttled calls are retried with a delay that doubles on every throttle
+# and halves after every success (per container); a throttle also pauses
+# admission in all containers for that delay
+BEDROCK_MAX_ATTEMPTS = 5
+BEDROCK_BACKOFF_BASE_SECONDS = 1.0
+BEDROCK_BACKOFF_MAX_SECONDS = 20.0
+BEDROCK_RETRYABLE_ERRORS = ('ThrottlingException', 'ServiceUnavailableException', 'ModelNotReadyException')
+
+# Extraction cache: Postgres (shared across containers) + in-process LRU.
+# The cache, Bedrock backoff/admission and JSON stream helpers are duplicated
+# in the business-scraper lambda (no shared Python layer); keep both copies in sync.
+EXTRACTION_CACHE_ENABLED = os.environ.get('EXTRACTION_CACHE_ENABLED', 'true').lower() == 'true'
+EXTRACTION_CACHE_TTL_HOURS = int(os.environ.get('EXTRACTION_CACHE_TTL_HOURS', '168'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+EXTRACTION_CACHE_LRU_SIZE = 64
+# Fraction of cache writes that also purge expired rows and enforce
+# EXTRACTION_CACHE_MAX_BYTES, so most writes are a single upsert
+EXTRACTION_CACHE_EVICTION_SAMPLE_RATE = float(os.environ.get('EXTRACTION_CACHE_EVICTION_SAMPLE_RATE', '0.05'))
+
+# In-process LRU of cache_key -> structured JSON (survives warm invocations)
+extraction_lru: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+extraction_lru_lock = Lock()
+
+# S3 downloads: objects over KB_MAX_OBJECT_BYTES (checked with a HEAD
+# request) are rejected. Objects up to S3_SPOOL_MAX_MEMORY_BYTES are read
+# into memory; larger ones are streamed to a temporary file in S3_SPOOL_DIR,
+# so memory use does not grow with the file size.
+KB_MAX_OBJECT_BYTES = int(os.environ.get('KB_MAX_OBJECT_BYTES', str(100 * 1024 * 1024)))
+S3_SPOOL_MAX_MEMORY_BYTES = int(os.environ.get('S3_SPOOL_MAX_MEMORY_BYTES', str(8 * 1024 * 1024)))
+S3_SPOOL_DIR = os.environ.get('S3_SPOOL_DIR', '/tmp')
+S3_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+# PDF extraction: pages are extracted by forked worker processes. Documents
+# with at least PDF_PARALLEL_MIN_PAGES pages are split into contiguous page
+# ranges for PDF_EXTRACT_WORKERS workers, smaller ones use a single worker.
+# A page that takes longer than PDF_PAGE_TIMEOUT_SECONDS is skipped (its
+# worker is killed and restarted after it), so one pathological page cannot
+# use up the invocation.
+PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', str(os.cpu_count() or 1)))
+PDF_PAGE_TIMEOUT_SECONDS = float(os.environ.get('PDF_PAGE_TIMEOUT_SECONDS', '30'))
+PDF_PARALLEL_MIN_PAGES = 8
+# A file whose extraction takes longer than this (all pages together) is
+# abandoned: its worker process group is killed and the source fails
+EXTRACTION_TIMEOUT_SECONDS = float(os.environ.get('EXTRACTION_TIMEOUT_SECONDS', '600'))
+
+# SQS batch pipeline: the records of a batch move through stages connected
+# by bounded queues (download -> extract -> structure), so one record's
+# Bedrock wait overlaps another's download or extraction. Results are saved
+# and knowledge bases merged once, for the whole batch, at the end. The
+# I/O stages run PIPELINE_IO_WORKERS threads each; extraction runs each file
+# in a forked process, at most PDF_EXTRACT_WORKERS at a time.
+PIPELINE_IO_WORKERS = int(os.environ.get('PIPELINE_IO_WORKERS', '10'))
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '4'))
+PIPELINE_STOP = object()  # Queue sentinel: the worker exits
+
+# Knowledge structuring: text longer than STRUCTURING_CHUNK_CHARS is split
+# into overlapping chunks that end at section or paragraph breaks. Chunks are
+# structured concurrently (at most STRUCTURING_CONCURRENCY calls per document,
+# within the shared admission limit) and their results merged like the
+# sources of a knowledge base. Only the first STRUCTURING_MAX_CHUNKS chunks
+# are structured; the result of a longer source is marked 'partial'.
+STRUCTURING_CHUNK_CHARS = int(os.environ.get('STRUCTURING_CHUNK_CHARS', '15000'))
+STRUCTURING_CHUNK_OVERLAP_CHARS = int(os.environ.get('STRUCTURING_CHUNK_OVERLAP_CHARS', '800'))
+STRUCTURING_CONCURRENCY = int(os.environ.get('STRUCTURING_CONCURRENCY', '4'))
+STRUCTURING_MAX_CHUNKS = int(os.environ.get('STRUCTURING_MAX_CHUNKS', '60'))
+
+# Preferred chunk boundaries, best first: a blank line before a heading
+# (markdown, numbered or a short line without a full stop), a blank line,
+# a line break, the end of a sentence, any whitespace
+CHUNK_BREAK_PATTERNS = (
+    re.compile(r'\n[ \t]*\n(?=[ \t]*(?:#{1,6}\s|\d+(?:\.\d+)*[.)]?\s+\S|[^\n.]{1,80}\n))'),
+    re.compile(r'\n[ \t]*\n'),
+    re.compile(r'\n'),
+    re.compile(r'[.!?:;](?=\s)'),
+    re.compile(r'\s'),
+)
+
+# Full-text passages: the raw text of every completed source is split into
+# passages of about KB_PASSAGE_CHARS (like structuring chunks) and stored in
+# kb_passages with a Spanish tsvector for search_kb_passages. Accents are
+# folded in Python, on both the indexed text and the query, so no unaccent
+# extension is needed.
+KB_PASSAGE_CHARS = int(os.environ.get('KB_PASSAGE_CHARS', '1200'))
+KB_PASSAGE_OVERLAP_CHARS = 150
+KB_SEARCH_DEFAULT_TOP_K = 5
+KB_SEARCH_MAX_TOP_K = 50
+ACCENT_TRANSLATION = str.maketrans('áàâäéèêëíìîïóòôöúùûüÁÀÂÄÉÈÊËÍÌÎÏÓÒÔÖÚÙÛÜ', 'aaaaeeeeiiiioooouuuuAAAAEEEEIIIIOOOOUUUU')
+
+# Semantic passages: every passage also gets an embedding (pgvector) from the
+# configured embedder: 'bedrock' (Titan Text Embeddings v2) in production,
+# 'hashing' (deterministic feature hashing, no network) for local runs. Each
+# row records the embedder that produced it and searches only compare rows
+# of the current one. EMBEDDING_DIMENSIONS must match kb_passages.embedding.
+KB_EMBEDDER = os.environ.get('KB_EMBEDDER', 'bedrock')
+EMBEDDING_MODEL_ID = 'amazon.titan-embed-text-v2:0'
+EMBEDDING_DIMENSIONS = 512
+EMBEDDING_CONCURRENCY = int(os.environ.get('EMBEDDING_CONCURRENCY', '8'))
+HASHING_EMBEDDER_STEM_CHARS = 5
+
+# HNSW search breadth, and whether filtered scans keep walking the graph
+# until top_k rows of the knowledge base are found (hnsw.iterative_scan;
+# without it a small knowledge base can get fewer rows). The setting only
+# exists from pgvector 0.8 and is skipped on older versions.
+VECTOR_EF_SEARCH = int(os.environ.get('VECTOR_EF_SEARCH', '100'))
+VECTOR_ITERATIVE_SCAN = os.environ.get('VECTOR_ITERATIVE_SCAN', 'true').lower() == 'true'
+
+# Merged list fields deduplicated by normalized key (emails and phones live
+# under 'contacts')
+MERGE_KEY_FIELDS = ('services', 'faqs', 'emails', 'phones', 'locations')
+
+# Near-duplicate services and FAQs: MinHash signatures of the words of the
+# normalized service name / FAQ question (stopwords dropped, words cut to
+# NEAR_DUPLICATE_STEM_CHARS as a crude stemmer), with LSH banding (16 bands
+# of 4 rows make pairs above ~0.5 similarity candidates). A candidate whose
+# word Jaccard similarity is at least NEAR_DUPLICATE_THRESHOLD is the same
+# item: each cluster keeps its most detailed member.
+NEAR_DUPLICATE_ENABLED = os.environ.get('NEAR_DUPLICATE_ENABLED', 'true').lower() == 'true'
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', '0.75'))
+NEAR_DUPLICATE_FIELDS = ('services', 'faqs')
+NEAR_DUPLICATE_STEM_CHARS = 4
+NEAR_DUPLICATE_STOPWORDS = frozenset((
+    'a', 'al', 'ante', 'con', 'de', 'del', 'desde', 'el', 'en', 'es', 'hay', 'la', 'las', 'le', 'les',
+    'lo', 'los', 'me', 'mi', 'mis', 'nos', 'nuestra', 'nuestras', 'nuestro', 'nuestros', 'o', 'os',
+    'para', 'por', 'que', 'se', 'su', 'sus', 'te', 'tu', 'tus', 'un', 'una', 'unas', 'unos',
+    'vuestra', 'vuestras', 'vuestro', 'vuestros', 'y',
+    'and', 'are', 'do', 'does', 'for', 'is', 'of', 'or', 'our', 'the', 'to', 'we', 'you', 'your',
+))
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_PRIME = (1 << 61) - 1
+
+# Fixed seed: signatures are stored in kb_merge_state and must not change
+minhash_random = random.Random(20240601)
+MINHASH_COEFFICIENTS = [
+    (minhash_random.randrange(1, MINHASH_PRIME), minhash_random.randrange(MINHASH_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+
+def get_s3_client():
+    """Get the S3 client (created on first use)"""
+    global s3_client
+
+    if s3_client is None:
+        # boto3's default session is not thread-safe to build clients from
+        with aws_clients_lock:
+            if s3_client is None:
+                s3_client = boto3.client('s3')
+    return s3_client
+
+
+def get_bedrock_client():
+    """Get the Bedrock runtime client (created on first use)"""
+    global bedrock_client
+
+    if bedrock_client is None:
+        with aws_clients_lock:
+            if bedrock_client is None:
+                # Throttling retries are made by invoke_bedrock_json (adaptive,
+                # shared with the admission limiter), not by botocore
+                bedrock_client = boto3.client(
+                    'bedrock-runtime',
+                    region_name='eu-west-1',
+                    config=Config(retries={'mode': 'standard', 'max_attempts': 1}),
+                )
+    return bedrock_client
+
+
+def get_secretsmanager_client():
+    """Get the Secrets Manager client (created on first use)"""
+    global secretsmanager_client
+
+    if secretsmanager_client is None:
+        with aws_clients_lock:
+            if secretsmanager_client is None:
+                secretsmanager_client = boto3.client('secretsmanager', region_name='eu-west-1')
+    return secretsmanager_client
 
 
 def get_db_connection():
@@ -45,7 +266,7 @@ def get_db_connection():
     secret_name = os.environ.get('DB_SECRET_NAME', 'consultia/database/credentials')
 
     try:
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
+        response = get_secretsmanager_client().get_secret_value(SecretId=secret_name)
         secret = json.loads(response['SecretString'])
 
         db_conn = psycopg2.connect(
@@ -65,34 +286,233 @@ def get_db_connection():
         raise
 
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file using PyPDF2"""
+class ObjectTooLargeError(ValueError):
+    """An uploaded file is larger than KB_MAX_OBJECT_BYTES"""
+
+
+def download_s3_object(bucket: str, key: str) -> Tuple[BinaryIO, str]:
+    """
+    Download an S3 object into a seekable file object.
+
+    The size is checked with a HEAD request first. The body is then copied
+    in S3_DOWNLOAD_CHUNK_BYTES chunks, either into memory (small objects)
+    or into a named temporary file in S3_SPOOL_DIR that is deleted when
+    closed, and hashed on the way. The GET is conditional on the HEAD's
+    ETag, so the checked size is the downloaded size.
+
+    Returns:
+        (file object positioned at the start, SHA-256 hex of the content);
+        close the file when done
+
+    Raises:
+        ObjectTooLargeError if the object is over KB_MAX_OBJECT_BYTES
+    """
+    s3 = get_s3_client()
+
+    head = s3.head_object(Bucket=bucket, Key=key)
+    size = head['ContentLength']
+    if size > KB_MAX_OBJECT_BYTES:
+        raise ObjectTooLargeError(f"File is {size} bytes, over the {KB_MAX_OBJECT_BYTES} byte limit")
+
+    if size <= S3_SPOOL_MAX_MEMORY_BYTES:
+        file_obj = BytesIO()
+    else:
+        file_obj = tempfile.NamedTemporaryFile(dir=S3_SPOOL_DIR, prefix='kb-source-')
+
+    try:
+        body = s3.get_object(Bucket=bucket, Key=key, IfMatch=head['ETag'])['Body']
+        digest = hashlib.sha256()
+        try:
+            while True:
+                chunk = body.read(S3_DOWNLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                file_obj.write(chunk)
+        finally:
+            body.close()
+
+        file_obj.seek(0)
+        logger.info(f"[S3] Downloaded {size} bytes to {'memory' if isinstance(file_obj, BytesIO) else file_obj.name}")
+        return file_obj, digest.hexdigest()
+
+    except Exception:
+        file_obj.close()
+        raise
+
+
+def reopen_file(file_obj: BinaryIO) -> BinaryIO:
+    """
+    File object with its own read position: a new handle for a file on
+    disk, or file_obj itself for an in-memory buffer (which a forked worker
+    already has its own copy of).
+    """
+    name = getattr(file_obj, 'name', None)
+    if isinstance(name, str) and os.path.exists(name):
+        return open(name, 'rb')
+    return file_obj
+
+
+def extract_pdf_page(pdf_reader, page_num: int) -> str:
+    """Extract the text of one PDF page ('' if the page has no text)"""
+    return pdf_reader.pages[page_num].extract_text() or ''
+
+
+def pdf_page_worker(pdf_file: BinaryIO, page_nums: List[int], conn) -> None:
+    """
+    Worker process: extract a range of pages and send one message per page.
+
+    Runs in a forked child (pdf_file and the imported PyPDF2 module are
+    inherited, nothing is pickled). Messages are (page_num, text, error).
+    """
+    import PyPDF2
+
+    try:
+        pdf_reader = PyPDF2.PdfReader(reopen_file(pdf_file))
+        for page_num in page_nums:
+            try:
+                conn.send((page_num, extract_pdf_page(pdf_reader, page_num), None))
+            except Exception as e:
+                conn.send((page_num, None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def extract_pdf_pages_parallel(
+    pdf_file: BinaryIO,
+    page_count: int,
+    workers: int,
+    page_timeout: float
+) -> List[str]:
+    """
+    Extract all pages of a PDF with a pool of worker processes (a pool of
+    one still enforces page_timeout).
+
+    Pages are split into one contiguous range per worker. Every worker
+    reports each page as soon as it is extracted; a worker that sends nothing
+    for page_timeout seconds is killed, its current page is left empty and a
+    new worker continues with the rest of its range.
+
+    Uses Process + Pipe rather than multiprocessing.Pool or
+    ProcessPoolExecutor: Lambda has no /dev/shm, which their queues need.
+
+    Args:
+        pdf_file: PDF file object (in memory or a named file on disk)
+        page_count: Number of pages in the document
+        workers: Number of worker processes
+        page_timeout: Seconds a single page may take
+
+    Returns:
+        Page texts, in page order
+    """
+    context = multiprocessing.get_context('fork')
+    texts = [''] * page_count
+    pending: List[List[int]] = []  # Remaining page ranges, one per worker
+    range_size = -(-page_count // workers)
+    for start in range(0, page_count, range_size):
+        pending.append(list(range(start, min(start + range_size, page_count))))
+
+    running: Dict[Any, Tuple[Any, List[int], float]] = {}  # conn -> (process, remaining pages, deadline)
+
+    def start_worker(page_nums: List[int]) -> None:
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=pdf_page_worker, args=(pdf_file, page_nums, child_conn), daemon=True)
+        process.start()
+        child_conn.close()
+        running[parent_conn] = (process, page_nums, time.monotonic() + page_timeout)
+
+    def stop_worker(conn) -> None:
+        process, _, _ = running.pop(conn)
+        conn.close()
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+    try:
+        for page_nums in pending:
+            start_worker(page_nums)
+
+        while running:
+            now = time.monotonic()
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            ready = wait_for_connections(list(running), timeout=max(0.0, next_deadline - now))
+
+            for conn in ready:
+                process, page_nums, _ = running[conn]
+                try:
+                    page_num, text, error = conn.recv()
+                except EOFError:
+                    # Worker exited: done, or crashed before reporting the rest
+                    stop_worker(conn)
+                    if page_nums:
+                        logger.warning(f"[PDF] Worker exited with code {process.exitcode}, "
+                                       f"skipping page {page_nums[0] + 1}")
+                        if len(page_nums) > 1:
+                            start_worker(page_nums[1:])
+                    continue
+
+                if error:
+                    logger.warning(f"[PDF] Page {page_num + 1} skipped: {error}")
+                else:
+                    texts[page_num] = text
+                running[conn] = (process, page_nums[1:], time.monotonic() + page_timeout)
+
+            now = time.monotonic()
+            for conn, (process, page_nums, deadline) in list(running.items()):
+                if deadline <= now and conn not in ready:
+                    stop_worker(conn)
+                    if not page_nums:
+                        continue
+                    logger.warning(f"[PDF] Page {page_nums[0] + 1} timed out after {page_timeout}s, skipping")
+                    if len(page_nums) > 1:
+                        start_worker(page_nums[1:])
+
+    finally:
+        for conn in list(running):
+            stop_worker(conn)
+
+    return texts
+
+
+def extract_text_from_pdf(pdf_file: BinaryIO) -> str:
+    """
+    Extract text from PDF file using PyPDF2.
+
+    Pages are extracted in worker processes (see extract_pdf_pages_parallel),
+    in parallel for large documents and by a single worker otherwise, so the
+    per-page timeout always applies; page texts are joined once, in page order.
+    """
+    # Imported here so that manual_text and website messages never load it
+    import PyPDF2
+
     try:
-        pdf_file = BytesIO(file_content)
         pdf_reader = PyPDF2.PdfReader(pdf_file)
+        page_count = len(pdf_reader.pages)
+        workers = min(PDF_EXTRACT_WORKERS, page_count) if page_count >= PDF_PARALLEL_MIN_PAGES else 1
 
-        text = ""
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() + "\n\n"
+        if page_count:
+            pages = extract_pdf_pages_parallel(pdf_file, page_count, max(workers, 1), PDF_PAGE_TIMEOUT_SECONDS)
+        else:
+            pages = []
 
-        logger.info(f"[PDF] Extracted {len(text)} characters from {len(pdf_reader.pages)} pages")
-        return text.strip()
+        text = "\n\n".join(pages).strip()
+
+        logger.info(f"[PDF] Extracted {len(text)} characters from {page_count} pages ({workers} workers)")
+        return text
 
     except Exception as e:
         logger.error(f"[PDF] Extraction error: {e}")
         raise
 
 
-def extract_text_from_docx(file_content: bytes) -> str:
+def extract_text_from_docx(docx_file: BinaryIO) -> str:
     """Extract text from DOCX file using python-docx"""
+    import docx
+
     try:
-        docx_file = BytesIO(file_content)
         doc = docx.Document(docx_file)
 
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        text = "\n".join(paragraph.text for paragraph in doc.paragraphs)
 
         logger.info(f"[DOCX] Extracted {len(text)} characters from {len(doc.paragraphs)} paragraphs")
         return text.strip()
@@ -102,29 +522,671 @@ def extract_text_from_docx(file_content: bytes) -> str:
         raise
 
 
-def structure_knowledge_with_bedrock(raw_text: str, business_context: Dict[str, Any]) -> Dict[str, Any]:
+def extract_text(source_type: str, source_file: BinaryIO) -> str:
+    """Extract the text of a 'pdf' or 'docx' file"""
+    if source_type == 'pdf':
+        return extract_text_from_pdf(source_file)
+    return extract_text_from_docx(source_file)
+
+
+def extraction_worker(source_type: str, source_file: BinaryIO, conn) -> None:
     """
-    Call Amazon Bedrock Claude 3.5 Sonnet to structure the extracted text
+    Worker process: extract the text of a file and send (text, error).
 
-    Args:
-        raw_text: Raw extracted text
-        business_context: Business information (name, industry, etc.)
+    Runs in a forked child, like pdf_page_worker. It is not a daemon, so
+    large PDFs can still be split across page workers, and it leads its own
+    process group, so a timeout can kill it together with those workers.
+    """
+    os.setpgid(0, 0)
+    try:
+        conn.send((extract_text(source_type, reopen_file(source_file)), None))
+    except Exception as e:
+        conn.send((None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def kill_process_group(process) -> None:
+    """Kill a worker that leads its own process group, with all its children, and reap it"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # Exited, or not yet its own group leader
+        process.kill()
+    process.join()
+
+
+def extract_text_in_process(source_type: str, source_file: BinaryIO) -> str:
+    """
+    Extract the text of a file in a forked worker process, so that parsing
+    (pure Python, holding the GIL) does not stall the pipeline's I/O
+    threads.
+
+    The worker is forked from a threaded process, so it only runs the
+    extraction and sends the result: it never touches the database
+    connection, the AWS clients or their locks (logging reinitializes its
+    own locks after a fork). A worker that does not answer within
+    EXTRACTION_TIMEOUT_SECONDS, stuck or not, is killed with its page
+    workers.
+
+    Raises:
+        RuntimeError if extraction failed or the worker died,
+        TimeoutError if it did not finish within EXTRACTION_TIMEOUT_SECONDS
+    """
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=extraction_worker, args=(source_type, source_file, child_conn))
+    process.start()
+    child_conn.close()
+
+    try:
+        if not parent_conn.poll(EXTRACTION_TIMEOUT_SECONDS):
+            kill_process_group(process)
+            raise TimeoutError(f"{source_type} extraction did not finish within {EXTRACTION_TIMEOUT_SECONDS:.0f}s")
+        text, error = parent_conn.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError(f"Extraction worker exited with code {process.exitcode}")
+    finally:
+        parent_conn.close()
+        if process.is_alive():
+            process.join(timeout=5)
+        if process.is_alive():
+            kill_process_group(process)
+
+    if error:
+        raise RuntimeError(f"{source_type} extraction failed: {error}")
+    return text
+
+
+def extraction_cache_key(model_id: str, prompt: str) -> str:
+    """Content-addressed cache key: SHA-256 of prompt version, model id and prompt"""
+    digest = hashlib.sha256()
+    for part in (PROMPT_VERSION, model_id, prompt):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def get_cached_extraction(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a previous structuring, first in the in-process LRU and then in
+    the llm_extraction_cache table. Cache errors are logged and treated as
+    a miss so they never block processing.
+    """
+    with extraction_lru_lock:
+        if cache_key in extraction_lru:
+            extraction_lru.move_to_end(cache_key)
+            logger.info(f"[Cache] LRU hit {cache_key[:12]}")
+            return copy.deepcopy(extraction_lru[cache_key])
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE llm_extraction_cache
+                SET hit_count = hit_count + 1,
+                    last_hit_at = CURRENT_TIMESTAMP
+                WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+                RETURNING result
+            """, (cache_key,))
+
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Cache] Lookup failed, calling model: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            return None
+
+    if not row:
+        return None
+
+    result = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+    remember_extraction(cache_key, result)
+    logger.info(f"[Cache] DB hit {cache_key[:12]}")
+    return result
+
+
+def remember_extraction(cache_key: str, result: Dict[str, Any]):
+    """Add a structuring result to the in-process LRU"""
+    with extraction_lru_lock:
+        extraction_lru[cache_key] = copy.deepcopy(result)
+        extraction_lru.move_to_end(cache_key)
+        while len(extraction_lru) > EXTRACTION_CACHE_LRU_SIZE:
+            extraction_lru.popitem(last=False)
+
+
+def store_cached_extraction(cache_key: str, model_id: str, result: Dict[str, Any]):
+    """
+    Store a structuring result in the LRU and llm_extraction_cache. A sampled
+    fraction of writes also runs evict_cached_extractions.
+    """
+    remember_extraction(cache_key, result)
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            result_json = json.dumps(result)
+
+            cursor.execute("""
+                INSERT INTO llm_extraction_cache (
+                    cache_key, prompt_version, model_id, result, result_bytes, expires_at
+                )
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(hours => %s))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET result = EXCLUDED.result,
+                    result_bytes = EXCLUDED.result_bytes,
+                    expires_at = EXCLUDED.expires_at,
+                    last_hit_at = CURRENT_TIMESTAMP
+            """, (
+                cache_key,
+                PROMPT_VERSION,
+                model_id,
+                result_json,
+                len(result_json.encode('utf-8')),
+                EXTRACTION_CACHE_TTL_HOURS
+            ))
+
+            if random.random() < EXTRACTION_CACHE_EVICTION_SAMPLE_RATE:
+                evict_cached_extractions(cursor)
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Cache] Store failed: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def evict_cached_extractions(cursor):
+    """
+    Purge expired rows and, only when the table is over
+    EXTRACTION_CACHE_MAX_BYTES, evict the least recently hit rows beyond it.
+    Runs inside the caller's transaction.
+    """
+    cursor.execute("DELETE FROM llm_extraction_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+
+    cursor.execute("SELECT COALESCE(SUM(result_bytes), 0) FROM llm_extraction_cache")
+    total_bytes = cursor.fetchone()[0]
+    if total_bytes <= EXTRACTION_CACHE_MAX_BYTES:
+        return
+
+    # Size-based eviction: keep the most recently hit entries within budget
+    cursor.execute("""
+        DELETE FROM llm_extraction_cache
+        WHERE cache_key IN (
+            SELECT cache_key FROM (
+                SELECT cache_key,
+                       SUM(result_bytes) OVER (ORDER BY last_hit_at DESC, cache_key) AS running_bytes
+                FROM llm_extraction_cache
+            ) ranked
+            WHERE running_bytes > %s
+        )
+    """, (EXTRACTION_CACHE_MAX_BYTES,))
+    logger.info(f"[Cache] Evicted {cursor.rowcount} entries over {EXTRACTION_CACHE_MAX_BYTES} bytes")
+
+
+class AdaptiveBackoff:
+    """
+    Delay applied before Bedrock calls in this container: doubles on every
+    throttle (from base up to maximum) and halves after every success, until
+    it drops below half the base and is cleared.
+    """
+
+    def __init__(self, base: float, maximum: float):
+        self.base = base
+        self.maximum = maximum
+        self.delay = 0.0
+        self.lock = Lock()
+
+    def on_throttle(self) -> float:
+        """Back off further; returns the new delay"""
+        with self.lock:
+            self.delay = min(self.maximum, max(self.base, self.delay * 2))
+            return self.delay
+
+    def on_success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay >= self.base else 0.0
+
+    def pause(self) -> float:
+        """Seconds to sleep before the next call (half the delay plus jitter)"""
+        with self.lock:
+            delay = self.delay
+        return delay / 2 + random.uniform(0, delay / 2) if delay else 0.0
+
+
+bedrock_backoff = AdaptiveBackoff(BEDROCK_BACKOFF_BASE_SECONDS, BEDROCK_BACKOFF_MAX_SECONDS)
+
+
+class JsonStreamAssembler:
+    """
+    Incrementally assemble the first top-level JSON object of streamed
+    model output.
+
+    Tracks string/escape state and bracket nesting as text arrives, so the
+    closing brace of the top-level object is detected immediately and
+    mismatched brackets fail without waiting for the rest of the stream.
+    Any preamble before the first '{' (e.g. a markdown fence) is skipped.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.stack: List[str] = []
+        self.length = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, text: str) -> bool:
+        """Consume a text delta; returns True once the top-level object is closed"""
+        start = 0
+        if not self.started:
+            start = text.find('{')
+            if start == -1:
+                return False
+            self.started = True
+
+        for i in range(start, len(text)):
+            char = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.stack.append(char)
+            elif char in '}]':
+                expected = '{' if char == '}' else '['
+                if not self.stack or self.stack.pop() != expected:
+                    partial = self.text() + text[start:i + 1]
+                    raise json.JSONDecodeError(f"Unexpected '{char}' in streamed JSON", partial, len(partial) - 1)
+                if not self.stack:
+                    self.append(text[start:i + 1])
+                    self.complete = True
+                    return True
+
+        self.append(text[start:])
+        return False
+
+    def append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def estimate_request_tokens(request_body: Dict[str, Any]) -> int:
+    """Tokens a request counts against the bucket: prompt estimate plus max_tokens (as Bedrock quotas do)"""
+    prompt_chars = sum(
+        len(message['content']) if isinstance(message['content'], str) else len(json.dumps(message['content']))
+        for message in request_body.get('messages', [])
+    )
+    return int(prompt_chars / CHARS_PER_TOKEN) + request_body.get('max_tokens', 0)
+
+
+def try_acquire_bedrock_slot(model_id: str, tokens: int) -> Tuple[Optional[str], float]:
+    """
+    One admission attempt: take a lease if the model is not paused, has a
+    free concurrency slot and enough tokens in its bucket.
 
     Returns:
-        Structured knowledge as JSON
+        (lease id, 0) when admitted, otherwise (None, seconds to wait
+        before trying again)
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO bedrock_limits (limit_key, max_concurrency, tokens_per_minute, tokens_available)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (limit_key) DO NOTHING
+            """, (model_id, BEDROCK_MAX_CONCURRENCY, BEDROCK_TOKENS_PER_MINUTE, BEDROCK_TOKENS_PER_MINUTE))
+
+            # The row lock serializes acquirers of this model across containers
+            cursor.execute("""
+                SELECT max_concurrency,
+                       tokens_per_minute,
+                       LEAST(tokens_per_minute,
+                             tokens_available + tokens_per_minute * EXTRACT(EPOCH FROM (clock_timestamp() - refilled_at)) / 60),
+                       GREATEST(0, EXTRACT(EPOCH FROM (throttled_until - clock_timestamp())))
+                FROM bedrock_limits
+                WHERE limit_key = %s
+                FOR UPDATE
+            """, (model_id,))
+            max_concurrency, tokens_per_minute, available, paused_for = cursor.fetchone()
+            available, paused_for = float(available), float(paused_for)
+
+            cursor.execute("""
+                DELETE FROM bedrock_leases
+                WHERE limit_key = %s AND expires_at < clock_timestamp()
+            """, (model_id,))
+            cursor.execute("SELECT count(*) FROM bedrock_leases WHERE limit_key = %s", (model_id,))
+            in_flight = cursor.fetchone()[0]
+
+            # A request larger than the whole bucket waits for a full bucket
+            tokens = min(tokens, tokens_per_minute)
+            lease_id = None
+
+            if paused_for > 0:
+                retry_after = paused_for
+            elif in_flight >= max_concurrency:
+                retry_after = BEDROCK_ADMISSION_POLL_SECONDS
+            elif available < tokens:
+                retry_after = (tokens - available) * 60 / tokens_per_minute
+            else:
+                retry_after = 0.0
+                cursor.execute("""
+                    UPDATE bedrock_limits
+                    SET tokens_available = %s,
+                        refilled_at = clock_timestamp()
+                    WHERE limit_key = %s
+                """, (available - tokens, model_id))
+                cursor.execute("""
+                    INSERT INTO bedrock_leases (limit_key, holder, tokens, expires_at)
+                    VALUES (%s, %s, %s, clock_timestamp() + make_interval(secs => %s))
+                    RETURNING lease_id
+                """, (model_id, os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local'), tokens, BEDROCK_LEASE_TTL_SECONDS))
+                lease_id = str(cursor.fetchone()[0])
+
+            conn.commit()
+            cursor.close()
+
+            return lease_id, retry_after
+
+        except Exception:
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+
+def acquire_bedrock_slot(model_id: str, tokens: int) -> Optional[str]:
+    """
+    Wait for a shared Bedrock slot for a call of the given token cost.
+
+    Callers wait instead of failing. If the limiter is unreachable, or no
+    slot frees up within BEDROCK_ADMISSION_MAX_WAIT_SECONDS, the call goes
+    ahead without a lease (throttles are still retried by invoke_bedrock_json).
+
+    Returns:
+        Lease id for release_bedrock_slot, or None if the call was not admitted
     """
+    if not BEDROCK_ADMISSION_ENABLED:
+        return None
+
+    started = time.monotonic()
+
+    while True:
+        try:
+            lease_id, retry_after = try_acquire_bedrock_slot(model_id, tokens)
+        except Exception as e:
+            logger.warning(f"[Admission] Limiter unavailable, calling Bedrock without a lease: {e}")
+            return None
+
+        waited = time.monotonic() - started
+        if lease_id:
+            if waited >= 1:
+                logger.info(f"[Admission] Admitted after waiting {waited:.1f}s")
+            return lease_id
+
+        remaining = BEDROCK_ADMISSION_MAX_WAIT_SECONDS - waited
+        if remaining <= 0:
+            logger.warning(f"[Admission] No Bedrock slot after {waited:.0f}s, calling without a lease")
+            return None
+
+        # Jitter so waiting containers do not retry in lockstep
+        time.sleep(min(remaining, retry_after + random.uniform(0, BEDROCK_ADMISSION_POLL_SECONDS)))
+
+
+def release_bedrock_slot(lease_id: Optional[str]):
+    """Return a lease (an unreleased lease expires after BEDROCK_LEASE_TTL_SECONDS)"""
+    if not lease_id:
+        return
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("DELETE FROM bedrock_leases WHERE lease_id = %s", (lease_id,))
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Admission] Could not release lease {lease_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def report_bedrock_throttle(model_id: str, pause_seconds: float):
+    """Pause admission of model_id in every container for pause_seconds"""
+    if not BEDROCK_ADMISSION_ENABLED:
+        return
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                UPDATE bedrock_limits
+                SET throttled_until = GREATEST(
+                        COALESCE(throttled_until, clock_timestamp()),
+                        clock_timestamp() + make_interval(secs => %s)
+                    ),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE limit_key = %s
+            """, (pause_seconds, model_id))
+
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.warning(f"[Admission] Could not record throttle: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+
+
+def invoke_bedrock_json(model_id: str, request_body: Dict[str, Any]) -> str:
+    """
+    Call Bedrock under shared admission control and return the JSON object
+    text of the model's answer (see call_bedrock_json).
+
+    Every attempt holds a slot from acquire_bedrock_slot. Throttling and
+    transient unavailability are retried up to BEDROCK_MAX_ATTEMPTS times
+    with adaptive backoff; each throttle also pauses admission for all
+    containers.
+
+    Returns:
+        JSON text (parse with json.loads)
+
+    Raises:
+        botocore ClientError when retries are exhausted or the error is not
+        retryable, plus the errors of call_bedrock_json
+    """
+    tokens = estimate_request_tokens(request_body)
+
+    for attempt in range(1, BEDROCK_MAX_ATTEMPTS + 1):
+        pause = bedrock_backoff.pause()
+        if pause:
+            time.sleep(pause)
+
+        lease_id = acquire_bedrock_slot(model_id, tokens)
+        try:
+            response_text = call_bedrock_json(model_id, request_body)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code', '')
+            # Errors inside a response stream use camelCase codes (throttlingException)
+            code = code[:1].upper() + code[1:]
+            if code not in BEDROCK_RETRYABLE_ERRORS or attempt == BEDROCK_MAX_ATTEMPTS:
+                raise
+            delay = bedrock_backoff.on_throttle()
+            logger.warning(f"[Bedrock] {code} on attempt {attempt}, backing off {delay:.1f}s")
+            report_bedrock_throttle(model_id, delay)
+            continue
+        finally:
+            release_bedrock_slot(lease_id)
+
+        bedrock_backoff.on_success()
+        return response_text
+
+
+def call_bedrock_json(model_id: str, request_body: Dict[str, Any]) -> str:
+    """
+    Make one Bedrock call and return the JSON object text of the model's answer.
+
+    With BEDROCK_STREAMING_ENABLED the response is streamed with
+    invoke_model_with_response_stream: text deltas are fed to a
+    JsonStreamAssembler and the stream is closed as soon as the top-level
+    object is complete, without waiting for any trailing tokens. Otherwise
+    a blocking invoke_model call is made and the JSON object is cut out of
+    the full completion.
+
+    Returns:
+        JSON text (parse with json.loads)
+
+    Raises:
+        ValueError if the model returned no content, json.JSONDecodeError
+        if the streamed structure is malformed
+    """
+    if not BEDROCK_STREAMING_ENABLED:
+        response = get_bedrock_client().invoke_model(
+            modelId=model_id,
+            body=json.dumps(request_body)
+        )
+
+        response_body = json.loads(response['body'].read())
+        content_blocks = response_body.get('content', [])
+
+        if not content_blocks:
+            raise ValueError("No content in Bedrock response")
+
+        response_text = content_blocks[0].get('text', '')
+
+        # Try to extract JSON from the response (handle potential markdown fencing)
+        json_match = re.search(r'\{[\s\S]*\}', response_text)
+        return json_match.group(0) if json_match else response_text
+
+    response = get_bedrock_client().invoke_model_with_response_stream(
+        modelId=model_id,
+        body=json.dumps(request_body)
+    )
+
+    stream = response['body']
+    assembler = JsonStreamAssembler()
+
     try:
-        business_name = business_context.get('business_name', 'el negocio')
-        industry = business_context.get('industry', 'general')
+        for event in stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            payload = json.loads(chunk['bytes'])
+            if payload.get('type') != 'content_block_delta':
+                continue
+            if assembler.feed(payload['delta'].get('text', '')):
+                logger.info(f"[Bedrock] JSON complete after {assembler.length} chars, closing stream")
+                break
+    finally:
+        stream.close()
+
+    if not assembler.started:
+        raise ValueError("No content in Bedrock response")
+
+    return assembler.text()
+
+
+def find_chunk_end(text: str, start: int, max_chars: int) -> int:
+    """
+    End offset of the chunk starting at start: the best boundary (see
+    CHUNK_BREAK_PATTERNS) in the second half of the max_chars window, or the
+    window end if there is none.
+    """
+    window_end = min(len(text), start + max_chars)
+    if window_end == len(text):
+        return window_end
+
+    search_from = start + max_chars // 2
+    for pattern in CHUNK_BREAK_PATTERNS:
+        last_match = None
+        for last_match in pattern.finditer(text, search_from, window_end):
+            pass
+        if last_match:
+            return last_match.end()
+
+    return window_end
+
+
+def split_text_into_chunks(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters.
+
+    Chunks end at section or paragraph breaks where possible, and each chunk
+    repeats the last ~overlap_chars characters of the previous one (from a
+    line or word start) so items cut by a boundary appear whole in a chunk.
+
+    Returns:
+        Chunks in document order (a single chunk for short text)
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+
+    while start < len(text):
+        end = find_chunk_end(text, start, max_chars)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+
+        # Start the next chunk overlap_chars back, at a line or word start
+        next_start = max(start + 1, end - overlap_chars)
+        line_start = text.find('\n', next_start, end)
+        if line_start == -1:
+            line_start = text.find(' ', next_start, end)
+        start = line_start + 1 if line_start != -1 else end
 
-        prompt = f"""Eres un asistente que estructura información de negocios.
+    return chunks
+
+
+def build_structuring_prompt(text: str, business_context: Dict[str, Any], part: int = 1, parts: int = 1) -> str:
+    """Prompt asking the model to structure text (part of parts of a document)"""
+    business_name = business_context.get('business_name', 'el negocio')
+    industry = business_context.get('industry', 'general')
+
+    if parts > 1:
+        instruction = (f"Analiza el siguiente fragmento ({part} de {parts}) de un documento más largo "
+                       f"y extrae en JSON la información estructurada que contenga:")
+    else:
+        instruction = "Analiza el siguiente texto y extrae información estructurada en JSON:"
+
+    return f"""Eres un asistente que estructura información de negocios.
 
 Negocio: {business_name}
 Industria: {industry}
 
-Analiza el siguiente texto y extrae información estructurada en JSON:
+{instruction}
 
-{raw_text[:15000]}  # Limit to ~15K chars to stay within token limits
+{text}
 
 Extrae la siguiente información (devuelve null si no está disponible):
 
@@ -138,42 +1200,107 @@ Extrae la siguiente información (devuelve null si no está disponible):
 IMPORTANTE: Responde SOLO con JSON válido, sin texto adicional antes o después.
 No incluyas markdown, explicaciones ni comentarios."""
 
-        # Call Bedrock Claude 3.5 Sonnet
-        model_id = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
-
-        request_body = {
-            'anthropic_version': 'bedrock-2023-05-31',
-            'max_tokens': 4096,
-            'messages': [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            'temperature': 0.0  # Deterministic output
-        }
 
-        logger.info(f"[Bedrock] Calling {model_id}")
+def structure_prompt_with_bedrock(prompt: str) -> Dict[str, Any]:
+    """
+    Call Amazon Bedrock Claude 3.5 Sonnet with a structuring prompt.
+    Results are cached by a hash of the prompt, PROMPT_VERSION and model id.
 
-        response = bedrock.invoke_model(
-            modelId=model_id,
-            body=json.dumps(request_body)
-        )
+    Returns:
+        Structured knowledge as JSON
+    """
+    model_id = BEDROCK_MODEL_ID
 
-        response_body = json.loads(response['body'].read())
+    cache_key = extraction_cache_key(model_id, prompt)
+    if EXTRACTION_CACHE_ENABLED:
+        cached = get_cached_extraction(cache_key)
+        if cached is not None:
+            logger.info(f"[Bedrock] Cache hit, skipping {model_id} call")
+            return cached
 
-        # Extract text content from response
-        content_blocks = response_body.get('content', [])
-        if not content_blocks:
-            raise ValueError("No content in Bedrock response")
+    request_body = {
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': 4096,
+        'messages': [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ],
+        'temperature': 0.0  # Deterministic output
+    }
 
-        response_text = content_blocks[0].get('text', '')
+    logger.info(f"[Bedrock] Calling {model_id}")
+
+    response_text = invoke_bedrock_json(model_id, request_body)
+
+    # Parse JSON from response
+    structured_data = json.loads(response_text)
+
+    logger.info(f"[Bedrock] Structured data extracted: {list(structured_data.keys())}")
+
+    if EXTRACTION_CACHE_ENABLED:
+        store_cached_extraction(cache_key, model_id, structured_data)
+
+    return structured_data
+
+
+def structure_knowledge_with_bedrock(raw_text: str, business_context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Structure the extracted text of a source with Amazon Bedrock.
 
-        # Parse JSON from response
-        structured_data = json.loads(response_text)
+    Text that fits in one prompt is structured with a single call. Longer
+    text is split with split_text_into_chunks, the chunks are structured on
+    a pool of STRUCTURING_CONCURRENCY threads and the chunk results are
+    merged with merge_structured_data.
 
-        logger.info(f"[Bedrock] Structured data extracted: {list(structured_data.keys())}")
+    Text beyond STRUCTURING_MAX_CHUNKS chunks is not structured. The result
+    then has a 'partial' entry ({'chunks_structured', 'chunks_total',
+    'chars_total'}) so the source can be flagged as incomplete; merges
+    ignore it.
 
+    Args:
+        raw_text: Raw extracted text
+        business_context: Business information (name, industry, etc.)
+
+    Returns:
+        Structured knowledge as JSON
+    """
+    try:
+        chunks = split_text_into_chunks(raw_text, STRUCTURING_CHUNK_CHARS, STRUCTURING_CHUNK_OVERLAP_CHARS)
+
+        if len(chunks) == 1:
+            return structure_prompt_with_bedrock(build_structuring_prompt(chunks[0], business_context))
+
+        partial = None
+        if len(chunks) > STRUCTURING_MAX_CHUNKS:
+            logger.warning(f"[Bedrock] {len(chunks)} chunks, structuring only the first {STRUCTURING_MAX_CHUNKS}")
+            partial = {
+                'chunks_structured': STRUCTURING_MAX_CHUNKS,
+                'chunks_total': len(chunks),
+                'chars_total': len(raw_text),
+            }
+            chunks = chunks[:STRUCTURING_MAX_CHUNKS]
+
+        logger.info(f"[Bedrock] Structuring {len(raw_text)} chars in {len(chunks)} chunks")
+
+        prompts = [
+            build_structuring_prompt(chunk, business_context, part, len(chunks))
+            for part, chunk in enumerate(chunks, start=1)
+        ]
+
+        with ThreadPoolExecutor(max_workers=min(STRUCTURING_CONCURRENCY, len(prompts))) as executor:
+            futures = [executor.submit(structure_prompt_with_bedrock, prompt) for prompt in prompts]
+            try:
+                chunk_results = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        structured_data = merge_structured_data(chunk_results)
+        if partial:
+            structured_data['partial'] = partial
         return structured_data
 
     except Exception as e:
@@ -181,219 +1308,1045 @@ No incluyas markdown, explicaciones ni comentarios."""
         raise
 
 
-def update_kb_source(source_id: str, raw_text: str, extracted_data: Optional[Dict], status: str, error_msg: Optional[str] = None):
-    """Update kb_sources record with processing results"""
+def save_kb_source_results(jobs: List[Dict[str, Any]]):
+    """
+    Write the results of a batch's sources in one transaction: status, raw
+    text and extracted data of all of them with one UPDATE, and the passages
+    of the completed ones with one INSERT (content_hash is kept if None).
+    Passages that cannot be stored are logged and don't undo the results
+    (search is best effort).
+    """
+    if not jobs:
+        return
+
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            execute_values(cursor, """
+                UPDATE kb_sources AS ks
+                SET raw_text = v.raw_text,
+                    extracted_data = v.extracted_data::jsonb,
+                    processing_status = v.status,
+                    error_message = v.error_message,
+                    content_hash = COALESCE(v.content_hash, ks.content_hash),
+                    processed_at = CURRENT_TIMESTAMP,
+                    processed_version = nextval('kb_sources_processed_version_seq')
+                FROM (VALUES %s) AS v (source_id, raw_text, extracted_data, status, error_message, content_hash)
+                WHERE ks.source_id = v.source_id::uuid
+            """, [
+                (
+                    job['source_id'],
+                    job['raw_text'],
+                    json.dumps(job['structured_data']) if job['structured_data'] else None,
+                    job['status'],
+                    job['error_message'],
+                    job['content_hash'],
+                )
+                for job in jobs
+            ], page_size=len(jobs))
+
+            completed = [job for job in jobs if job['status'] == 'complete']
+            passage_rows = [
+                (job['source_id'], job['kb_id'], passage_index, content, fold_accents(content), embedding, embedding_model)
+                for job in completed
+                for passage_index, (content, embedding, embedding_model) in enumerate(job['passages'])
+            ]
+
+            if completed:
+                cursor.execute("SAVEPOINT kb_passages")
+                try:
+                    cursor.execute("DELETE FROM kb_passages WHERE source_id = ANY(%s::uuid[])",
+                                   ([job['source_id'] for job in completed],))
+                    if passage_rows:
+                        execute_values(cursor, """
+                            INSERT INTO kb_passages (source_id, kb_id, passage_index, content, search_vector,
+                                                     embedding, embedding_model)
+                            VALUES %s
+                        """, passage_rows, template="(%s, %s, %s, %s, to_tsvector('spanish', %s), %s::vector, %s)",
+                            page_size=500)
+                    cursor.execute("RELEASE SAVEPOINT kb_passages")
+                except Exception as e:
+                    logger.warning(f"[Search] Could not index passages of {len(completed)} sources: {e}")
+                    cursor.execute("ROLLBACK TO SAVEPOINT kb_passages")
+
+            conn.commit()
+            cursor.close()
+
+            logger.info(f"[DB] Saved {len(jobs)} kb_sources ({len(completed)} complete, "
+                        f"{len(passage_rows)} passages)")
+
+        except Exception as e:
+            logger.error(f"[DB] Error saving kb_sources: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+
+def fold_accents(text: str) -> str:
+    """Text with vowel accents removed (ñ is kept: it is a letter of its own)"""
+    return text.translate(ACCENT_TRANSLATION)
+
+
+def prepare_kb_passages(source_id: str, raw_text: Optional[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Full-text passages of raw_text with their embeddings, for
+    save_kb_source_results.
+
+    Returns:
+        (content, embedding, embedding_model) per passage; passages that
+        cannot be embedded have no embedding (they stay searchable by text)
+    """
+    passages = [
+        passage for passage in split_text_into_chunks(raw_text or '', KB_PASSAGE_CHARS, KB_PASSAGE_OVERLAP_CHARS)
+        if passage.strip()
+    ]
+    if not passages:
+        return []
+
+    embedder = get_embedder()
     try:
+        embeddings = [format_vector(vector) for vector in embedder.embed(passages)]
+    except Exception as e:
+        logger.warning(f"[Embedding] Could not embed passages of source {source_id}: {e}")
+        return [(passage, None, None) for passage in passages]
+
+    return [(passage, embedding, embedder.model_id) for passage, embedding in zip(passages, embeddings)]
+
+
+def search_kb_passages(kb_id: str, query: str, top_k: int = KB_SEARCH_DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Best full-text passages of a knowledge base for a query.
+
+    The query's words are stemmed with the Spanish configuration and OR-ed,
+    so passages need not contain every word; passages are ranked by cover
+    density (more and closer matches first). Uses the GIN index on
+    kb_passages.search_vector.
+
+    Args:
+        kb_id: Knowledge base UUID
+        query: Natural-language query (e.g. the caller's question)
+        top_k: Number of passages to return (at most KB_SEARCH_MAX_TOP_K)
+
+    Returns:
+        Passages, best first: {source_id, passage_index, content, rank}
+    """
+    top_k = max(1, min(int(top_k), KB_SEARCH_MAX_TOP_K))
+
+    with db_lock:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            UPDATE kb_sources
-            SET raw_text = %s,
-                extracted_data = %s,
-                processing_status = %s,
-                error_message = %s,
-                processed_at = CURRENT_TIMESTAMP
-            WHERE source_id = %s
-        """, (
-            raw_text,
-            json.dumps(extracted_data) if extracted_data else None,
-            status,
-            error_msg,
-            source_id
-        ))
+        try:
+            cursor.execute("""
+                WITH query AS (
+                    SELECT replace(plainto_tsquery('spanish', %s)::text, ' & ', ' | ')::tsquery AS terms
+                )
+                SELECT p.source_id, p.passage_index, p.content, ts_rank_cd(p.search_vector, query.terms, 32) AS rank
+                FROM kb_passages p, query
+                WHERE p.kb_id = %s AND p.search_vector @@ query.terms
+                ORDER BY rank DESC, p.source_id, p.passage_index
+                LIMIT %s
+            """, (fold_accents(query), kb_id, top_k))
+
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+
+        except Exception:
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+    return [
+        {
+            'source_id': str(source_id),
+            'passage_index': passage_index,
+            'content': content,
+            'rank': float(rank),
+        }
+        for source_id, passage_index, content, rank in rows
+    ]
 
-        conn.commit()
-        cursor.close()
 
-        logger.info(f"[DB] Updated kb_source {source_id} with status {status}")
+class HashingEmbedder:
+    """
+    Deterministic embedder for local runs: word stems and stem bigrams of
+    the normalized text are hashed (crc32) into signed buckets and the
+    vector is L2-normalized. Captures word overlap, not meaning.
+    """
+
+    model_id = 'hashing-v1'
 
-    except Exception as e:
-        logger.error(f"[DB] Error updating kb_source: {e}")
-        raise
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
 
+    def embed_one(self, text: str) -> List[float]:
+        words = normalize_text_key(text).split()
+        stems = [word[:HASHING_EMBEDDER_STEM_CHARS] for word in words if word not in NEAR_DUPLICATE_STOPWORDS]
+        features = stems + [f'{first} {second}' for first, second in zip(stems, stems[1:])]
 
-def merge_and_update_knowledge_base(kb_id: str):
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            feature_hash = zlib.crc32(feature.encode('utf-8'))
+            vector[feature_hash % self.dimensions] += 1.0 if feature_hash & 0x80000000 else -1.0
+
+        norm = sum(value * value for value in vector) ** 0.5
+        return [value / norm for value in vector] if norm else vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+class BedrockEmbedder:
     """
-    Merge all completed sources and update knowledge_bases table
+    Amazon Titan Text Embeddings v2 (normalized vectors). The model takes
+    one text per call, so batches are embedded on a pool of
+    EMBEDDING_CONCURRENCY threads; throttled calls are retried with their
+    own adaptive backoff.
     """
-    try:
+
+    model_id = EMBEDDING_MODEL_ID
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.backoff = AdaptiveBackoff(BEDROCK_BACKOFF_BASE_SECONDS, BEDROCK_BACKOFF_MAX_SECONDS)
+
+    def embed_one(self, text: str) -> List[float]:
+        for attempt in range(1, BEDROCK_MAX_ATTEMPTS + 1):
+            pause = self.backoff.pause()
+            if pause:
+                time.sleep(pause)
+
+            try:
+                response = get_bedrock_client().invoke_model(
+                    modelId=self.model_id,
+                    body=json.dumps({'inputText': text, 'dimensions': self.dimensions, 'normalize': True})
+                )
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code', '')
+                if code not in BEDROCK_RETRYABLE_ERRORS or attempt == BEDROCK_MAX_ATTEMPTS:
+                    raise
+                delay = self.backoff.on_throttle()
+                logger.warning(f"[Embedding] {code} on attempt {attempt}, backing off {delay:.1f}s")
+                continue
+
+            self.backoff.on_success()
+            return json.loads(response['body'].read())['embedding']
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) == 1:
+            return [self.embed_one(texts[0])]
+
+        with ThreadPoolExecutor(max_workers=min(EMBEDDING_CONCURRENCY, len(texts))) as executor:
+            return list(executor.map(self.embed_one, texts))
+
+
+EMBEDDERS = {
+    'hashing': HashingEmbedder,
+    'bedrock': BedrockEmbedder,
+}
+embedder = None
+pgvector_version = None
+
+
+def get_embedder():
+    """Get the KB_EMBEDDER embedder (created on first use)"""
+    global embedder
+
+    if embedder is None:
+        with aws_clients_lock:
+            if embedder is None:
+                embedder = EMBEDDERS[KB_EMBEDDER](EMBEDDING_DIMENSIONS)
+    return embedder
+
+
+def format_vector(vector: List[float]) -> str:
+    """pgvector text form of an embedding"""
+    return '[' + ','.join(f'{value:.6g}' for value in vector) + ']'
+
+
+def get_pgvector_version(cursor) -> Tuple[int, ...]:
+    """Installed pgvector version, e.g. (0, 8, 0), read once per container (() if not installed)"""
+    global pgvector_version
+
+    if pgvector_version is None:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+        pgvector_version = tuple(int(part) for part in re.findall(r'\d+', row[0])) if row else ()
+        logger.info(f"[Search] pgvector {row[0] if row else 'not installed'}")
+
+    return pgvector_version
+
+
+def search_kb_passages_semantic(kb_id: str, query: str, top_k: int = KB_SEARCH_DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Passages of a knowledge base closest in meaning to a query.
+
+    The query is embedded with the current embedder and compared with the
+    passages it embedded (inner product of normalized vectors, i.e. cosine
+    similarity). Large knowledge bases are searched through the HNSW index
+    (approximate), small ones exactly through the kb_id index.
+
+    Args:
+        kb_id: Knowledge base UUID
+        query: Natural-language query
+        top_k: Number of passages to return (at most KB_SEARCH_MAX_TOP_K)
+
+    Returns:
+        Passages, most similar first: {source_id, passage_index, content, similarity}
+    """
+    top_k = max(1, min(int(top_k), KB_SEARCH_MAX_TOP_K))
+    current_embedder = get_embedder()
+    query_vector = format_vector(current_embedder.embed([query])[0])
+
+    with db_lock:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get all completed sources
-        cursor.execute("""
-            SELECT extracted_data
-            FROM kb_sources
-            WHERE kb_id = %s AND processing_status = 'complete' AND extracted_data IS NOT NULL
-        """, (kb_id,))
+        try:
+            cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(max(VECTOR_EF_SEARCH, top_k)),))
+            if VECTOR_ITERATIVE_SCAN and get_pgvector_version(cursor) >= (0, 8):
+                cursor.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+
+            cursor.execute("""
+                SELECT source_id, passage_index, content, -(embedding <#> %s::vector) AS similarity
+                FROM kb_passages
+                WHERE kb_id = %s AND embedding_model = %s
+                ORDER BY embedding <#> %s::vector
+                LIMIT %s
+            """, (query_vector, kb_id, current_embedder.model_id, query_vector, top_k))
+
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+
+        except Exception:
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+    return [
+        {
+            'source_id': str(source_id),
+            'passage_index': passage_index,
+            'content': content,
+            'similarity': float(similarity),
+        }
+        for source_id, passage_index, content, similarity in rows
+    ]
 
-        sources = cursor.fetchall()
 
-        if not sources:
-            logger.info(f"[KB] No completed sources to merge for {kb_id}")
-            return
+def text_content_hash(text: str) -> str:
+    """SHA-256 hex of a text after Unicode (NFC) and whitespace normalization"""
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
 
-        # Merge all sources
-        merged_data = {
-            'services': [],
-            'faqs': [],
-            'policies': {},
-            'hours': {},
-            'contacts': {'emails': [], 'phones': []},
-            'locations': []
-        }
 
-        for (extracted_data,) in sources:
-            data = json.loads(extracted_data) if isinstance(extracted_data, str) else extracted_data
+def find_completed_duplicate(content_hash: str, customer_id: str, source_id: str) -> Optional[Tuple[str, str, Any]]:
+    """
+    Latest completed source of the same customer with the same content hash.
+
+    Only the customer's own sources are matched: the structuring prompt
+    includes the customer's business name and industry.
+
+    Returns:
+        (source_id, raw_text, extracted_data) of the match, or None
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT ks.source_id, ks.raw_text, ks.extracted_data
+                FROM kb_sources ks
+                JOIN knowledge_bases kb ON kb.kb_id = ks.kb_id
+                WHERE ks.content_hash = %s
+                  AND ks.processing_status = 'complete'
+                  AND ks.extracted_data IS NOT NULL
+                  AND ks.source_id <> %s
+                  AND kb.customer_id = %s
+                ORDER BY ks.processed_at DESC
+                LIMIT 1
+            """, (content_hash, source_id, customer_id))
+
+            duplicate = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+
+        except Exception as e:
+            logger.error(f"[Dedup] Error looking up duplicates of source {source_id}: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+    return duplicate
+
+
+def normalize_text_key(value: Any) -> str:
+    """Case-, accent-, punctuation- and spacing-insensitive form of a text"""
+    text = unicodedata.normalize('NFKD', str(value)).casefold()
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def merge_item_key(field: str, item: Any) -> str:
+    """
+    Dedup key of an item of a merged list field: the normalized service
+    name, FAQ question or address, the lowercased email or the digits of a
+    phone number. Items without such text are keyed by their JSON.
+    """
+    if field == 'emails':
+        key = str(item).strip().lower()
+    elif field == 'phones':
+        key = re.sub(r'\D', '', str(item))
+    elif isinstance(item, dict):
+        if field == 'faqs':
+            text = item.get('question')
+        elif field == 'locations':
+            text = ' '.join(str(item.get(part) or '') for part in ('address', 'city', 'country'))
+        else:
+            text = item.get('name')
+        key = normalize_text_key(text) if text else ''
+    else:
+        key = normalize_text_key(item)
+
+    return key or json.dumps(item, sort_keys=True)
+
 
-            # Merge services (unique)
-            if data.get('services'):
-                merged_data['services'].extend(data['services'])
-                merged_data['services'] = list(set(merged_data['services']))
+def near_duplicate_text(field: str, item: Any) -> str:
+    """Normalized text that near-duplicates of an item share: the service name or FAQ question"""
+    if isinstance(item, dict):
+        item = item.get('question') if field == 'faqs' else item.get('name')
+    return normalize_text_key(item) if item else ''
 
-            # Merge FAQs
-            if data.get('faqs'):
-                merged_data['faqs'].extend(data['faqs'])
 
-            # Merge policies
-            if data.get('policies'):
-                merged_data['policies'].update(data['policies'])
+def text_shingles(text: str) -> set:
+    """Hashed word stems of a normalized text (stable across processes)"""
+    words = text.split()
+    stems = [word[:NEAR_DUPLICATE_STEM_CHARS] for word in words if word not in NEAR_DUPLICATE_STOPWORDS]
+    return {zlib.crc32(stem.encode('utf-8')) for stem in (stems or words)}
 
-            # Merge hours (last one wins)
-            if data.get('hours'):
-                merged_data['hours'].update(data['hours'])
 
-            # Merge contacts (unique)
-            if data.get('contacts'):
-                if data['contacts'].get('emails'):
-                    merged_data['contacts']['emails'].extend(data['contacts']['emails'])
-                    merged_data['contacts']['emails'] = list(set(merged_data['contacts']['emails']))
+def minhash_bands(shingles: set) -> List[int]:
+    """LSH band hashes of the MinHash signature of a shingle set"""
+    signature = [
+        min((a * shingle + b) % MINHASH_PRIME for shingle in shingles)
+        for a, b in MINHASH_COEFFICIENTS
+    ]
+    return [
+        zlib.crc32(repr((band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])).encode('ascii'))
+        for band in range(MINHASH_BANDS)
+    ]
 
-                if data['contacts'].get('phones'):
-                    merged_data['contacts']['phones'].extend(data['contacts']['phones'])
-                    merged_data['contacts']['phones'] = list(set(merged_data['contacts']['phones']))
 
-            # Merge locations
-            if data.get('locations'):
-                merged_data['locations'].extend(data['locations'])
+def representative_score(item: Any) -> int:
+    """How detailed an item is: the length of its normalized text (answer, description, ...)"""
+    if isinstance(item, dict):
+        return sum(len(normalize_text_key(value)) for value in item.values() if value)
+    return len(normalize_text_key(item))
+
+
+class KnowledgeMerger:
+    """
+    Merged structured knowledge plus dedup indexes (the keys of the items
+    already merged and, for services and FAQs, the LSH bands of their
+    MinHash signatures), so more structured data can be folded in with work
+    proportional to its own size.
+
+    List items are kept once per merge_item_key (first occurrence wins).
+    Services and FAQs are also clustered with their near-duplicates, and
+    each cluster keeps its highest representative_score member in the
+    position of its first member. Policies and hours are combined with
+    later data winning on the same key.
+    """
+
+    def __init__(self, merged_data: Optional[Dict[str, Any]] = None,
+                 dedup_keys: Optional[Dict[str, Any]] = None):
+        merged_data = merged_data or {}
+        contacts = merged_data.get('contacts') or {}
+
+        self.data = {
+            'services': list(merged_data.get('services') or []),
+            'faqs': list(merged_data.get('faqs') or []),
+            'policies': dict(merged_data.get('policies') or {}),
+            'hours': dict(merged_data.get('hours') or {}),
+            'contacts': {
+                'emails': list(contacts.get('emails') or []),
+                'phones': list(contacts.get('phones') or []),
+            },
+            'locations': list(merged_data.get('locations') or [])
+        }
+
+        if dedup_keys is None:
+            self.keys = {
+                field: {merge_item_key(field, item) for item in self.items(field)}
+                for field in MERGE_KEY_FIELDS
+            }
+        else:
+            self.keys = {field: set(dedup_keys.get(field) or []) for field in MERGE_KEY_FIELDS}
+
+        # Per item of each near-duplicate field: the LSH bands of its cluster
+        # members; band_index maps band -> positions of the items that have it
+        saved_bands = (dedup_keys or {}).get('minhash') or {}
+        self.bands: Dict[str, List[List[int]]] = {}
+        self.band_index: Dict[str, Dict[int, List[int]]] = {}
+        self.shingles: Dict[str, Dict[int, set]] = {}  # Computed when an item is first compared
+
+        if NEAR_DUPLICATE_ENABLED:
+            for field in NEAR_DUPLICATE_FIELDS:
+                items = self.items(field)
+                field_bands = saved_bands.get(field)
+                if field_bands is None or len(field_bands) != len(items):
+                    field_bands = [self.item_bands(field, item) for item in items]
+
+                self.bands[field] = field_bands
+                self.band_index[field] = {}
+                self.shingles[field] = {}
+                for position, item_bands in enumerate(field_bands):
+                    for band in item_bands:
+                        self.band_index[field].setdefault(band, []).append(position)
+
+    def items(self, field: str) -> List[Any]:
+        """Merged list of a MERGE_KEY_FIELDS field"""
+        if field in ('emails', 'phones'):
+            return self.data['contacts'][field]
+        return self.data[field]
+
+    @staticmethod
+    def item_bands(field: str, item: Any) -> List[int]:
+        """LSH bands of an item ([] if it has no text to compare)"""
+        text = near_duplicate_text(field, item)
+        return minhash_bands(text_shingles(text)) if text else []
+
+    def find_near_duplicate(self, field: str, shingles: set, bands: List[int]) -> Optional[int]:
+        """Position of the most similar merged item at or above NEAR_DUPLICATE_THRESHOLD, if any"""
+        candidates = set()
+        for band in bands:
+            candidates.update(self.band_index[field].get(band, ()))
+
+        items = self.items(field)
+        cached_shingles = self.shingles[field]
+        best_position, best_similarity = None, NEAR_DUPLICATE_THRESHOLD
+        for position in sorted(candidates):
+            other = cached_shingles.get(position)
+            if other is None:
+                other = cached_shingles[position] = text_shingles(near_duplicate_text(field, items[position]))
+            similarity = len(shingles & other) / len(shingles | other)
+            if similarity >= best_similarity:
+                best_position, best_similarity = position, similarity
+
+        return best_position
+
+    def add_near_duplicate_item(self, field: str, item: Any) -> bool:
+        """
+        Add a service or FAQ to its near-duplicate cluster, or as a new
+        cluster. Returns False if the item has no text to compare.
+        """
+        text = near_duplicate_text(field, item)
+        if not text:
+            return False
+
+        shingles = text_shingles(text)
+        bands = minhash_bands(shingles)
+        items = self.items(field)
+        position = self.find_near_duplicate(field, shingles, bands)
+
+        if position is None:
+            position = len(items)
+            items.append(item)
+            self.bands[field].append([])
+            self.shingles[field][position] = shingles
+        elif representative_score(item) > representative_score(items[position]):
+            items[position] = item
+            self.shingles[field][position] = shingles
+
+        # Index the new member's bands under the cluster
+        cluster_bands = self.bands[field][position]
+        for band in bands:
+            if band not in cluster_bands:
+                cluster_bands.append(band)
+                self.band_index[field].setdefault(band, []).append(position)
+
+        return True
+
+    def add(self, data: Dict[str, Any]):
+        """Fold the structured data of one source (or chunk) into the merge"""
+        if not isinstance(data, dict):
+            return
+
+        contacts = data.get('contacts') if isinstance(data.get('contacts'), dict) else {}
+
+        for field in MERGE_KEY_FIELDS:
+            new_items = contacts.get(field) if field in ('emails', 'phones') else data.get(field)
+            if not new_items:
+                continue
+            if not isinstance(new_items, list):
+                new_items = [new_items]
+
+            merged_items = self.items(field)
+            keys = self.keys[field]
+            for item in new_items:
+                if not item:
+                    continue
+                key = merge_item_key(field, item)
+                if field in self.bands and self.add_near_duplicate_item(field, item):
+                    keys.add(key)
+                elif key not in keys:
+                    keys.add(key)
+                    merged_items.append(item)
+                    if field in self.bands:
+                        self.bands[field].append([])
+
+        # Policies and hours: last one wins
+        for field in ('policies', 'hours'):
+            if isinstance(data.get(field), dict):
+                self.data[field].update(data[field])
+
+    def dedup_state(self) -> Dict[str, Any]:
+        """Dedup indexes in the form stored in kb_merge_state.dedup_keys"""
+        state: Dict[str, Any] = {field: list(keys) for field, keys in self.keys.items()}
+        if self.bands:
+            state['minhash'] = self.bands
+        return state
+
+
+def merge_structured_data(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge structured knowledge (the sources of a KB, or the chunks of one source)"""
+    merger = KnowledgeMerger()
+    for data in items:
+        merger.add(data)
+    return merger.data
+
+
+def merge_and_update_knowledge_base(kb_id: str):
+    """
+    Fold newly completed sources into the knowledge base's structured data.
+
+    The merged data (knowledge_bases.structured_data) and its dedup indexes
+    (kb_merge_state) are kept between merges, so normally only the sources
+    completed since the last merge are read. The merge is rebuilt from all
+    completed sources when there is no saved state, when a merged source is
+    no longer complete (deleted, or failed when reprocessed) or when a merged
+    source was saved again since the merge read it (its processed_version
+    changed; its old contribution cannot be taken out). Versions are
+    compared rather than timestamps, so a source saved while a merge runs
+    is never missed. A knowledge base that is already up to date is left
+    untouched, so callers can merge every knowledge base a batch touched.
+
+    Args:
+        kb_id: Knowledge base UUID
+    """
+    with db_lock:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+
+            # Lock the KB row: merges of its sources are serialized
+            cursor.execute("""
+                SELECT kb.structured_data, ms.source_ids::text[], ms.dedup_keys, ms.source_versions
+                FROM knowledge_bases kb
+                LEFT JOIN kb_merge_state ms ON ms.kb_id = kb.kb_id
+                WHERE kb.kb_id = %s
+                FOR UPDATE OF kb
+            """, (kb_id,))
+
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                logger.error(f"[KB] Knowledge base {kb_id} not found")
+                return
+
+            structured_data, merged_ids, dedup_keys, merged_versions = row
+
+            cursor.execute("""
+                SELECT source_id::text, processed_version
+                FROM kb_sources
+                WHERE kb_id = %s AND processing_status = 'complete' AND extracted_data IS NOT NULL
+                ORDER BY processed_at, source_id
+            """, (kb_id,))
+
+            complete_sources = cursor.fetchall()
+            complete_ids = [complete_id for complete_id, _ in complete_sources]
+
+            if not complete_ids and not merged_ids:
+                conn.rollback()
+                logger.info(f"[KB] No completed sources to merge for {kb_id}")
+                return
+
+            merged = set(merged_ids or [])
+            rebuild = (
+                merged_ids is None
+                or merged_versions is None
+                or not merged.issubset(complete_ids)
+                or any(complete_id in merged and merged_versions.get(complete_id) != processed_version
+                       for complete_id, processed_version in complete_sources)
+            )
+
+            if rebuild:
+                merger = KnowledgeMerger()
+                new_ids = complete_ids
+                source_ids: List[str] = []
+                source_versions: Dict[str, Any] = {}
+            else:
+                merger = KnowledgeMerger(structured_data, dedup_keys)
+                new_ids = [complete_id for complete_id in complete_ids if complete_id not in merged]
+                source_ids = list(merged_ids)
+                source_versions = dict(merged_versions)
+                if not new_ids:
+                    conn.rollback()
+                    logger.info(f"[KB] Knowledge base {kb_id} is up to date")
+                    return
+
+            if new_ids:
+                # Versions are recorded as read with the data: a source saved
+                # after this read has a newer version and causes a rebuild
+                cursor.execute("""
+                    SELECT source_id::text, processed_version, extracted_data
+                    FROM kb_sources
+                    WHERE source_id = ANY(%s::uuid[])
+                      AND processing_status = 'complete' AND extracted_data IS NOT NULL
+                    ORDER BY processed_at, source_id
+                """, (new_ids,))
+
+                for source_id, processed_version, extracted_data in cursor:
+                    merger.add(json.loads(extracted_data) if isinstance(extracted_data, str) else extracted_data)
+                    source_ids.append(source_id)
+                    source_versions[source_id] = processed_version
+
+            # Update knowledge_bases table
+            cursor.execute("""
+                UPDATE knowledge_bases
+                SET structured_data = %s,
+                    processing_status = 'complete',
+                    total_sources = (SELECT COUNT(*) FROM kb_sources WHERE kb_id = %s),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE kb_id = %s
+            """, (
+                json.dumps(merger.data),
+                kb_id,
+                kb_id
+            ))
+
+            cursor.execute("""
+                INSERT INTO kb_merge_state (kb_id, source_ids, dedup_keys, source_versions, merged_at, rebuilt_at)
+                VALUES (%s, %s::uuid[], %s, %s, clock_timestamp(), CASE WHEN %s THEN clock_timestamp() END)
+                ON CONFLICT (kb_id) DO UPDATE
+                SET source_ids = EXCLUDED.source_ids,
+                    dedup_keys = EXCLUDED.dedup_keys,
+                    source_versions = EXCLUDED.source_versions,
+                    merged_at = EXCLUDED.merged_at,
+                    rebuilt_at = COALESCE(EXCLUDED.rebuilt_at, kb_merge_state.rebuilt_at)
+            """, (
+                kb_id,
+                source_ids,
+                json.dumps(merger.dedup_state()),
+                json.dumps(source_versions),
+                rebuild
+            ))
+
+            conn.commit()
+            cursor.close()
+
+            if rebuild:
+                logger.info(f"[KB] Rebuilt knowledge base {kb_id} from {len(new_ids)} sources")
+            else:
+                logger.info(f"[KB] Merged {len(new_ids)} new sources into knowledge base {kb_id} "
+                            f"({len(merged)} already merged)")
+
+        except Exception as e:
+            logger.error(f"[KB] Error merging knowledge base: {e}")
+            if db_conn and not db_conn.closed:
+                db_conn.rollback()
+            raise
+
+
+def get_kb_sources(source_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+    """(s3_key, raw_text) of the sources that exist, by source_id"""
+    with db_lock:
+        conn = get_db_connection()
+        cursor = conn.cursor()
 
-        # Update knowledge_bases table
         cursor.execute("""
-            UPDATE knowledge_bases
-            SET structured_data = %s,
-                processing_status = 'complete',
-                total_sources = (SELECT COUNT(*) FROM kb_sources WHERE kb_id = %s),
-                updated_at = CURRENT_TIMESTAMP
-            WHERE kb_id = %s
-        """, (
-            json.dumps(merged_data),
-            kb_id,
-            kb_id
-        ))
+            SELECT source_id::text, s3_key, raw_text
+            FROM kb_sources
+            WHERE source_id = ANY(%s::uuid[])
+        """, (source_ids,))
 
+        sources = {source_id: (s3_key, raw_text) for source_id, s3_key, raw_text in cursor.fetchall()}
         conn.commit()
         cursor.close()
 
-        logger.info(f"[KB] Merged {len(sources)} sources into knowledge base {kb_id}")
+    return sources
 
-    except Exception as e:
-        logger.error(f"[KB] Error merging knowledge base: {e}")
-        raise
 
+def get_business_contexts(customer_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Business name and industry of customers (for the structuring prompt), by customer_id"""
+    with db_lock:
+        conn = get_db_connection()
+        cursor = conn.cursor()
 
-def lambda_handler(event, context):
+        cursor.execute("""
+            SELECT customer_id::text, business_name, industry
+            FROM customers
+            WHERE customer_id = ANY(%s::uuid[])
+        """, (customer_ids,))
+
+        business_contexts = {
+            customer_id: {'business_name': business_name, 'industry': industry}
+            for customer_id, business_name, industry in cursor.fetchall()
+        }
+        conn.commit()
+        cursor.close()
+
+    return business_contexts
+
+
+def run_pipeline(items: Iterable[Any], stages: List[Tuple[str, Any, int]], queue_size: int, on_error) -> None:
     """
-    Main Lambda handler
+    Pass items through stages that run concurrently.
 
-    Triggered by:
-    - S3 upload event (for PDF/DOCX files)
-    - SQS message (for manual text or S3 upload completion)
+    Each stage is (name, func, workers): its worker threads take items from
+    the stage's queue and put func(item) on the next stage's queue. None ends
+    the item's trip, and so does an exception, which is passed to
+    on_error(item, exception). Queues hold at most queue_size items, so a
+    fast stage cannot run far ahead of a slow one.
+
+    Returns when every item has left the last stage.
     """
-    logger.info(f"[Lambda] Event: {json.dumps(event)}")
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def worker(index: int, func) -> None:
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+
+        while True:
+            item = inbox.get()
+            if item is PIPELINE_STOP:
+                return
+
+            try:
+                result = func(item)
+            except Exception as e:
+                on_error(item, e)
+                continue
+
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    threads = [
+        [Thread(target=worker, args=(index, func), name=f'pipeline-{name}-{n}', daemon=True) for n in range(workers)]
+        for index, (name, func, workers) in enumerate(stages)
+    ]
+    for stage_threads in threads:
+        for thread in stage_threads:
+            thread.start()
+
+    for item in items:
+        queues[0].put(item)
+
+    # Stop the stages in order: a stage's output is all queued once its workers exit
+    for index, stage_threads in enumerate(threads):
+        for _ in stage_threads:
+            queues[index].put(PIPELINE_STOP)
+        for thread in stage_threads:
+            thread.join()
+
+
+def load_source_stage(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pipeline stage (I/O): download the source's file and look for a
+    completed source of the customer with the same content.
+    """
+    source_id = job['source_id']
+    source_type = job['source_type']
 
-    try:
-        # Check if this is an SQS message
-        if 'Records' in event and event['Records'][0].get('eventSource') == 'aws:sqs':
-            # SQS message
-            for record in event['Records']:
-                message = json.loads(record['body'])
-                source_id = message['source_id']
-                kb_id = message['kb_id']
-                customer_id = message['customer_id']
-                source_type = message['source_type']
+    logger.info(f"[SQS] Processing {source_type} for source {source_id}")
 
-                logger.info(f"[SQS] Processing {source_type} for source {source_id}")
+    if not job['source']:
+        logger.error(f"[DB] Source {source_id} not found")
+        return None
 
-                # Get source from database
-                conn = get_db_connection()
-                cursor = conn.cursor()
+    s3_key, job['raw_text'] = job['source']
 
-                cursor.execute("""
-                    SELECT s3_key, raw_text, file_name
-                    FROM kb_sources
-                    WHERE source_id = %s
-                """, (source_id,))
+    if source_type in ['pdf', 'docx']:
+        # Download file from S3
+        bucket = os.environ['KNOWLEDGE_BASE_BUCKET']
+        logger.info(f"[S3] Downloading {s3_key} from {bucket}")
 
-                source = cursor.fetchone()
-                cursor.close()
+        try:
+            source_file, job['content_hash'] = download_s3_object(bucket, s3_key)
+        except ObjectTooLargeError as e:
+            logger.error(f"[S3] {s3_key}: {e}")
+            job['status'], job['error_message'] = 'error', str(e)
+            return None
 
-                if not source:
-                    logger.error(f"[DB] Source {source_id} not found")
-                    continue
+        # Closed by extract_text_stage (or pipeline_error)
+        job['source_file'] = source_file
+        job['duplicate'] = find_completed_duplicate(job['content_hash'], job['customer_id'], source_id)
 
-                s3_key, raw_text, file_name = source
+    elif source_type == 'manual_text':
+        # Text already in raw_text field
+        job['content_hash'] = text_content_hash(job['raw_text']) if job['raw_text'] else None
+        if job['content_hash']:
+            job['duplicate'] = find_completed_duplicate(job['content_hash'], job['customer_id'], source_id)
 
-                # Extract text based on source type
-                if source_type in ['pdf', 'docx']:
-                    # Download file from S3
-                    bucket = os.environ['KNOWLEDGE_BASE_BUCKET']
-                    logger.info(f"[S3] Downloading {s3_key} from {bucket}")
+    else:
+        logger.error(f"[Processing] Unknown source type: {source_type}")
+        job['status'], job['error_message'] = 'error', f'Unknown source type: {source_type}'
+        return None
 
-                    s3_object = s3.get_object(Bucket=bucket, Key=s3_key)
-                    file_content = s3_object['Body'].read()
+    return job
 
-                    if source_type == 'pdf':
-                        raw_text = extract_text_from_pdf(file_content)
-                    elif source_type == 'docx':
-                        raw_text = extract_text_from_docx(file_content)
 
-                elif source_type == 'manual_text':
-                    # Text already in raw_text field
-                    pass
+def extract_text_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage (CPU): extract the text of a downloaded file in a worker process"""
+    source_file = job.pop('source_file', None)
+    if source_file is None:
+        return job
 
-                else:
-                    logger.error(f"[Processing] Unknown source type: {source_type}")
-                    update_kb_source(source_id, raw_text, None, 'error', f'Unknown source type: {source_type}')
-                    continue
+    with source_file:
+        if not job['duplicate']:
+            job['raw_text'] = extract_text_in_process(job['source_type'], source_file)
 
-                # Get business context
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT business_name, industry
-                    FROM customers
-                    WHERE customer_id = %s
-                """, (customer_id,))
+    return job
+
+
+def structure_source_stage(job: Dict[str, Any]) -> None:
+    """
+    Pipeline stage (I/O): structure the text with Bedrock (or take the
+    results of the duplicate) and embed its passages. The results are kept
+    on the job for save_kb_source_results.
+    """
+    source_id = job['source_id']
+
+    if job['duplicate']:
+        duplicate_id, job['raw_text'], job['structured_data'] = job['duplicate']
+        logger.info(f"[Dedup] Source {source_id} has the content of {duplicate_id}, copying its results")
+    else:
+        # Structure knowledge with Bedrock
+        try:
+            job['structured_data'] = structure_knowledge_with_bedrock(job['raw_text'], job['business_info'])
+        except Exception as e:
+            logger.error(f"[Bedrock] Structuring failed: {e}")
+            job['status'], job['error_message'] = 'error', str(e)
+            return None
+
+    job['passages'] = prepare_kb_passages(source_id, job['raw_text'])
+    job['status'] = 'complete'
+
+
+def process_kb_sources(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Process the sources of an SQS batch.
+
+    The batch's source rows and business contexts are read with one query
+    each, the sources go through the pipeline, then all results are saved
+    in one transaction (save_kb_source_results) and every knowledge base
+    of the batch is merged once.
+
+    Sources that fail in an expected way (unknown type, file too large,
+    structuring error) are saved with status 'error'. Sources that hit an
+    unexpected error (database, S3, extraction) are returned, so that their
+    messages are retried.
+
+    Returns:
+        The jobs that failed unexpectedly
+    """
+    if not jobs:
+        return []
+
+    failed = []
+    failed_lock = Lock()
+
+    def pipeline_error(job: Dict[str, Any], error: Exception) -> None:
+        logger.error(f"[Pipeline] Source {job['source_id']} failed: {error}")
+        source_file = job.pop('source_file', None)
+        if source_file is not None:
+            source_file.close()
+        with failed_lock:
+            job['status'] = None
+            failed.append(job)
+
+    started = time.monotonic()
+
+    sources = get_kb_sources([job['source_id'] for job in jobs])
+    business_contexts = get_business_contexts(list({job['customer_id'] for job in jobs}))
+    for job in jobs:
+        job['source'] = sources.get(job['source_id'])
+        job['business_info'] = business_contexts.get(job['customer_id'], {'business_name': None, 'industry': None})
+
+    run_pipeline(jobs, [
+        ('load', load_source_stage, min(PIPELINE_IO_WORKERS, len(jobs))),
+        ('extract', extract_text_stage, min(PDF_EXTRACT_WORKERS, len(jobs))),
+        ('structure', structure_source_stage, min(PIPELINE_IO_WORKERS, len(jobs))),
+    ], PIPELINE_QUEUE_SIZE, pipeline_error)
+
+    finished = [job for job in jobs if job['status']]
+    try:
+        save_kb_source_results(finished)
+    except Exception:
+        return failed + finished
+
+    # Fold the batch's results into their knowledge bases; the merge decides
+    # whether each needs new sources added, a rebuild (e.g. a merged source
+    # failed when reprocessed) or nothing
+    for kb_id in dict.fromkeys(job['kb_id'] for job in finished):
+        try:
+            merge_and_update_knowledge_base(kb_id)
+        except Exception:
+            failed.extend(job for job in finished if job['kb_id'] == kb_id)
+
+    logger.info(f"[Pipeline] Processed {len(jobs)} sources in {time.monotonic() - started:.1f}s "
+                f"({len(failed)} failed)")
+    return failed
+
+
+def lambda_handler(event, context):
+    """
+    Main Lambda handler
 
-                business_context = cursor.fetchone()
-                cursor.close()
+    Triggered by:
+    - S3 upload event (for PDF/DOCX files)
+    - SQS message (for manual text or S3 upload completion)
 
-                business_info = {
-                    'business_name': business_context[0] if business_context else None,
-                    'industry': business_context[1] if business_context else None
-                }
+    The sources of an SQS batch are processed concurrently (see
+    process_kb_sources); messages of sources that failed unexpectedly are
+    reported in batchItemFailures and retried. Malformed messages are logged
+    and acknowledged, since retrying them can't succeed.
+    """
+    logger.info(f"[Lambda] Event: {json.dumps(event)}")
 
-                # Structure knowledge with Bedrock
+    try:
+        # Check if this is an SQS message
+        if 'Records' in event and event['Records'][0].get('eventSource') == 'aws:sqs':
+            # SQS message
+            jobs = []
+            for record in event['Records']:
                 try:
-                    structured_data = structure_knowledge_with_bedrock(raw_text, business_info)
-                    update_kb_source(source_id, raw_text, structured_data, 'complete')
-                except Exception as e:
-                    logger.error(f"[Bedrock] Structuring failed: {e}")
-                    update_kb_source(source_id, raw_text, None, 'error', str(e))
+                    message = json.loads(record['body'])
+                    source_fields = {key: message[key] for key in ('source_id', 'kb_id', 'customer_id', 'source_type')}
+                except (ValueError, TypeError, KeyError) as e:
+                    # Redelivery can't fix a malformed body; acknowledge it
+                    # instead of cycling it through retries to the DLQ
+                    logger.error(f"[Lambda] Dropping malformed message {record.get('messageId')}: {e}: {str(record.get('body'))[:500]!r}")
                     continue
 
-                # Merge all sources for this KB
-                merge_and_update_knowledge_base(kb_id)
+                jobs.append({
+                    'message_id': record.get('messageId'),
+                    **source_fields,
+                    'raw_text': None,
+                    'content_hash': None,
+                    'duplicate': None,
+                    'status': None,  # Result to save: 'complete' or 'error'
+                    'structured_data': None,
+                    'error_message': None,
+                    'passages': [],
+                })
+
+            failed = process_kb_sources(jobs)
 
         else:
             logger.error("[Lambda] Unknown event type")
@@ -401,12 +2354,48 @@ def lambda_handler(event, context):
 
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': 'Processing completed successfully'})
+            'body': json.dumps({'message': 'Processing completed successfully'}),
+            'batchItemFailures': [{'itemIdentifier': job['message_id']} for job in failed],
         }
 
     except Exception as e:
         logger.error(f"[Lambda] Error: {e}")
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': json.dumps({'error': str(e)}),
+            # Retry the whole batch
+            'batchItemFailures': [{'itemIdentifier': record.get('messageId')} for record in event.get('Records', [])],
         }
+
+
+def search_passages_handler(event, context):
+    """
+    Passage search entry point, invoked directly at call time.
+
+    Event:
+    {
+        "kb_id": "uuid",
+        "query": "¿Abrís los sábados?",
+        "top_k": 5,  (optional)
+        "mode": "text" | "semantic"  (optional, default "text")
+    }
+
+    Returns:
+        {"kb_id", "query", "mode", "passages": [...]} (see
+        search_kb_passages and search_kb_passages_semantic)
+    """
+    kb_id = event.get('kb_id')
+    query = (event.get('query') or '').strip()
+    mode = event.get('mode', 'text')
+    if not kb_id or not query:
+        raise ValueError("Passage search needs a kb_id and a query")
+    if mode not in ('text', 'semantic'):
+        raise ValueError(f"Unknown passage search mode: {mode}")
+
+    search = search_kb_passages_semantic if mode == 'semantic' else search_kb_passages
+
+    started = time.monotonic()
+    passages = search(kb_id, query, event.get('top_k', KB_SEARCH_DEFAULT_TOP_K))
+    logger.info(f"[Search] {len(passages)} {mode} passages for kb {kb_id} in {(time.monotonic() - started) * 1000:.0f}ms")
+
+    return {'kb_id': kb_id, 'query': query, 'mode': mode, 'passages': passages}
@@ -20,7 +20,6 @@ import os
 import time
 import boto3
 import psycopg2
-import stripe
 from decimal import Decimal
 from typing import Dict, Any, Optional, Tuple
 
@@ -28,14 +27,15 @@ from typing import Dict, Any, Optional, Tuple
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients
-secretsmanager = boto3.client('secretsmanager', region_name='eu-west-1')
+# AWS clients (created on first use and reused across invocations)
+secretsmanager_client = None
 
 # Database connection (reused across invocations)
 db_conn = None
 
-# Stripe client (initialized once)
-stripe_initialized = False
+# Stripe SDK (imported and initialized on the first overage report; most
+# usage events never reach Stripe, so cold starts don't pay for importing it)
+stripe = None
 
 # Cost per overage minute in EUR
 OVERAGE_PRICE_PER_MINUTE = Decimal('0.15')
@@ -44,6 +44,15 @@ OVERAGE_PRICE_PER_MINUTE = Decimal('0.15')
 MIN_BILLABLE_DURATION_SECONDS = 3
 
 
+def get_secretsmanager_client():
+    """Get the Secrets Manager client (created on first use)"""
+    global secretsmanager_client
+
+    if secretsmanager_client is None:
+        secretsmanager_client = boto3.client('secretsmanager', region_name='eu-west-1')
+    return secretsmanager_client
+
+
 def get_db_connection():
     """Get PostgreSQL connection (with caching)"""
     global db_conn
@@ -54,7 +63,7 @@ def get_db_connection():
     secret_name = os.environ.get('DB_SECRET_NAME', 'consultia/database/credentials')
 
     try:
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
+        response = get_secretsmanager_client().get_secret_value(SecretId=secret_name)
         secret = json.loads(response['SecretString'])
 
         db_conn = psycopg2.connect(
@@ -76,18 +85,20 @@ def get_db_connection():
 
 def init_stripe():
     """Initialize Stripe with API key from Secrets Manager"""
-    global stripe_initialized
+    global stripe
 
-    if stripe_initialized:
+    if stripe is not None:
         return
 
     secret_name = os.environ.get('API_KEYS_SECRET_NAME', 'consultia/production/api-keys')
 
     try:
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
+        response = get_secretsmanager_client().get_secret_value(SecretId=secret_name)
         secrets = json.loads(response['SecretString'])
-        stripe.api_key = secrets['STRIPE_SECRET_KEY']
-        stripe_initialized = True
+
+        import stripe as stripe_sdk
+        stripe_sdk.api_key = secrets['STRIPE_SECRET_KEY']
+        stripe = stripe_sdk
         logger.info("[Stripe] Client initialized")
 
     except Exception as e:
@@ -0,0 +1,30 @@
+-- ========================================
+-- Migration 008: Create llm_extraction_cache table
+-- ========================================
+-- Content-addressed cache of Bedrock extraction results, shared by the
+-- business-scraper and knowledge-base-processor Lambdas
+
+CREATE TABLE IF NOT EXISTS llm_extraction_cache (
+  cache_key CHAR(64) PRIMARY KEY, -- SHA-256 of prompt version + model id + prompt
+
+  -- Cache entry
+  prompt_version VARCHAR(100) NOT NULL, -- e.g. business-extraction-v1
+  model_id VARCHAR(255) NOT NULL,
+  result JSONB NOT NULL, -- Parsed JSON returned by the model
+  result_bytes INTEGER NOT NULL, -- Size used for size-based eviction
+  hit_count INTEGER DEFAULT 0,
+
+  -- Timestamps
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  expires_at TIMESTAMP NOT NULL
+);
+
+-- Indexes
+CREATE INDEX idx_llm_cache_expires ON llm_extraction_cache(expires_at);
+CREATE INDEX idx_llm_cache_last_hit ON llm_extraction_cache(last_hit_at);
+
+-- Comments
+COMMENT ON TABLE llm_extraction_cache IS 'Bedrock extraction results keyed by a hash of the exact prompt (TTL + size-based eviction)';
+COMMENT ON COLUMN llm_extraction_cache.cache_key IS 'SHA-256 hex of prompt_version, model_id and rendered prompt';
+COMMENT ON COLUMN llm_extraction_cache.last_hit_at IS 'Used to evict least recently used entries when over the size budget';
@@ -0,0 +1,26 @@
+-- ========================================
+-- Migration 009: Create scrape_validators table
+-- ========================================
+-- HTTP validators of the pages used by the last successful scrape of each
+-- customer website, so re-scrapes can fetch conditionally and skip
+-- re-extraction when nothing changed
+
+CREATE TABLE IF NOT EXISTS scrape_validators (
+  customer_id UUID NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+  url VARCHAR(2048) NOT NULL, -- URL requested by the scraper (before redirects)
+
+  -- Validators
+  final_url VARCHAR(2048) NOT NULL, -- URL after redirects (conditional headers go to this hop)
+  etag VARCHAR(512),
+  last_modified VARCHAR(100), -- Raw Last-Modified header, echoed as If-Modified-Since
+  content_digest CHAR(64), -- SHA-256 of the cleaned HTML
+
+  -- Timestamps
+  fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (customer_id, url)
+);
+
+-- Comments
+COMMENT ON TABLE scrape_validators IS 'ETag / Last-Modified / content digest per scraped page for conditional re-fetch';
+COMMENT ON COLUMN scrape_validators.content_digest IS 'Unchanged digest on re-fetch skips Bedrock extraction and the business_info update';
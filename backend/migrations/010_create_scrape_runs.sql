@@ -0,0 +1,54 @@
+-- ========================================
+-- Migration 010: Create scrape_runs tables
+-- ========================================
+-- Checkpoints of bulk re-scrape runs (business-scraper bulk_rescrape_handler).
+-- Every customer of a run has one item row; an invocation that runs out of
+-- time leaves the remaining items pending and the next invocation with the
+-- same run_id resumes from them.
+
+CREATE TABLE IF NOT EXISTS scrape_runs (
+  run_id VARCHAR(100) PRIMARY KEY,
+
+  -- Options
+  force BOOLEAN DEFAULT false, -- Re-extract even if the site is unchanged
+  crawl BOOLEAN DEFAULT true,
+
+  -- Progress (updated with every checkpoint)
+  status VARCHAR(20) DEFAULT 'running', -- running, complete
+  total_items INTEGER DEFAULT 0,
+  succeeded INTEGER DEFAULT 0,
+  unchanged INTEGER DEFAULT 0,
+  failed INTEGER DEFAULT 0,
+  invocations INTEGER DEFAULT 0,
+  elapsed_seconds NUMERIC(10, 1) DEFAULT 0, -- Processing time summed over invocations
+  errors_by_type JSONB DEFAULT '{}'::jsonb, -- {"Timeout": 12, "HTTPError": 3, ...}
+
+  -- Timestamps
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  completed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scrape_run_items (
+  run_id VARCHAR(100) NOT NULL REFERENCES scrape_runs(run_id) ON DELETE CASCADE,
+  customer_id UUID NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+  website VARCHAR(2048) NOT NULL,
+
+  -- Outcome
+  status VARCHAR(20) DEFAULT 'pending', -- pending, complete, unchanged, error
+  error_type VARCHAR(100),
+  error_message TEXT,
+  duration_ms INTEGER,
+
+  -- Timestamps
+  processed_at TIMESTAMP,
+
+  PRIMARY KEY (run_id, customer_id)
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_scrape_run_items_pending ON scrape_run_items(run_id) WHERE status = 'pending';
+
+-- Comments
+COMMENT ON TABLE scrape_runs IS 'Bulk re-scrape runs: options, progress counters and error summary';
+COMMENT ON TABLE scrape_run_items IS 'Per-customer checkpoint of a bulk re-scrape run; pending items are resumed';
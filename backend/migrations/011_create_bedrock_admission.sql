@@ -0,0 +1,43 @@
+-- ========================================
+-- Migration 011: Create Bedrock admission control tables
+-- ========================================
+-- Shared limiter for Bedrock calls made by the business-scraper and
+-- knowledge-base-processor Lambdas: a concurrency limit (one lease per call
+-- in flight) and a tokens-per-minute bucket per model. Acquirers lock the
+-- model's bedrock_limits row, so admission is serialized across containers.
+
+CREATE TABLE IF NOT EXISTS bedrock_limits (
+  limit_key VARCHAR(200) PRIMARY KEY, -- Bedrock model id
+
+  -- Limits (rows are created with the Lambda defaults; edit to tune)
+  max_concurrency INTEGER NOT NULL,
+  tokens_per_minute INTEGER NOT NULL,
+
+  -- Token bucket state
+  tokens_available NUMERIC(12, 2) NOT NULL,
+  refilled_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+
+  -- Set when a caller is throttled: nobody is admitted before this time
+  throttled_until TIMESTAMP,
+
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bedrock_leases (
+  lease_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  limit_key VARCHAR(200) NOT NULL REFERENCES bedrock_limits(limit_key) ON DELETE CASCADE,
+  holder VARCHAR(200), -- Lambda function name
+
+  tokens INTEGER NOT NULL, -- Tokens taken from the bucket (prompt estimate + max_tokens)
+
+  -- Timestamps
+  acquired_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+  expires_at TIMESTAMP NOT NULL -- Leases of crashed callers stop counting after this
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_bedrock_leases_limit ON bedrock_leases(limit_key, expires_at);
+
+-- Comments
+COMMENT ON TABLE bedrock_limits IS 'Per-model Bedrock concurrency limit and token bucket shared by all Lambda containers';
+COMMENT ON TABLE bedrock_leases IS 'Bedrock calls in flight; expired leases are reaped on the next acquire';
@@ -0,0 +1,27 @@
+-- ========================================
+-- Migration 012: Create kb_merge_state table
+-- ========================================
+-- Incremental merge state of a knowledge base (knowledge-base-processor
+-- merge_and_update_knowledge_base). knowledge_bases.structured_data holds
+-- the merged data; this row records which sources it contains and the
+-- normalized keys of its items, so a newly processed source is folded in
+-- without re-reading the others. The merge is rebuilt from all completed
+-- sources when a merged source is deleted, or processed again after
+-- merged_at.
+
+CREATE TABLE IF NOT EXISTS kb_merge_state (
+  kb_id UUID PRIMARY KEY REFERENCES knowledge_bases(kb_id) ON DELETE CASCADE,
+
+  -- Sources folded into structured_data, in merge order
+  source_ids UUID[] NOT NULL DEFAULT '{}',
+
+  -- Dedup indexes: {"services": [...], "faqs": [...], "emails": [...], "phones": [...], "locations": [...]}
+  dedup_keys JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+  -- Timestamps
+  merged_at TIMESTAMP NOT NULL, -- Last merge (taken after reading the sources)
+  rebuilt_at TIMESTAMP -- Last full rebuild
+);
+
+-- Comments
+COMMENT ON TABLE kb_merge_state IS 'Sources and dedup keys of the merged structured_data of each knowledge base';
@@ -0,0 +1,15 @@
+-- ========================================
+-- Migration 013: Add content hash to kb_sources
+-- ========================================
+-- SHA-256 of an uploaded file's bytes (or of the normalized text of a
+-- manual_text source). The knowledge-base-processor copies raw_text and
+-- extracted_data from a completed source of the same customer with the
+-- same hash instead of extracting and structuring the content again.
+
+ALTER TABLE kb_sources ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_kb_sources_content_hash ON kb_sources(content_hash) WHERE processing_status = 'complete';
+
+-- Comments
+COMMENT ON COLUMN kb_sources.content_hash IS 'SHA-256 hex of the file bytes, or of the whitespace-normalized text for manual_text';
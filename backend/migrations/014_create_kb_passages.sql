@@ -0,0 +1,29 @@
+-- ========================================
+-- Migration 014: Create kb_passages table
+-- ========================================
+-- Full-text search over the raw text of knowledge-base sources. The
+-- knowledge-base-processor splits the raw_text of every completed source
+-- into passages and stores them with a Spanish tsvector (built from the
+-- text with accents folded); search_kb_passages returns the best passages
+-- of a knowledge base for a query.
+
+CREATE TABLE IF NOT EXISTS kb_passages (
+  source_id UUID NOT NULL REFERENCES kb_sources(source_id) ON DELETE CASCADE,
+  kb_id UUID NOT NULL REFERENCES knowledge_bases(kb_id) ON DELETE CASCADE,
+  passage_index INTEGER NOT NULL, -- Position in the source's raw_text
+
+  content TEXT NOT NULL,
+  search_vector TSVECTOR NOT NULL, -- to_tsvector('spanish', content without accents)
+
+  -- Timestamps
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (source_id, passage_index)
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_kb_passages_search ON kb_passages USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_kb_passages_kb ON kb_passages(kb_id);
+
+-- Comments
+COMMENT ON TABLE kb_passages IS 'Raw text passages of completed knowledge-base sources, indexed for full-text search';
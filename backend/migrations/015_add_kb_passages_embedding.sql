@@ -0,0 +1,20 @@
+-- ========================================
+-- Migration 015: Add embeddings to kb_passages
+-- ========================================
+-- Semantic passage retrieval (pgvector). The knowledge-base-processor
+-- embeds every passage with its configured embedder (Titan Text Embeddings
+-- v2, 512 normalized dimensions, in production) and search_kb_passages_semantic
+-- ranks a knowledge base's passages by inner product with the query.
+-- Filtered HNSW scans rely on hnsw.iterative_scan (pgvector 0.8+), which
+-- the Lambda sets per query.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE kb_passages ADD COLUMN IF NOT EXISTS embedding vector(512);
+ALTER TABLE kb_passages ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100); -- Embedder that produced embedding
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_kb_passages_embedding ON kb_passages USING hnsw (embedding vector_ip_ops);
+
+-- Comments
+COMMENT ON COLUMN kb_passages.embedding IS 'Normalized passage embedding; only comparable with embeddings of the same embedding_model';
@@ -0,0 +1,12 @@
+-- ========================================
+-- Migration 016: Add attempts to scrape_run_items
+-- ========================================
+-- Bulk re-scrape items that fail with a transient error (host asking us to
+-- slow down, timeouts, connection errors, 5xx, Bedrock throttling) are left
+-- pending for the next invocation of the run. attempts caps how often an
+-- item is retried before it is recorded as an error.
+
+ALTER TABLE scrape_run_items ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+
+-- Comments
+COMMENT ON COLUMN scrape_run_items.attempts IS 'Times the item was processed; pending items with attempts > 0 are retries of a transient error';
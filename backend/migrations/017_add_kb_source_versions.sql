@@ -0,0 +1,22 @@
+-- ========================================
+-- Migration 017: Add processed versions of knowledge base sources
+-- ========================================
+-- merge_and_update_knowledge_base rebuilt a knowledge base when a merged
+-- source had processed_at > merged_at. processed_at is the start of the
+-- transaction that saved the source, so a source saved while a merge was
+-- running could end up with processed_at < merged_at and its new data was
+-- never merged. Every save of a source now takes a new processed_version,
+-- and kb_merge_state records the version of each source it merged: a
+-- merged source whose current version differs triggers a rebuild.
+
+CREATE SEQUENCE IF NOT EXISTS kb_sources_processed_version_seq;
+
+ALTER TABLE kb_sources ADD COLUMN IF NOT EXISTS processed_version BIGINT;
+
+-- {"<source_id>": processed_version} of the merged sources; NULL in state
+-- saved before this migration, which is rebuilt on the next merge
+ALTER TABLE kb_merge_state ADD COLUMN IF NOT EXISTS source_versions JSONB;
+
+-- Comments
+COMMENT ON COLUMN kb_sources.processed_version IS 'Taken from kb_sources_processed_version_seq each time the source is saved';
+COMMENT ON COLUMN kb_merge_state.source_versions IS 'processed_version of each merged source, as read by the merge';
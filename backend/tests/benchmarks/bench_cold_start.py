@@ -0,0 +1,170 @@
+"""
+Benchmark: cold start of the Python Lambdas, i.e. importing lambda_function
+and the first lambda_handler call, each run in a fresh interpreter.
+
+AWS is stubbed at the botocore level (every call gets a canned response, so
+client construction is real but nothing leaves the machine) and
+psycopg2.connect returns a fake connection whose queries find nothing.
+Because the stubs sit below the handler code, the same script measures an
+older tree too:
+
+Run from backend/:
+
+    python tests/benchmarks/bench_cold_start.py [LAMBDAS_DIR]
+
+e.g. with LAMBDAS_DIR extracted from an earlier commit by
+git archive <commit> backend/lambdas | tar -x -C /tmp/baseline
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'lambdas')
+
+RUNS = 7
+
+# One SQS record per Lambda, taking the cheapest path that still needs the
+# database: a blocked website, a manual text source, a billable call
+EVENTS = {
+    'business-scraper': {
+        'customer_id': '00000000-0000-0000-0000-000000000001',
+        'website': 'http://localhost/',
+        'job_id': 'bench',
+    },
+    'knowledge-base-processor': {
+        'source_id': '00000000-0000-0000-0000-000000000002',
+        'kb_id': '00000000-0000-0000-0000-000000000003',
+        'customer_id': '00000000-0000-0000-0000-000000000001',
+        'source_type': 'manual_text',
+    },
+    'usage-tracker': {
+        'customer_id': '00000000-0000-0000-0000-000000000001',
+        'agent_id': '00000000-0000-0000-0000-000000000004',
+        'call_sid': 'CAbench',
+        'duration_seconds': 187,
+    },
+}
+
+# Runs inside the Lambda's directory; prints import and first-call times
+CHILD = r'''
+import json
+import logging
+import sys
+import time
+
+started = time.perf_counter()
+
+import boto3
+import psycopg2
+from botocore.awsrequest import AWSResponse
+
+SECRET = json.dumps({'host': 'db', 'username': 'bench', 'password': 'bench'})
+
+
+class Raw:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+aws_calls = []
+
+
+def canned_response(request, **kwargs):
+    aws_calls.append(request.url)
+    target = request.headers.get('X-Amz-Target', b'')
+    if isinstance(target, bytes):
+        target = target.decode()
+    body = {'SecretString': SECRET} if target.endswith('GetSecretValue') else {}
+    return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.1'}, Raw(json.dumps(body).encode()))
+
+
+class Cursor:
+    rowcount = 0
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class Connection:
+    closed = False
+    autocommit = False
+
+    def cursor(self, *args, **kwargs):
+        return Cursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+boto3.setup_default_session()
+boto3.DEFAULT_SESSION.events.register('before-send', canned_response)
+psycopg2.connect = lambda *args, **kwargs: Connection()
+logging.disable(logging.CRITICAL)
+
+import lambda_function
+imported = time.perf_counter()
+
+event = {'Records': [{'messageId': 'bench', 'eventSource': 'aws:sqs', 'body': sys.argv[1]}]}
+lambda_function.lambda_handler(event, None)
+invoked = time.perf_counter()
+
+# boto3 and psycopg2 are imported by the stubs, but count as import time
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_call_ms': (invoked - imported) * 1000,
+    'aws_calls': len(aws_calls),
+}))
+'''
+
+
+def cold_start(lambdas_dir: str, name: str) -> dict:
+    """Import the Lambda and invoke it once in a fresh interpreter; returns its timings"""
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, json.dumps(EVENTS[name])],
+        cwd=os.path.join(lambdas_dir, name),
+        env={
+            **os.environ,
+            'AWS_DEFAULT_REGION': 'eu-west-1',
+            'AWS_ACCESS_KEY_ID': 'bench',
+            'AWS_SECRET_ACCESS_KEY': 'bench',
+            'AWS_EC2_METADATA_DISABLED': 'true',
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    lambdas_dir = sys.argv[1] if len(sys.argv) > 1 else LAMBDAS_DIR
+
+    print(f"{'lambda':<28}{'import':>12}{'first call':>14}{'total':>12}{'AWS calls':>11}")
+    for name in EVENTS:
+        runs = [cold_start(lambdas_dir, name) for _ in range(RUNS)]
+        import_ms = statistics.median(run['import_ms'] for run in runs)
+        first_call_ms = statistics.median(run['first_call_ms'] for run in runs)
+        total_ms = statistics.median(run['import_ms'] + run['first_call_ms'] for run in runs)
+        print(f"{name:<28}{import_ms:>9.1f} ms{first_call_ms:>11.1f} ms{total_ms:>9.1f} ms{runs[0]['aws_calls']:>11}")
+
+
+if __name__ == '__main__':
+    main()
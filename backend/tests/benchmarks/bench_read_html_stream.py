@@ -0,0 +1,62 @@
+"""
+Benchmark: read_html_stream on streamed pages, including malformed ones
+whose unterminated <script>, comment or tag keeps the safe cut at 0 until
+the download cap.
+
+Run from backend/:
+
+    python tests/benchmarks/bench_read_html_stream.py
+"""
+
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TESTS_DIR)
+
+from lambda_loader import load_lambda  # noqa: E402
+
+REPEATS = 3
+MAX_BYTES = 4 * 1024 * 1024
+
+
+class StreamedResponse:
+    """Just enough of a streamed requests.Response for read_html_stream"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+def corpus():
+    section = '<div class="s"><h2>Servicio</h2><p>Corte y peinado desde 20 €.</p></div>\n'
+    return [
+        ('typical, 1 MB', '<html><body>' + section * 13000 + '</body></html>'),
+        ('3 MB unterminated <script>', '<p>a</p><script>window.__STATE__=' + 'x' * 3_000_000),
+        ('3 MB unterminated <!--', '<p>a</p><!--' + 'x' * 3_000_000),
+        ('3 MB without any >', '<p>a</p><img alt="' + 'x' * 3_000_000),
+        ('3 MB <script>, closed at end', '<p>a</p><script>' + 'x' * 3_000_000 + '</script><p>b</p>'),
+    ]
+
+
+def main():
+    scraper = load_lambda('business-scraper')
+
+    print(f"{'document':<32}{'size':>10}{'time':>12}{'cleaned':>10}")
+    for name, document in corpus():
+        body = document.encode('utf-8')
+        timings = []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            html, _, _ = scraper.read_html_stream(StreamedResponse(body), MAX_BYTES, 10 ** 9)
+            timings.append(time.perf_counter() - started)
+        print(f"{name:<32}{len(body):>10}{min(timings) * 1000:>9.1f} ms{len(html):>10}")
+
+
+if __name__ == '__main__':
+    main()
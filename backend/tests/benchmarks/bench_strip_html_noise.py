@@ -0,0 +1,75 @@
+"""
+Benchmark: clean_html_fragment (single scan) against the chained regex passes
+it replaced, on a generated corpus of typical and malformed pages.
+
+Run from backend/:
+
+    python tests/benchmarks/bench_strip_html_noise.py
+"""
+
+import os
+import random
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TESTS_DIR)
+sys.path.insert(0, os.path.join(TESTS_DIR, 'business_scraper'))
+
+from lambda_loader import load_lambda  # noqa: E402
+from legacy_html import legacy_strip_html_noise  # noqa: E402
+
+REPEATS = 3
+
+
+def typical_page(rng: random.Random, sections: int) -> str:
+    """CMS-style page: head scripts and styles, inline svg icons, comments, data-* attributes"""
+    parts = ['<html><head>']
+    parts += [f'<script src="/js/{i}.js"></script><style>.c{i}{{color:#{i:03x}}}</style>' for i in range(20)]
+    parts.append('<script type="application/ld+json">{"@type": "HairSalon", "name": "Ana"}</script></head><body>')
+    for i in range(sections):
+        parts.append(
+            f'<!-- section {i} --><div class="s" data-id="{i}" data-track="sec-{i}">'
+            f'<svg viewBox="0 0 24 24"><path d="M{rng.random():.4f} 0L24 24"/></svg>'
+            f'<h2>Servicio {i}</h2>\n    <p>Corte y peinado desde {rng.randint(10, 60)} €.</p>\n'
+            f'<noscript><img src="/px/{i}.gif"></noscript></div>'
+        )
+    parts.append('<script>' + 'var a=1;' * 5000 + '</script></body></html>')
+    return ''.join(parts)
+
+
+def corpus():
+    rng = random.Random(1)
+    return [
+        ('typical, 150 sections', typical_page(rng, 150)),
+        ('typical, 2000 sections', typical_page(rng, 2000)),
+        # Openers without closers: every lazy regex pass rescans to the end
+        ('2k unclosed <script>', '<p>x</p><script>' * 2000),
+        ('2k unclosed <!--', '<p>x</p><!--' * 2000),
+        ('1k unclosed mixed', '<script><style><svg><noscript><!--<p>x</p>' * 1000),
+        # Page-builder output: huge inline state blob
+        ('1 MB inline script', '<p>a</p><script>window.__STATE__=' + 'x' * 1_000_000 + '</script><p>b</p>'),
+    ]
+
+
+def best_of(function, document: str) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        function(document)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    scraper = load_lambda('business-scraper')
+
+    print(f"{'document':<24}{'size':>10}{'regex passes':>16}{'single scan':>14}{'speedup':>10}")
+    for name, document in corpus():
+        legacy = best_of(legacy_strip_html_noise, document)
+        scan = best_of(lambda html: scraper.clean_html_fragment(html).strip(), document)
+        print(f"{name:<24}{len(document):>10}{legacy * 1000:>13.1f} ms{scan * 1000:>11.1f} ms{legacy / scan:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
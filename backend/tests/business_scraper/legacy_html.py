@@ -0,0 +1,18 @@
+"""
+strip_html_noise as it was before the single-pass rewrite: seven chained
+regex passes. Kept as the reference for the equivalence test and the
+benchmark.
+"""
+
+import re
+
+
+def legacy_strip_html_noise(html: str) -> str:
+    html = re.sub(r'<script[^>]*>[\s\S]*?</script>', '', html, flags=re.IGNORECASE)
+    html = re.sub(r'<style[^>]*>[\s\S]*?</style>', '', html, flags=re.IGNORECASE)
+    html = re.sub(r'<!--[\s\S]*?-->', '', html)
+    html = re.sub(r'<svg[^>]*>[\s\S]*?</svg>', '', html, flags=re.IGNORECASE)
+    html = re.sub(r'<noscript[^>]*>[\s\S]*?</noscript>', '', html, flags=re.IGNORECASE)
+    html = re.sub(r'\s+', ' ', html)
+    html = re.sub(r'\s+data-[\w-]+="[^"]*"', '', html)
+    return html.strip()
@@ -0,0 +1,103 @@
+"""
+fetch_page redirects: every hop, including those of the full re-fetch after
+a 304 nobody asked for, goes through the manual redirect loop and its SSRF
+validation.
+"""
+
+import io
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+PAGE = b'<html><body><p>Peluqueria Ana</p></body></html>'
+
+
+def response(url, status_code, body=b'', **headers):
+    reply = requests.Response()
+    reply.url = url
+    reply.status_code = status_code
+    reply.reason = 'Status'
+    reply.headers = CaseInsensitiveDict({'Content-Type': 'text/html; charset=utf-8', **headers})
+    reply.raw = io.BytesIO(body)
+    return reply
+
+
+@pytest.fixture
+def server(scraper, monkeypatch):
+    """Answer polite_get from a list of scripted replies; returns (replies, requests made, URLs validated)"""
+    replies = []
+    sent = []
+    validated = []
+
+    def polite_get(url, timeout, headers=None):
+        sent.append((url, dict(headers or {})))
+        return replies.pop(0)
+
+    def validate_url_safe(url):
+        validated.append(url)
+        if 'internal' in url:
+            raise ValueError(f'Blocked hostname: {url}')
+        return url
+
+    monkeypatch.setattr(scraper, 'polite_get', polite_get)
+    monkeypatch.setattr(scraper, 'validate_url_safe', validate_url_safe)
+    monkeypatch.setattr(scraper, 'POLITENESS_ENABLED', False)
+    return replies, sent, validated
+
+
+# Validators of a previous scrape that ended on another URL: nothing is
+# sent conditionally for https://ana.es/, so a 304 from it is unexpected
+VALIDATORS = {'final_url': 'https://ana.es/inicio', 'etag': '"v1"', 'last_modified': None, 'content_digest': 'abc'}
+
+
+def test_unexpected_304_is_refetched_through_redirects(scraper, server):
+    replies, sent, validated = server
+    replies.extend([
+        response('https://ana.es/', 304),
+        response('https://ana.es/', 301, Location='/nueva'),
+        response('https://ana.es/nueva', 200, PAGE),
+    ])
+
+    page = scraper.fetch_page('https://ana.es/', validators=VALIDATORS)
+
+    assert [url for url, _ in sent] == ['https://ana.es/', 'https://ana.es/', 'https://ana.es/nueva']
+    assert all(headers == {} for _, headers in sent)
+    assert 'https://ana.es/nueva' in validated
+    assert page['url'] == 'https://ana.es/nueva'
+    assert not page['not_modified']
+    assert 'Peluqueria Ana' in page['html']
+
+
+def test_unexpected_304_refetch_validates_redirect_target(scraper, server):
+    replies, sent, _ = server
+    replies.extend([
+        response('https://ana.es/', 304),
+        response('https://ana.es/', 301, Location='http://internal.example/'),
+    ])
+
+    with pytest.raises(ValueError, match='Blocked'):
+        scraper.fetch_page('https://ana.es/', validators=VALIDATORS)
+    assert len(sent) == 2
+
+
+def test_repeated_304_is_an_error(scraper, server):
+    replies, _, _ = server
+    replies.extend([response('https://ana.es/', 304), response('https://ana.es/', 304)])
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        scraper.fetch_page('https://ana.es/', validators=VALIDATORS)
+
+
+def test_expected_304_is_not_modified(scraper, server):
+    replies, sent, _ = server
+    replies.extend([
+        response('https://ana.es/', 301, Location='/inicio'),
+        response('https://ana.es/inicio', 304),
+    ])
+
+    page = scraper.fetch_page('https://ana.es/', validators=VALIDATORS)
+
+    assert sent[1] == ('https://ana.es/inicio', {'If-None-Match': '"v1"'})
+    assert page['not_modified']
+    assert page['etag'] == '"v1"' and page['digest'] == 'abc'
@@ -0,0 +1,67 @@
+"""
+lambda_handler reports the records of a batch that are not finished shortly
+before the Lambda timeout as batch item failures, instead of timing out and
+getting the whole batch redelivered.
+"""
+
+import threading
+
+import pytest
+
+
+class LambdaContext:
+    def __init__(self, remaining_seconds):
+        self.remaining_millis = remaining_seconds * 1000
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_millis
+
+
+def records(count):
+    return [{'messageId': f'm{i}', 'body': '{}'} for i in range(count)]
+
+
+@pytest.fixture
+def stuck(scraper, monkeypatch):
+    """process_record blocks on the records whose messageId is in the returned set until released"""
+    blocked = set()
+    release = threading.Event()
+
+    def process_record(record):
+        if record['messageId'] in blocked:
+            release.wait(10)
+
+    monkeypatch.setattr(scraper, 'process_record', process_record)
+    monkeypatch.setattr(scraper, 'SCRAPER_TIME_MARGIN_SECONDS', 0.5)
+    yield blocked
+    release.set()
+
+
+def test_unfinished_records_are_reported_at_the_deadline(scraper, monkeypatch, stuck):
+    monkeypatch.setattr(scraper, 'SCRAPER_MAX_CONCURRENT_RECORDS', 2)
+    stuck.update({'m0', 'm1'})
+
+    result = scraper.lambda_handler({'Records': records(4)}, LambdaContext(1))
+
+    # m0 and m1 are still running, m2 and m3 never started
+    assert result == {'batchItemFailures': [{'itemIdentifier': f'm{i}'} for i in range(4)]}
+
+
+def test_slow_record_does_not_fail_the_others(scraper, stuck):
+    stuck.add('m1')
+
+    result = scraper.lambda_handler({'Records': records(3)}, LambdaContext(1))
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm1'}]}
+
+
+def test_failed_records_are_reported(scraper, monkeypatch):
+    def process_record(record):
+        if record['messageId'] == 'm0':
+            raise RuntimeError('boom')
+
+    monkeypatch.setattr(scraper, 'process_record', process_record)
+
+    result = scraper.lambda_handler({'Records': records(2)}, None)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm0'}]}
@@ -0,0 +1,72 @@
+"""
+PinnedIPAdapter: requests connect to the validated addresses of the host,
+keeping its name in the Host header, and fall back to the next address when
+one refuses the connection.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    hosts = []
+
+    def do_GET(self):
+        self.hosts.append(self.headers['Host'])
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """A server listening on 127.0.0.1 only, so 127.0.0.2 refuses connections to its port"""
+    RecordingHandler.hosts = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pinned_get(scraper, monkeypatch):
+    """GET through a PinnedIPAdapter that resolves every host to the given addresses"""
+    def get(url, ips):
+        monkeypatch.setattr(scraper, 'resolve_safe_ips', lambda hostname: ips)
+        session = requests.Session()
+        session.trust_env = False
+        session.mount('http://', scraper.PinnedIPAdapter())
+        return session.get(url, timeout=5)
+
+    return get
+
+
+def test_connects_to_pinned_ip(pinned_get, http_server):
+    response = pinned_get(f'http://ana.es:{http_server}/', ['127.0.0.1'])
+
+    assert response.text == 'ok'
+    assert response.url == f'http://ana.es:{http_server}/'
+    assert RecordingHandler.hosts == [f'ana.es:{http_server}']
+
+
+def test_falls_back_to_next_ip_when_connection_is_refused(pinned_get, http_server):
+    response = pinned_get(f'http://ana.es:{http_server}/', ['127.0.0.2', '127.0.0.1'])
+
+    assert response.text == 'ok'
+    assert response.url == f'http://ana.es:{http_server}/'
+    assert RecordingHandler.hosts == [f'ana.es:{http_server}']
+
+
+def test_raises_when_every_ip_refuses(pinned_get, http_server):
+    with pytest.raises(requests.exceptions.ConnectionError):
+        pinned_get(f'http://ana.es:{http_server}/', ['127.0.0.2', '127.0.0.3'])
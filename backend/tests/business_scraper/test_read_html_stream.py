@@ -0,0 +1,58 @@
+"""
+read_html_stream: cleaning a page chunk by chunk gives the same result as
+cleaning it in one piece, including while an unterminated block is waited
+on (find_cut_blocker) and when its closer is split across chunks.
+"""
+
+import random
+
+import pytest
+
+
+class StreamedResponse:
+    """Just enough of a streamed requests.Response for read_html_stream"""
+
+    def __init__(self, body: bytes, chunk_sizes):
+        self.body = body
+        self.chunk_sizes = chunk_sizes
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    def iter_content(self, chunk_size):
+        start = 0
+        sizes = iter(self.chunk_sizes)
+        while start < len(self.body):
+            size = next(sizes)
+            yield self.body[start:start + size]
+            start += size
+
+
+def read(scraper, document: str, chunk_sizes):
+    response = StreamedResponse(document.encode('utf-8'), chunk_sizes)
+    return scraper.read_html_stream(response, 10 ** 9, 10 ** 9)
+
+
+DOCUMENTS = [
+    '<p>a</p><script>' + 'var x = "<p>";' * 2000 + '</SCRIPT><p>b</p>',
+    '<p>a</p><!--' + ' comentario ' * 2000 + '--><p>b</p>' + '<style>.c{}</style>' * 50,
+    '<p>a</p><img alt="' + 'x' * 20000 + '"><p>b</p>',
+    '<p>a</p><script>' + 'x' * 20000,
+    '<p>a</p><!--' + 'x' * 20000,
+    '<!-- <script> -->' + '<p>texto</p>' * 3000 + '</script><p>fin</p>',
+    '<script type="application/ld+json">{"@type": "HairSalon"}</script>' + '<p>Peluquería</p>' * 3000,
+]
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 16 * 1024])
+def test_chunked_read_matches_single_read(scraper, document, chunk_size):
+    whole = read(scraper, document, [10 ** 9])
+
+    assert read(scraper, document, iter(lambda: chunk_size, None)) == whole
+
+
+def test_random_chunking(scraper):
+    rng = random.Random(5)
+    for document in DOCUMENTS:
+        whole = read(scraper, document, [10 ** 9])
+        sizes = [rng.randint(1, 5000) for _ in range(len(document))]
+        assert read(scraper, document, sizes) == whole
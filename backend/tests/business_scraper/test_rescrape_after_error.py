@@ -0,0 +1,108 @@
+"""
+A failed scrape drops the customer's page validators, so re-scraping a site
+that did not change since the last good scrape extracts again instead of
+skipping it and leaving the error in place.
+"""
+
+import json
+
+import pytest
+import requests
+
+CUSTOMER_ID = '00000000-0000-0000-0000-000000000001'
+WEBSITE = 'https://ana.es/'
+
+
+class ValidatorStoreCursor:
+    """Keeps scrape_validators rows in memory; other statements are only recorded"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+        if 'FROM scrape_validators' in sql and sql.lstrip().startswith('SELECT'):
+            self.result = [row for row in self.rows if row[0] in params[0]]
+        elif 'DELETE FROM scrape_validators' in sql:
+            self.rows[:] = [row for row in self.rows if row[0] != params[0]]
+        elif 'INSERT INTO scrape_validators' in sql:
+            self.rows.append(params)
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class ValidatorStoreConnection:
+    closed = False
+
+    def __init__(self, cursor):
+        self.store_cursor = cursor
+
+    def cursor(self):
+        return self.store_cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def site(scraper, monkeypatch):
+    """An unchanged site behind a fake database; returns (extraction calls, crawl errors to raise)"""
+    cursor = ValidatorStoreCursor([])
+    monkeypatch.setattr(scraper, 'get_db_connection', lambda: ValidatorStoreConnection(cursor))
+    monkeypatch.setattr(scraper, 'db_conn', None)
+
+    crawl_errors = []
+    extractions = []
+
+    def crawl_website(website, known_pages, max_pages):
+        if crawl_errors:
+            raise crawl_errors.pop(0)
+        page = {
+            'requested_url': website,
+            'url': website,
+            'etag': '"v1"',
+            'last_modified': None,
+            'digest': 'abc',
+        }
+        return {'changed': not known_pages, 'pages': [page]}
+
+    def extract_business_info(crawl_result, website):
+        extractions.append(website)
+        return {'business_name': 'Peluquería Ana'}
+
+    monkeypatch.setattr(scraper, 'crawl_website', crawl_website)
+    monkeypatch.setattr(scraper, 'extract_business_info', extract_business_info)
+    return extractions, crawl_errors
+
+
+def scrape(scraper):
+    scraper.process_record({'body': json.dumps({'customer_id': CUSTOMER_ID, 'website': WEBSITE})})
+
+
+def test_unchanged_site_is_skipped(scraper, site):
+    extractions, _ = site
+
+    scrape(scraper)
+    scrape(scraper)
+
+    assert extractions == [WEBSITE]
+
+
+def test_unchanged_site_is_extracted_after_a_failure(scraper, site):
+    extractions, crawl_errors = site
+
+    scrape(scraper)
+    crawl_errors.append(requests.exceptions.ConnectionError('connection reset'))
+    scrape(scraper)
+    scrape(scraper)
+
+    assert extractions == [WEBSITE, WEBSITE]
@@ -0,0 +1,117 @@
+"""
+clean_html_fragment (single scan, then strip()) against the chained regex
+passes of strip_html_noise it replaced.
+
+The two agree on every document where noise blocks don't interleave. Where
+blocks of different types overlap without nesting, the regex passes strip
+one block type after the other, while the scan lets the leftmost block win
+(as a browser does); those documents are pinned below as accepted
+differences.
+"""
+
+import random
+
+import pytest
+
+from legacy_html import legacy_strip_html_noise
+
+BLOCKS = (
+    ('<script>', '</script>'),
+    ('<script type="application/ld+json">', '</script>'),
+    ('<SCRIPT src="a.js">', '</SCRIPT>'),
+    ('<style>', '</style>'),
+    ('<Style media="print">', '</STYLE>'),
+    ('<!--', '-->'),
+    ('<svg viewBox="0 0 1 1">', '</svg>'),
+    ('<noscript>', '</noscript>'),
+)
+
+CONTENT = (
+    'Peluquería Ana', ' ', '\n\n  ', '\t', 'Tel. 912 345 678', '&amp;', '<p>', '</p>',
+    '<div data-id="7" class="x">', '</div>', '<a href="/contacto" data-track="nav">', '</a>',
+    '<h1 data-v-1a2b="">', '</h1>', 'a > b', '<br/>', 'script', '<b>style</b>', '<link rel="stylesheet">',
+)
+
+BLOCK_BODIES = ('var a = "<p>";', 'x', '', ' \n ', '<p>hidden</p>', '.c{color:red}', 'if (a < b) {}')
+
+
+def random_document(rng: random.Random) -> str:
+    """Content and complete noise blocks, some with a block of another type nested inside"""
+    parts = []
+    for _ in range(rng.randint(1, 25)):
+        if rng.random() < 0.6:
+            parts.append(rng.choice(CONTENT))
+        else:
+            opener, closer = rng.choice(BLOCKS)
+            body = rng.choice(BLOCK_BODIES)
+            if rng.random() < 0.2:
+                inner_opener, inner_closer = rng.choice(BLOCKS)
+                body += inner_opener + rng.choice(BLOCK_BODIES) + inner_closer
+            parts.append(opener + body + closer)
+
+    # A trailing unclosed opener is kept as text (one in the middle could
+    # swallow later blocks and interleave with them)
+    if rng.random() < 0.2:
+        parts.append(rng.choice(('<script>', '<style>', '<!--', '<svg>', '<noscript', '<script')) + 'x')
+    return ''.join(parts)
+
+
+def test_matches_regex_passes_on_generated_documents(scraper):
+    rng = random.Random(20240601)
+    for _ in range(5000):
+        document = random_document(rng)
+        assert scraper.clean_html_fragment(document).strip() == legacy_strip_html_noise(document), document
+
+
+@pytest.mark.parametrize('document, expected', [
+    ('', ''),
+    ('  <p>Hola</p>\n\n<p>Adiós</p>  ', '<p>Hola</p> <p>Adiós</p>'),
+    ('<p data-id="1" class="a">x</p>', '<p class="a">x</p>'),
+    ('a<script>var x = "</p>";</script>b', 'ab'),
+    ('a<SCRIPT>x</script >b</script>c', 'ac'),
+    ('a<!-- <script>x</script> -->b', 'ab'),
+    ('a<script>unclosed', 'a<script>unclosed'),
+    ('a<script b<style>x</style>', 'a<script b'),
+    ('<svg><path/></svg><noscript><img></noscript>ok', 'ok'),
+])
+def test_known_documents(scraper, document, expected):
+    assert scraper.clean_html_fragment(document).strip() == expected
+    assert legacy_strip_html_noise(document) == expected
+
+
+# Interleaved blocks: (document, single scan, regex passes)
+ACCEPTED_DIFFERENCES = [
+    # Comment opens before a script and closes inside it
+    ('<!-- <script> --> </script>x', '</script>x', '<!-- x'),
+    ('<!--<script--></script>>', '</script>>', '<!-->'),
+    # svg opens first, style closes after it
+    ('<svg><style></svg></style>>', '</style>>', '<svg>>'),
+    ('<style><script></style></script>', '</script>', '<style>'),
+    ('<noscript><svg></noscript></svg>', '</svg>', '<noscript>'),
+    # Comment inside an svg, closing after it
+    ('a<svg><!--</svg>-->b', 'a-->b', 'a<svg>b'),
+]
+
+
+@pytest.mark.parametrize('document, scanned, regex_passes', ACCEPTED_DIFFERENCES)
+def test_accepted_differences_on_interleaved_blocks(scraper, document, scanned, regex_passes):
+    assert scraper.clean_html_fragment(document).strip() == scanned
+    assert legacy_strip_html_noise(document) == regex_passes
+
+
+def test_differences_only_on_mixed_block_types(scraper):
+    """Random tag soup: any difference involves at least two block types"""
+    tokens = ('<script>', '</script>', '<style>', '</style>', '<!--', '-->', '<svg>', '</svg>',
+              '<noscript>', '</noscript>', 'x', ' ', '<p data-a="1">', '<SCRIPT a>', '<script', '>')
+    kinds = ('script', 'style', '<!--', 'svg', 'noscript')
+    rng = random.Random(7)
+
+    differences = 0
+    for _ in range(20000):
+        document = ''.join(rng.choice(tokens) for _ in range(rng.randint(1, 8)))
+        if scraper.clean_html_fragment(document).strip() != legacy_strip_html_noise(document):
+            differences += 1
+            lowered = document.lower()
+            assert sum(kind in lowered for kind in kinds) >= 2, document
+
+    assert differences < 200  # ~0.3% of this soup, all interleavings
@@ -0,0 +1,27 @@
+"""
+Fixtures for the Python Lambda tests.
+
+Install the Lambdas' dependencies plus pytest (tests/requirements.txt) and
+run from backend/:
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from lambda_loader import load_lambda  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def scraper():
+    return load_lambda('business-scraper')
+
+
+@pytest.fixture(scope='session')
+def kb_processor():
+    return load_lambda('knowledge-base-processor')
@@ -0,0 +1,90 @@
+"""
+PDF extraction in worker processes: every page, in small and large
+documents alike, is subject to PDF_PAGE_TIMEOUT_SECONDS, and a whole file
+to EXTRACTION_TIMEOUT_SECONDS.
+"""
+
+import io
+import os
+import time
+
+import pytest
+
+
+def blank_pdf(page_count: int) -> io.BytesIO:
+    import PyPDF2
+
+    writer = PyPDF2.PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=595, height=842)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def slow_pages(kb_processor, monkeypatch):
+    """Pages report 'page N'; pages in the returned set hang (workers are forked, so they see the patch)"""
+    hanging = set()
+
+    def extract_pdf_page(pdf_reader, page_num):
+        if page_num in hanging:
+            time.sleep(60)
+        return f'page {page_num}'
+
+    monkeypatch.setattr(kb_processor, 'extract_pdf_page', extract_pdf_page)
+    monkeypatch.setattr(kb_processor, 'PDF_PAGE_TIMEOUT_SECONDS', 1.0)
+    return hanging
+
+
+@pytest.mark.parametrize('page_count, workers', [(3, 4), (10, 1), (10, 3)])
+def test_hanging_page_is_skipped(kb_processor, monkeypatch, slow_pages, page_count, workers):
+    monkeypatch.setattr(kb_processor, 'PDF_EXTRACT_WORKERS', workers)
+    slow_pages.add(1)
+
+    started = time.monotonic()
+    text = kb_processor.extract_text_from_pdf(blank_pdf(page_count))
+
+    assert time.monotonic() - started < 10
+    assert text == '\n\n'.join('' if page == 1 else f'page {page}' for page in range(page_count))
+
+
+def test_empty_pdf(kb_processor, slow_pages):
+    assert kb_processor.extract_text_from_pdf(blank_pdf(0)) == ''
+
+
+def process_running(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_stuck_extraction_is_killed_with_its_page_workers(kb_processor, monkeypatch, tmp_path):
+    """The whole-file timeout kills the extraction worker and the page workers it started"""
+    pids = tmp_path / 'pids'
+
+    def extract_pdf_page(pdf_reader, page_num):
+        with open(pids, 'a') as pid_file:
+            pid_file.write(f'{os.getpid()}\n')
+        time.sleep(60)
+        return ''
+
+    monkeypatch.setattr(kb_processor, 'extract_pdf_page', extract_pdf_page)
+    monkeypatch.setattr(kb_processor, 'PDF_EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(kb_processor, 'PDF_PAGE_TIMEOUT_SECONDS', 60.0)
+    monkeypatch.setattr(kb_processor, 'EXTRACTION_TIMEOUT_SECONDS', 2.0)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        kb_processor.extract_text_in_process('pdf', blank_pdf(10))
+    assert time.monotonic() - started < 10
+
+    page_worker_pids = [int(pid) for pid in pids.read_text().split()]
+    assert len(page_worker_pids) == 2
+    deadline = time.monotonic() + 5
+    while any(process_running(pid) for pid in page_worker_pids) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not any(process_running(pid) for pid in page_worker_pids)
@@ -0,0 +1,134 @@
+"""
+Semantic passage search: the hashing embedder, and the queries
+search_kb_passages_semantic runs (against a recording fake connection, so
+no database is needed).
+"""
+
+import pytest
+
+
+def similarity(first, second):
+    return sum(a * b for a, b in zip(first, second))
+
+
+@pytest.fixture
+def hashing(kb_processor):
+    return kb_processor.HashingEmbedder(kb_processor.EMBEDDING_DIMENSIONS)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized(kb_processor, hashing):
+    first, second = hashing.embed(['Abrimos los sábados por la mañana'] * 2)
+
+    assert first == second
+    assert len(first) == kb_processor.EMBEDDING_DIMENSIONS
+    assert similarity(first, first) == pytest.approx(1.0)
+
+
+def test_hashing_embedder_ranks_word_overlap(hashing):
+    query, close, unrelated = hashing.embed([
+        '¿Cuánto cuesta el corte de pelo?',
+        'El corte de pelo cuesta 15 euros.',
+        'Aceptamos pago con tarjeta y Bizum.',
+    ])
+
+    assert similarity(query, close) > similarity(query, unrelated)
+
+
+def test_hashing_embedder_ignores_accents_and_case(hashing):
+    accented, plain = hashing.embed(['Peluquería CANINA en Logroño', 'peluqueria canina en logrono'])
+
+    assert similarity(accented, plain) == pytest.approx(1.0)
+
+
+def test_hashing_embedder_empty_text(kb_processor, hashing):
+    assert hashing.embed_one('') == [0.0] * kb_processor.EMBEDDING_DIMENSIONS
+
+
+def test_format_vector(kb_processor):
+    assert kb_processor.format_vector([0.5, -0.25, 1 / 3]) == '[0.5,-0.25,0.333333]'
+
+
+class RecordingCursor:
+    def __init__(self, extversion, rows):
+        self.extversion = extversion
+        self.rows = rows
+        self.statements = []
+        self.result = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+        if 'pg_extension' in sql:
+            self.result = [(self.extversion,)] if self.extversion else []
+        elif 'FROM kb_passages' in sql:
+            self.result = self.rows
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    closed = False
+
+    def __init__(self, cursor):
+        self.recording_cursor = cursor
+
+    def cursor(self):
+        return self.recording_cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def semantic_search(kb_processor, monkeypatch, hashing):
+    """Run a search against a fake pgvector of the given version; returns the cursor"""
+    monkeypatch.setattr(kb_processor, 'embedder', hashing)
+
+    def search(extversion, rows=()):
+        cursor = RecordingCursor(extversion, list(rows))
+        monkeypatch.setattr(kb_processor, 'pgvector_version', None)
+        monkeypatch.setattr(kb_processor, 'get_db_connection', lambda: RecordingConnection(cursor))
+        return cursor, kb_processor.search_kb_passages_semantic('kb-1', 'corte de pelo', 3)
+
+    return search
+
+
+@pytest.mark.parametrize('extversion, iterative_scan', [
+    ('0.6.2', False),
+    ('0.7.4', False),
+    ('0.8.0', True),
+    ('0.10.1', True),
+    (None, False),
+])
+def test_iterative_scan_only_on_pgvector_0_8(kb_processor, semantic_search, extversion, iterative_scan):
+    cursor, _ = semantic_search(extversion)
+
+    assert any('hnsw.ef_search' in sql for sql in cursor.statements)
+    assert any('hnsw.iterative_scan' in sql for sql in cursor.statements) == iterative_scan
+
+
+def test_pgvector_version_is_read_once(kb_processor, semantic_search):
+    cursor, _ = semantic_search('0.8.0')
+    kb_processor.search_kb_passages_semantic('kb-1', 'tinte', 3)
+
+    assert sum('pg_extension' in sql for sql in cursor.statements) == 1
+
+
+def test_semantic_search_rows(semantic_search):
+    _, passages = semantic_search('0.8.0', [('00000000-0000-0000-0000-000000000001', 2, 'El corte cuesta 15 euros.', 0.75)])
+
+    assert passages == [{
+        'source_id': '00000000-0000-0000-0000-000000000001',
+        'passage_index': 2,
+        'content': 'El corte cuesta 15 euros.',
+        'similarity': 0.75,
+    }]
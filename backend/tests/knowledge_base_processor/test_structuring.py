@@ -0,0 +1,49 @@
+"""
+Chunked structuring: chunk results are merged, and a source longer than
+STRUCTURING_MAX_CHUNKS chunks is marked partial instead of silently cut.
+"""
+
+import re
+
+import pytest
+
+BUSINESS = {'business_name': 'Peluquería Ana', 'industry': 'peluquería'}
+
+
+@pytest.fixture
+def structured_parts(kb_processor, monkeypatch):
+    """Each chunk structures to one phone number ending in its part number"""
+    monkeypatch.setattr(kb_processor, 'STRUCTURING_CHUNK_CHARS', 200)
+    monkeypatch.setattr(kb_processor, 'STRUCTURING_CHUNK_OVERLAP_CHARS', 0)
+
+    def structure_prompt_with_bedrock(prompt):
+        part = re.search(r'fragmento \((\d+) de', prompt)
+        return {'contacts': {'phones': [f'600 000 {int(part.group(1)):03d}']}}
+
+    monkeypatch.setattr(kb_processor, 'structure_prompt_with_bedrock', structure_prompt_with_bedrock)
+
+
+def document(paragraphs: int) -> str:
+    return '\n\n'.join(f'Párrafo {i}: ' + 'texto de relleno ' * 8 for i in range(paragraphs))
+
+
+def test_chunks_are_merged(kb_processor, structured_parts):
+    chunks = kb_processor.split_text_into_chunks(document(12), 200, 0)
+
+    structured = kb_processor.structure_knowledge_with_bedrock(document(12), BUSINESS)
+
+    assert len(structured['contacts']['phones']) == len(chunks) > 1
+    assert 'partial' not in structured
+
+
+def test_source_beyond_max_chunks_is_marked_partial(kb_processor, monkeypatch, structured_parts):
+    monkeypatch.setattr(kb_processor, 'STRUCTURING_MAX_CHUNKS', 3)
+    text = document(12)
+    chunks = kb_processor.split_text_into_chunks(text, 200, 0)
+
+    structured = kb_processor.structure_knowledge_with_bedrock(text, BUSINESS)
+
+    assert len(structured['contacts']['phones']) == 3
+    assert structured['partial'] == {'chunks_structured': 3, 'chunks_total': len(chunks), 'chars_total': len(text)}
+    # Merging sources ignores the marker
+    assert 'partial' not in kb_processor.merge_structured_data([structured])
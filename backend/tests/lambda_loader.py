@@ -0,0 +1,26 @@
+"""
+Load a Python Lambda's handler module from its directory.
+
+The Lambda directories are not packages (their names contain dashes), so
+tests and benchmarks load lambda_function.py by path, under a distinct
+module name per Lambda.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+LAMBDAS_DIR = Path(__file__).resolve().parent.parent / 'lambdas'
+
+
+def load_lambda(name: str):
+    """Import backend/lambdas/<name>/lambda_function.py (once per process)"""
+    module_name = f"{name.replace('-', '_')}_lambda_function"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, LAMBDAS_DIR / name / 'lambda_function.py')
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,68 @@
+"""
+Cold-start import budget of the Python Lambdas, measured with
+python -X importtime in a fresh interpreter per run.
+
+Heavy SDKs are imported on first use (PyPDF2/docx in the extractors,
+stripe in init_stripe) and AWS clients are built lazily, so importing
+lambda_function must stay within IMPORT_BUDGETS_MS and must not pull in
+the deferred modules. On a slow runner scale the budgets with
+IMPORT_TIME_BUDGET_SCALE (e.g. 2).
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambdas')
+
+RUNS = 5
+
+# Cumulative import time of lambda_function, median of RUNS (measured at
+# ~170 / 140 / 130 ms)
+IMPORT_BUDGETS_MS = {
+    'business-scraper': 350,
+    'knowledge-base-processor': 300,
+    'usage-tracker': 300,
+}
+
+DEFERRED_MODULES = {
+    'business-scraper': (),
+    'knowledge-base-processor': ('PyPDF2', 'docx'),
+    'usage-tracker': ('stripe',),
+}
+
+
+def import_lambda(name: str) -> dict:
+    """Import lambda_function in a fresh interpreter; returns package -> cumulative microseconds"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import lambda_function'],
+        cwd=os.path.join(LAMBDAS_DIR, name),
+        env={**os.environ, 'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'eu-west-1')},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, total, package = line[len('import time:'):].split('|')
+        cumulative[package.strip()] = int(total)
+    return cumulative
+
+
+@pytest.mark.parametrize('name', sorted(IMPORT_BUDGETS_MS))
+def test_import_time_within_budget(name):
+    runs = [import_lambda(name) for _ in range(RUNS)]
+
+    for module in DEFERRED_MODULES[name]:
+        assert module not in runs[0], f"{name} imports {module} at module level"
+
+    median_ms = statistics.median(run['lambda_function'] for run in runs) / 1000
+    budget_ms = IMPORT_BUDGETS_MS[name] * float(os.environ.get('IMPORT_TIME_BUDGET_SCALE', '1'))
+    assert median_ms <= budget_ms, f"{name} imports in {median_ms:.0f} ms (budget {budget_ms:.0f} ms)"